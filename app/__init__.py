@@ -1,10 +1,18 @@
 from flask import Flask, jsonify
-from flasgger import Swagger
 
 from config import Config
 from .extensions import db, migrate
+from .rate_limit import limiter
+from .jobs import jobs
+from .idempotency import sweeper
+from .events import feed
+from .audit import audit_writer
+from .slow_queries import slow_queries
 from .routes import register_routes
 from .seeders import user_seeder
+from .partitioning import init_partitioning
+from .sync import init_sync
+from .sqlite import init_sqlite
 
 def error_handlers(app):
     @app.errorhandler(Exception)
@@ -17,19 +25,27 @@ def app_init(config_object=Config):
     app = Flask(__name__)
     app.config.from_object(config_object)
     db.init_app(app)
+    init_sqlite(app)
 
     migrate.init_app(app, db)
+    limiter.init_app(app)
+    sweeper.init_app(app)
+    feed.init_app(app)
+    audit_writer.init_app(app)
+    slow_queries.init_app(app)
     error_handlers(app)
 
     @app.cli.command("seed")
     def seed():
         user_seeder.seed_users()
 
-    app.config['SWAGGER'] = {
-        "title": "Project Management API",
-        "uiversion": 3
-    }
-    Swagger(app)
+    init_partitioning(app)
+    init_sync(app)
+
+    # Swagger, imported only when enabled
+    if app.config.get('SWAGGER_ENABLED', True):
+        from .swagger import init_swagger
+        init_swagger(app)
 
     # Models
     from app import models
@@ -37,4 +53,7 @@ def app_init(config_object=Config):
     # Routes
     register_routes(app)
 
+    # Background jobs, resumed by each worker process on its first request
+    jobs.init_app(app)
+
     return app
\ No newline at end of file
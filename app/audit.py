@@ -0,0 +1,232 @@
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from enum import Enum
+
+from flask import g, has_app_context, has_request_context, request
+from sqlalchemy import event, inspect, insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.metrics import metrics
+from app.models.audit_log import AuditLog
+from app.models.projects import Project
+from app.models.tasks import Task
+from app.models.users import User
+
+logger = logging.getLogger(__name__)
+
+AUDITED_MODELS = {Project: 'project', Task: 'task', User: 'user'}
+
+# Never copied into the log
+REDACTED_FIELDS = {'password'}
+
+# Bumped by every write, not a change of its own
+IGNORED_FIELDS = {'version', 'updated_at'}
+
+def serialize(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def audit_entry(action, model, entity_id, changes=None):
+    if changes is not None:
+        changes = {
+            field: '***' if field in REDACTED_FIELDS else serialize(value)
+            for field, value in changes.items()
+            if field not in IGNORED_FIELDS
+        }
+
+    return {
+        "user_id": g.get('current_user_id') if has_app_context() else None,
+        "action": action,
+        "entity": AUDITED_MODELS[model],
+        "entity_id": entity_id,
+        "changes": changes,
+        "route": request.endpoint if has_request_context() else None,
+        "created_at": datetime.now(timezone.utc)
+    }
+
+def pending(session, entries):
+    # Tagged with the savepoint they were made in, to drop them if it rolls back
+    transaction = session.get_nested_transaction()
+    session.info.setdefault('audit', []).extend((transaction, entry) for entry in entries)
+
+def record(action, model, entity_ids, changes=None):
+    """
+    Audit a write made with a Core statement, which the flush hook does not
+    see. Like flushed changes, the entries are queued when the caller commits.
+    """
+    pending(db.session(), [audit_entry(action, model, entity_id, changes) for entity_id in entity_ids])
+
+@event.listens_for(Session, 'after_flush')
+def capture_flush(session, flush_context):
+    entries = []
+
+    for action, objects in (('create', session.new), ('update', session.dirty), ('delete', session.deleted)):
+        for obj in objects:
+            model = type(obj)
+            if model not in AUDITED_MODELS:
+                continue
+
+            state = inspect(obj)
+            if action == 'create':
+                changes = {attr.key: state.dict.get(attr.key) for attr in state.mapper.column_attrs}
+            elif action == 'update':
+                changes = {}
+                for attr in state.mapper.column_attrs:
+                    history = state.attrs[attr.key].history
+                    if history.has_changes():
+                        changes[attr.key] = history.added[0] if history.added else None
+                if not changes.keys() - IGNORED_FIELDS:
+                    continue
+            else:
+                changes = None
+
+            entries.append(audit_entry(action, model, obj.id, changes))
+
+    if entries:
+        pending(session, entries)
+
+@event.listens_for(Session, 'after_commit')
+def submit_on_commit(session):
+    entries = session.info.pop('audit', None)
+    if entries:
+        audit_writer.submit([entry for _, entry in entries])
+
+@event.listens_for(Session, 'after_soft_rollback')
+def discard_on_rollback(session, previous_transaction):
+    entries = session.info.get('audit')
+    if not entries:
+        return
+
+    if previous_transaction.nested:
+        session.info['audit'] = [item for item in entries if item[0] is not previous_transaction]
+    else:
+        session.info.pop('audit', None)
+
+class AuditWriter:
+    """
+    Writes audit entries to the audit_log table off the request path.
+
+    Committed entries go into a bounded in-memory queue that a background
+    thread per process drains with one multi-row INSERT per batch of up to
+    AUDIT_BATCH_SIZE entries, waiting at most AUDIT_FLUSH_INTERVAL seconds
+    for a batch to fill. AUDIT_QUEUE_FULL decides what a full queue does to
+    the request that commits: ``drop`` the entries, ``block`` for up to
+    AUDIT_BLOCK_SECONDS before dropping them, or write them ``sync``.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions["audit"] = self
+
+    @property
+    def inline(self):
+        return self.app.config.get('AUDIT_WRITER', 'thread') == 'inline'
+
+    def ensure_started(self):
+        if self.inline or self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._queue = queue.Queue(maxsize=self.app.config.get('AUDIT_QUEUE_SIZE', 10000))
+            threading.Thread(target=self._run, name="audit-writer", daemon=True).start()
+            atexit.register(self.flush)
+
+    def submit(self, entries):
+        if not self.app.config.get('AUDIT_ENABLED', True):
+            return
+
+        if self.inline:
+            self.write(entries)
+            return
+
+        self.ensure_started()
+        policy = self.app.config.get('AUDIT_QUEUE_FULL', 'block')
+        for i, entry in enumerate(entries):
+            try:
+                if policy == 'block':
+                    self._queue.put(entry, timeout=self.app.config.get('AUDIT_BLOCK_SECONDS', 1))
+                else:
+                    self._queue.put_nowait(entry)
+            except queue.Full:
+                rest = entries[i:]
+                if policy == 'sync':
+                    self.write(rest)
+                else:
+                    metrics.incr("audit_dropped", len(rest))
+                    logger.warning("Audit queue full, dropped %s entries", len(rest))
+                return
+
+    def write(self, entries):
+        if not has_app_context():
+            with self.app.app_context():
+                return self.write(entries)
+
+        # On a connection of its own: this runs after the caller's commit or on the writer thread
+        with db.engine.begin() as connection:
+            connection.execute(insert(AuditLog), entries)
+        metrics.incr("audit_written", len(entries))
+
+    def flush(self):
+        """Write all queued entries now. Returns the number written."""
+        written = 0
+        while True:
+            batch = self._take(timeout=None)
+            if not batch:
+                return written
+            self.write(batch)
+            written += len(batch)
+
+    def _take(self, timeout):
+        """Take up to AUDIT_BATCH_SIZE entries, waiting ``timeout`` seconds for the first one."""
+        try:
+            if timeout is None:
+                batch = [self._queue.get_nowait()]
+            else:
+                batch = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+
+        batch_size = self.app.config.get('AUDIT_BATCH_SIZE', 500)
+        deadline = time.monotonic() + (self.app.config.get('AUDIT_FLUSH_INTERVAL', 1) if timeout else 0)
+        while len(batch) < batch_size:
+            try:
+                batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._take(timeout=60)
+            if not batch:
+                continue
+
+            try:
+                self.write(batch)
+            except SQLAlchemyError:
+                metrics.incr("audit_dropped", len(batch))
+                logger.warning("Could not write %s audit entries", len(batch), exc_info=True)
+
+audit_writer = AuditWriter()
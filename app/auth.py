@@ -1,7 +1,7 @@
 
 import jwt
 from functools import wraps
-from flask import request, jsonify, current_app
+from flask import request, jsonify, current_app, g
 
 from app.models.users import User
 
@@ -16,6 +16,11 @@ def manager_required(func):
 def token_required(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
+        # Operations of a POST /api/batch are authenticated by the batch request
+        batch_user = g.get('batch_user')
+        if batch_user is not None:
+            return func(batch_user, *args, **kwargs)
+
         token = request.headers.get("Authorization")
 
         if not token:
@@ -36,5 +41,7 @@ def token_required(func):
         except Exception:
             return jsonify({"error": "Authentication error"}), 401
         
+        # Read by app.audit, which must not load attributes during a flush
+        g.current_user_id = user.id if user else None
         return func(user, *args, **kwargs)
     return wrapper
\ No newline at end of file
@@ -0,0 +1,52 @@
+
+from flask import current_app
+
+from app.extensions import db
+from app.reads import row_dict
+
+def parse_ids(raw):
+    """
+    Parse a comma separated ``ids`` query argument, keeping the order of
+    first appearance and dropping duplicates.
+
+    Raises ValueError with a client-facing message on bad input.
+    """
+    ids = []
+    seen = set()
+
+    for part in raw.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            value = int(part)
+        except ValueError:
+            raise ValueError('Invalid ID format')
+        if value not in seen:
+            seen.add(value)
+            ids.append(value)
+
+    if not ids:
+        raise ValueError('No IDs given')
+
+    max_ids = current_app.config.get('BATCH_MAX_IDS', 100)
+    if len(ids) > max_ids:
+        raise ValueError(f'Too many IDs, at most {max_ids} per request')
+
+    return ids
+
+def fetch_by_ids(statement, model, ids):
+    """
+    Load rows of the select ``statement`` for ``ids`` with one ``WHERE id IN
+    (...)`` and return their response dicts in request order together with
+    the IDs that were not found.
+    """
+    rows = {
+        row["id"]: row_dict(row)
+        for row in db.session.execute(statement.where(model.id.in_(ids))).mappings()
+    }
+
+    found = [rows[id] for id in ids if id in rows]
+    missing = [id for id in ids if id not in rows]
+
+    return found, missing
@@ -0,0 +1,104 @@
+
+import threading
+from functools import wraps
+
+from flask import Response, current_app, g, make_response, request
+
+from app.metrics import metrics
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.ok = False
+        self.result = None
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Runs one call per key at a time. Callers that arrive while a call for
+    their key is in flight wait for it and share its result instead of
+    running their own; nothing is kept once the call has finished.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, timeout):
+        """
+        Return ``func()``, or the result of the in-flight call for ``key``,
+        together with whether the result was shared. A waiter whose leader
+        fails or takes longer than ``timeout`` seconds runs ``func`` itself.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if leader:
+            try:
+                call.result = func()
+                call.ok = True
+                return call.result, False
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if call.done.wait(timeout) and call.ok:
+            return call.result, True
+        return func(), False
+
+flights = SingleFlight()
+
+def role_scope(user):
+    """Responses that are the same for every user of a role."""
+    return user.role.value
+
+def access_scope(user):
+    """Responses filtered by project membership: the same for all managers, per user otherwise."""
+    return user.role.value if user.role.value == 'manager' else user.id
+
+def user_scope(user):
+    """Responses that depend on the user."""
+    return user.id
+
+def coalesced(scope=role_scope):
+    """
+    Share the response of a GET route between identical concurrent
+    requests in this process: same endpoint, path and query arguments, and
+    the same ``scope(current_user)``. Goes below ``token_required``.
+
+    The leader's response is read into memory to be shared, and the route
+    runs once for all of them. Coalesced requests are counted in the
+    ``coalesced_requests`` metric per endpoint.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(user, *args, **kwargs):
+            # Reads in a batch can see its uncommitted writes, they are never shared
+            if not current_app.config.get('COALESCE_ENABLED', True) or g.get('batch_user') is not None:
+                return func(user, *args, **kwargs)
+
+            key = (
+                request.endpoint,
+                tuple(sorted((request.view_args or {}).items())),
+                tuple(sorted(request.args.items(multi=True))),
+                scope(user)
+            )
+
+            def respond():
+                response = make_response(func(user, *args, **kwargs))
+                return response.status_code, response.get_data(), list(response.headers.items())
+
+            (status, body, headers), shared = flights.do(
+                key, respond, current_app.config.get('COALESCE_WAIT_SECONDS', 10)
+            )
+            if shared:
+                metrics.incr("coalesced_requests", endpoint=request.endpoint)
+            return Response(body, status=status, headers=headers)
+        return wrapper
+    return decorator
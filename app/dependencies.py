@@ -0,0 +1,255 @@
+import json
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+from flask import current_app
+from sqlalchemy import delete, func, literal, or_, select
+
+from app.extensions import db
+from app.models.change_events import ChangeEvent
+from app.models.task_dependencies import TaskDependency
+from app.models.tasks import Task
+
+# Task dependencies and the schedule they make: a topological order of a
+# project's tasks, where every task comes after the tasks it depends on, and
+# a critical path, the longest chain of dependent tasks. Tasks carry no
+# estimate, so each counts as one unit of work.
+
+def depends_on(task_id, other_id):
+    """Whether ``task_id`` depends on ``other_id``, directly or through other tasks. One recursive query."""
+    reached = select(TaskDependency.depends_on_id.label('id')) \
+      .where(TaskDependency.task_id == task_id) \
+      .cte('reached', recursive=True)
+    reached = reached.union(
+        select(TaskDependency.depends_on_id).join(reached, TaskDependency.task_id == reached.c.id)
+    )
+    return db.session.execute(select(literal(1)).where(reached.c.id == other_id).limit(1)).first() is not None
+
+def remove_tasks(task_ids):
+    """Remove the dependencies of deleted tasks, given as a list of IDs or a select of them. The caller commits."""
+    db.session.execute(delete(TaskDependency).where(
+        or_(TaskDependency.task_id.in_(task_ids), TaskDependency.depends_on_id.in_(task_ids))
+    ))
+
+def remove_project(project_id):
+    """Remove every dependency of a project being deleted. The caller commits."""
+    db.session.execute(delete(TaskDependency).where(TaskDependency.project_id == project_id))
+
+def schedule(task_ids, edges):
+    """
+    The topological order and a critical path of the tasks ``task_ids``,
+    given in the order ties are broken in, with ``edges`` as (depends_on_id,
+    task_id) pairs. Edges to unknown tasks are ignored.
+
+    Kahn's algorithm over the successors in compressed sparse rows (an
+    offsets array into one array of targets), so the whole computation is
+    a few passes over flat integer arrays, O(V + E). Each task's longest
+    chain is extended when its prerequisites are taken off the queue, and
+    the critical path is read back from the longest one. Raises ValueError
+    when the dependencies have a cycle.
+    """
+    count = len(task_ids)
+    index = {task_id: i for i, task_id in enumerate(task_ids)}
+    pairs = [(index[before], index[after]) for before, after in edges if before in index and after in index]
+
+    offsets = array('l', bytes(8 * (count + 1)))
+    indegree = array('l', bytes(8 * count))
+    for before, after in pairs:
+        offsets[before + 1] += 1
+        indegree[after] += 1
+    for i in range(count):
+        offsets[i + 1] += offsets[i]
+    successors = array('l', bytes(8 * len(pairs)))
+    filled = offsets[:-1]
+    for before, after in pairs:
+        successors[filled[before]] = after
+        filled[before] += 1
+
+    longest = array('l', [1]) * count
+    previous = array('l', [-1]) * count
+    order = array('l', (i for i in range(count) if indegree[i] == 0))
+    head = 0
+    while head < len(order):
+        task = order[head]
+        head += 1
+        for k in range(offsets[task], offsets[task + 1]):
+            after = successors[k]
+            if longest[task] + 1 > longest[after]:
+                longest[after] = longest[task] + 1
+                previous[after] = task
+            indegree[after] -= 1
+            if indegree[after] == 0:
+                order.append(after)
+
+    if len(order) < count:
+        raise ValueError('Task dependencies have a cycle')
+
+    path = []
+    task = max(range(count), key=longest.__getitem__) if count else -1
+    while task != -1:
+        path.append(task_ids[task])
+        task = previous[task]
+    return [task_ids[i] for i in order], path[::-1]
+
+class ProjectGraph:
+    """
+    A project's tasks, as a dict of their ranks in rank order, and dependency
+    edges as of change event ``stamp``.
+    """
+
+    def __init__(self, stamp, ranks, edges):
+        self.stamp = stamp
+        self.ranks = ranks
+        self.edges = edges
+        self.built_at = time.monotonic()
+        self.body = None
+
+    def apply(self, stamp, events):
+        """
+        The graph after ``events``, the project's change events since this
+        one's stamp, in order, and whether a task's rank changed, in which
+        case the caller reads the tasks' order again: ranks rewritten by a
+        rebalance send no events, so the cached ones cannot be compared
+        with a moved task's new rank. Changes that touch neither tasks nor
+        dependencies leave the graph and its computed body as they are.
+        Applying an event the graph already has is harmless, so events
+        committed while the graph was read can be applied again.
+        """
+        changes = [(entity, op, entity_id, data or {}) for entity, op, entity_id, data in events
+                   if entity in ('task', 'dependency')]
+        ranks = dict(self.ranks)
+        edges = set(self.edges)
+        changed = reorder = False
+        deleted = set()
+        for entity, op, entity_id, data in changes:
+            if entity == 'task' and op == 'create':
+                # New tasks are ranked at the end
+                ranks[entity_id] = data.get('rank')
+                deleted.discard(entity_id)
+                changed = True
+            elif entity == 'task' and op == 'delete':
+                ranks.pop(entity_id, None)
+                deleted.add(entity_id)
+                changed = True
+            elif entity == 'task':
+                if entity_id in ranks and 'rank' in data and data['rank'] != ranks[entity_id]:
+                    ranks[entity_id] = data['rank']
+                    reorder = True
+            elif op == 'create':
+                edges.add((data['depends_on_id'], entity_id))
+                changed = True
+            else:
+                edges.discard((data['depends_on_id'], entity_id))
+                changed = True
+        if deleted:
+            edges = {edge for edge in edges if edge[0] not in deleted and edge[1] not in deleted}
+
+        graph = ProjectGraph(stamp, ranks, edges)
+        graph.built_at = self.built_at
+        if not (changed or reorder):
+            graph.body = self.body
+        return graph, reorder
+
+    def encode(self, project_id):
+        """The schedule's JSON, computed on first use."""
+        if self.body is None:
+            order, path = schedule(list(self.ranks), self.edges)
+            self.body = json.dumps({
+                "project_id": project_id,
+                "tasks": len(self.ranks),
+                "dependencies": len(self.edges),
+                "order": order,
+                "critical_path": path
+            })
+        return self.body
+
+class ScheduleCache:
+    """
+    Each project's dependency graph and encoded schedule, kept per process.
+
+    An entry is stamped with the project's newest change event, and every
+    write to tasks and dependencies records one in its transaction. A read
+    costs an index seek for the project's newest event; when it is newer
+    than the entry, only the events since the stamp are read and applied to
+    the graph, and the schedule is recomputed from memory if they changed
+    it; a task moved to another rank has the tasks' order read again. The graph is read back from the tables when the project is not
+    cached, when the events since the stamp were pruned from the log, and
+    every SCHEDULE_CACHE_TTL seconds, which also catches up on events that
+    committed after a later one was seen. The least recently used projects
+    are evicted beyond ``max_projects``.
+    """
+
+    def __init__(self, max_projects=100):
+        self.max_projects = max_projects
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def newest_event(self, project_id):
+        return db.session.execute(
+            select(func.max(ChangeEvent.id)).where(ChangeEvent.project_id == project_id)
+        ).scalar() or 0
+
+    def read_ranks(self, project_id):
+        return dict(db.session.execute(
+            select(Task.id, Task.rank).where(Task.project_id == project_id).order_by(Task.rank, Task.id)
+        ).tuples().all())
+
+    def load(self, project_id, stamp):
+        edges = set(db.session.execute(
+            select(TaskDependency.depends_on_id, TaskDependency.task_id).where(TaskDependency.project_id == project_id)
+        ).tuples())
+        return ProjectGraph(stamp, self.read_ranks(project_id), edges)
+
+    def catch_up(self, project_id, graph, stamp):
+        """``graph`` brought up to ``stamp`` from the event log, or None when events are missing from it."""
+        oldest = db.session.execute(select(func.min(ChangeEvent.id))).scalar()
+        if oldest is None or oldest > graph.stamp + 1:
+            return None
+
+        events = db.session.execute(
+            select(ChangeEvent.entity, ChangeEvent.op, ChangeEvent.entity_id, ChangeEvent.data)
+            .where(ChangeEvent.project_id == project_id, ChangeEvent.id > graph.stamp, ChangeEvent.id <= stamp)
+            .order_by(ChangeEvent.id)
+        ).tuples().all()
+        if any(entity == 'project' and op == 'delete' for entity, op, _, _ in events):
+            # The ID may be taken again, by a project with none of these tasks
+            return None
+        graph, reorder = graph.apply(stamp, events)
+        if reorder:
+            # The edges are kept, only the tasks' order is read again
+            graph.ranks = self.read_ranks(project_id)
+        return graph
+
+    def schedule(self, project_id):
+        """The JSON of the project's schedule. Raises ValueError when its dependencies have a cycle."""
+        # Taken before the graph is read, so a change committed meanwhile is applied on the next read
+        stamp = self.newest_event(project_id)
+        ttl = current_app.config.get('SCHEDULE_CACHE_TTL', 300)
+
+        with self._lock:
+            graph = self._entries.get(project_id)
+        if graph is not None and time.monotonic() - graph.built_at > ttl:
+            graph = None
+
+        if graph is None:
+            graph = self.load(project_id, stamp)
+        elif graph.stamp < stamp:
+            graph = self.catch_up(project_id, graph, stamp) or self.load(project_id, stamp)
+
+        body = graph.encode(project_id)
+        with self._lock:
+            current = self._entries.get(project_id)
+            if current is None or current.stamp <= graph.stamp:
+                self._entries[project_id] = graph
+            self._entries.move_to_end(project_id)
+            while len(self._entries) > self.max_projects:
+                self._entries.popitem(last=False)
+        return body
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+schedules = ScheduleCache()
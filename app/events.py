@@ -0,0 +1,268 @@
+
+import logging
+import os
+import queue
+import threading
+import time
+
+import click
+from sqlalchemy import delete, event, func, or_, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models.change_events import ChangeEvent
+
+logger = logging.getLogger(__name__)
+
+def record_change(entity, op, entity_id, project_id, data=None):
+    """
+    Add a change event to the current transaction. It is stored and
+    published with the caller's commit and dropped by a rollback.
+    """
+    db.session.add(ChangeEvent(
+        entity=entity,
+        op=op,
+        entity_id=entity_id,
+        project_id=project_id,
+        data=data
+    ))
+    db.session.info['change_events'] = True
+    feed.ensure_started()
+
+@event.listens_for(Session, 'after_commit')
+def publish_on_commit(session):
+    if session.info.pop('change_events', False):
+        feed.notify()
+
+@event.listens_for(Session, 'after_soft_rollback')
+def discard_on_rollback(session, previous_transaction):
+    session.info.pop('change_events', None)
+
+def prune_events(retain):
+    """Delete all but the newest ``retain`` change events. Returns the number deleted."""
+    newest = db.session.execute(select(func.max(ChangeEvent.id))).scalar()
+    if newest is None or newest <= retain:
+        return 0
+
+    deleted = db.session.execute(delete(ChangeEvent).where(ChangeEvent.id <= newest - retain)).rowcount
+    db.session.commit()
+    return deleted
+
+class Subscription:
+    """
+    One stream's position in the event log and its queue of undelivered events.
+
+    IDs are taken when an event is written but become visible when its
+    transaction commits, so a lower ID can show up after a higher one.
+    IDs skipped over are kept as gaps for ``lag`` seconds and polled for
+    again; a gap that shows up late is delivered then, one that does not
+    was a rollback and is forgotten. Each event is queued with the
+    subscription's resume point, the ID up to which every event has been
+    delivered or given up on, for the client to send back as Last-Event-ID.
+    """
+
+    def __init__(self, project_ids, last_id, max_queued, lag=5, gaps=()):
+        # None streams every project
+        self.project_ids = project_ids
+        self.last_id = last_id
+        self.lag = lag
+        self.max_gap = max_queued
+        self.gaps = dict.fromkeys(gaps, time.monotonic())
+        self.queue = queue.Queue(maxsize=max_queued)
+        self.overflowed = False
+
+    @property
+    def resume_id(self):
+        return min(self.gaps) - 1 if self.gaps else self.last_id
+
+    def deliver(self, events):
+        now = time.monotonic()
+        for gap, seen_at in list(self.gaps.items()):
+            if now - seen_at > self.lag:
+                del self.gaps[gap]
+
+        for change in events:
+            if change["id"] > self.last_id:
+                # Too wide a jump is a sequence skipping ahead, not transactions in flight
+                if change["id"] - self.last_id - 1 <= self.max_gap:
+                    self.gaps.update(dict.fromkeys(range(self.last_id + 1, change["id"]), now))
+                # Scanned events advance the position even when filtered out
+                self.last_id = change["id"]
+            elif self.gaps.pop(change["id"], None) is None:
+                continue
+            if self.overflowed or (self.project_ids is not None and change["project_id"] not in self.project_ids):
+                continue
+            try:
+                self.queue.put_nowait((self.resume_id, change))
+            except queue.Full:
+                # The stream closes and the client resumes from the log with Last-Event-ID
+                self.overflowed = True
+
+    def drain(self):
+        events = []
+        while True:
+            try:
+                events.append(self.queue.get_nowait())
+            except queue.Empty:
+                return events
+
+class ChangeFeed:
+    """
+    Fans out change events to the open event streams of this process.
+
+    The change_events table is the source of truth: one poller thread per
+    process reads new rows for all of its subscribers, so events committed
+    by other workers arrive within CHANGE_FEED_POLL_INTERVAL and commits in
+    this process wake it up right away. The same thread keeps the table at
+    CHANGE_EVENTS_RETAIN rows.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._wakeup = threading.Event()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions["change_feed"] = self
+
+        @app.cli.group("events")
+        def events_cli():
+            """Change event log commands."""
+
+        @events_cli.command("prune")
+        def prune():
+            """Delete change events beyond CHANGE_EVENTS_RETAIN."""
+            deleted = prune_events(app.config.get('CHANGE_EVENTS_RETAIN', 10000))
+            click.echo(f"Deleted {deleted} change events")
+
+    @property
+    def inline(self):
+        return self.app.config.get('CHANGE_FEED_POLLER', 'thread') == 'inline'
+
+    def ensure_started(self):
+        if self.inline or self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._subscribers = set()
+            threading.Thread(target=self._run, name="change-feed", daemon=True).start()
+
+    def notify(self):
+        self._wakeup.set()
+
+    def subscribe(self, project_ids=None, last_event_id=None):
+        """
+        Start a subscription to the events of ``project_ids``, or of all
+        projects when None, after ``last_event_id``, or at the newest event
+        when it is None. Returns the subscription and whether events after
+        ``last_event_id`` were already pruned, in which case it starts at the
+        newest event and the client has to reload.
+        """
+        oldest, newest = db.session.execute(
+            select(func.min(ChangeEvent.id), func.max(ChangeEvent.id))
+        ).one()
+
+        config = self.app.config
+        reset = last_event_id is not None and oldest is not None and last_event_id < oldest - 1
+        gaps = ()
+        if last_event_id is None or reset:
+            last_event_id = newest or 0
+            # IDs below the newest that are not in the log yet may still commit
+            window = config.get('CHANGE_FEED_BATCH_SIZE', 500)
+            present = set(db.session.execute(
+                select(ChangeEvent.id).where(ChangeEvent.id > last_event_id - window)
+            ).scalars())
+            gaps = [event_id for event_id in range(max(last_event_id - window + 1, (oldest or 1)), last_event_id)
+                    if event_id not in present]
+
+        subscription = Subscription(
+            project_ids, last_event_id, config.get('CHANGE_FEED_MAX_QUEUED', 1000),
+            lag=config.get('CHANGE_FEED_LAG_SECONDS', 5), gaps=gaps
+        )
+        if not self.inline:
+            self.ensure_started()
+            with self._lock:
+                self._subscribers.add(subscription)
+            self.notify()
+
+        return subscription, reset
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def wait(self, subscription, timeout):
+        """
+        Return the subscription's next events as (resume ID, event) pairs,
+        or an empty list after ``timeout`` seconds.
+        """
+        if self.inline:
+            deadline = time.monotonic() + timeout
+            while True:
+                self.poll([subscription])
+                events = subscription.drain()
+                remaining = deadline - time.monotonic()
+                if events or remaining <= 0:
+                    return events
+                time.sleep(min(self.app.config.get('CHANGE_FEED_POLL_INTERVAL', 1), remaining))
+
+        try:
+            first = subscription.queue.get(timeout=timeout)
+        except queue.Empty:
+            return []
+        return [first] + subscription.drain()
+
+    def poll(self, subscriptions):
+        """Deliver the next batch of events to ``subscriptions``. Returns whether more are waiting."""
+        batch_size = self.app.config.get('CHANGE_FEED_BATCH_SIZE', 500)
+        gaps = set().union(*(subscription.gaps for subscription in subscriptions))
+        newer = ChangeEvent.id > min(subscription.last_id for subscription in subscriptions)
+        rows = db.session.execute(
+            select(ChangeEvent)
+            .where(or_(newer, ChangeEvent.id.in_(gaps)) if gaps else newer)
+            .order_by(ChangeEvent.id)
+            .limit(batch_size)
+        ).scalars().all()
+        events = [row.to_dict() for row in rows]
+
+        # Streams can stay open for minutes, do not hold a connection between polls
+        db.session.close()
+
+        for subscription in subscriptions:
+            subscription.deliver(events)
+        return len(events) == batch_size
+
+    def _run(self):
+        interval = self.app.config.get('CHANGE_FEED_POLL_INTERVAL', 1)
+        prune_interval = self.app.config.get('CHANGE_EVENTS_PRUNE_INTERVAL', 60)
+        pruned_at = time.monotonic()
+
+        while True:
+            self._wakeup.wait(interval)
+            self._wakeup.clear()
+
+            with self._lock:
+                subscriptions = list(self._subscribers)
+
+            with self.app.app_context():
+                try:
+                    while subscriptions and self.poll(subscriptions):
+                        pass
+
+                    if prune_interval and time.monotonic() - pruned_at >= prune_interval:
+                        pruned_at = time.monotonic()
+                        prune_events(self.app.config.get('CHANGE_EVENTS_RETAIN', 10000))
+                except SQLAlchemyError:
+                    db.session.rollback()
+                    logger.warning("Change feed poll failed", exc_info=True)
+
+feed = ChangeFeed()
@@ -1,6 +1,16 @@
-
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session as BaseSession
 from flask_migrate import Migrate
 
-db = SQLAlchemy()
+class Session(BaseSession):
+    """Session whose commits can be held back, see app.idempotency."""
+
+    def commit(self):
+        # Flush instead, so a caller further up commits the work in one transaction
+        if self.info.get('defer_commit'):
+            self.flush()
+        else:
+            super().commit()
+
+db = SQLAlchemy(session_options={"class_": Session})
 migrate = Migrate()
@@ -0,0 +1,188 @@
+
+import hashlib
+import logging
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+
+import click
+from flask import request, jsonify, current_app
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from app.extensions import db
+from app.models.idempotency_keys import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+def utcnow():
+    # Stored naive, like the other DateTime columns
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def request_fingerprint():
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(request.path.encode())
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+def replay(record):
+    response = current_app.response_class(
+        record.response_body,
+        status=record.status_code,
+        content_type=record.content_type
+    )
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+def idempotent(func):
+    """
+    Honour an ``Idempotency-Key`` header on a create handler.
+
+    The handler's commits are held back to flushes so that its write and
+    the stored response are committed together: a key is either stored
+    with the response of a completed write or not at all. Retries with the
+    same key and body get the stored response back without running the
+    handler again. A concurrent request with the same key loses on the
+    unique key when it commits, is rolled back and replays the winner's
+    response. Goes after ``token_required`` since keys are scoped per user.
+    """
+
+    @wraps(func)
+    def wrapper(current_user, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if key is None:
+            return func(current_user, *args, **kwargs)
+
+        if not key or len(key) > 255:
+            return jsonify({"error": "Invalid Idempotency-Key"}), 400
+
+        fingerprint = request_fingerprint()
+        now = utcnow()
+
+        record = find_key(current_user.id, key)
+        if record is not None and record.expires_at <= now:
+            db.session.delete(record)
+            db.session.commit()
+            record = None
+
+        if record is not None:
+            return replay_or_reject(record, fingerprint)
+
+        # Already set when the caller holds the transaction, as in an atomic batch
+        held = db.session.info.get('defer_commit', False)
+        db.session.info['defer_commit'] = True
+        try:
+            response = current_app.make_response(func(current_user, *args, **kwargs))
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            if not held:
+                db.session.info.pop('defer_commit', None)
+
+        if response.status_code >= 500:
+            # Nothing is stored, the client can retry with the same key
+            db.session.rollback()
+            return response
+
+        db.session.add(IdempotencyKey(
+            key=key,
+            user_id=current_user.id,
+            request_hash=fingerprint,
+            status_code=response.status_code,
+            response_body=response.get_data(as_text=True),
+            content_type=response.content_type,
+            created_at=now,
+            expires_at=now + timedelta(seconds=current_app.config.get('IDEMPOTENCY_TTL_SECONDS', 86400))
+        ))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another request with this key committed first; drop this one's write
+            db.session.rollback()
+            record = find_key(current_user.id, key)
+            if record is None or held:
+                # The caller's other writes went with the rollback, it has to fail
+                raise
+            return replay_or_reject(record, fingerprint)
+
+        sweeper.ensure_started()
+        return response
+    return wrapper
+
+def find_key(user_id, key):
+    return db.session.execute(
+        select(IdempotencyKey).where(
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.key == key
+        )
+    ).scalar_one_or_none()
+
+def replay_or_reject(record, fingerprint):
+    if record.request_hash != fingerprint:
+        return jsonify({"error": "Idempotency-Key was used for a different request"}), 422
+    return replay(record)
+
+def sweep_expired(batch_size=1000):
+    """Delete expired keys in batches, committing after each one. Returns the number deleted."""
+    deleted = 0
+    while True:
+        ids = db.session.execute(
+            select(IdempotencyKey.id)
+            .where(IdempotencyKey.expires_at <= utcnow())
+            .limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return deleted
+
+        db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.id.in_(ids)))
+        db.session.commit()
+        deleted += len(ids)
+
+class IdempotencySweeper:
+    """Deletes expired idempotency keys every IDEMPOTENCY_SWEEP_INTERVAL seconds on a daemon thread."""
+
+    def __init__(self, app=None):
+        self.app = None
+        self._pid = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+
+        @app.cli.group("idempotency")
+        def idempotency_cli():
+            """Idempotency key commands."""
+
+        @idempotency_cli.command("sweep")
+        def sweep():
+            """Delete expired idempotency keys."""
+            deleted = sweep_expired(app.config.get('IDEMPOTENCY_SWEEP_BATCH_SIZE', 1000))
+            click.echo(f"Deleted {deleted} expired idempotency keys")
+
+    def ensure_started(self):
+        interval = self.app.config.get('IDEMPOTENCY_SWEEP_INTERVAL', 300)
+        if not interval or self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop = threading.Event()
+            threading.Thread(target=self._run, args=(interval,), name="idempotency-sweeper", daemon=True).start()
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            with self.app.app_context():
+                try:
+                    sweep_expired(self.app.config.get('IDEMPOTENCY_SWEEP_BATCH_SIZE', 1000))
+                except SQLAlchemyError:
+                    db.session.rollback()
+                    logger.warning("Idempotency key sweep failed", exc_info=True)
+
+sweeper = IdempotencySweeper()
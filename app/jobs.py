@@ -0,0 +1,274 @@
+
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from flask import g
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.extensions import db
+from app.models.jobs import Job, JobStatus
+from app.models.timestamps import utcnow
+
+logger = logging.getLogger(__name__)
+
+class JobHandler:
+
+    def __init__(self, func, max_concurrency):
+        self.func = func
+        self.max_concurrency = max_concurrency
+
+class JobContext:
+    """Handed to job handlers to report progress while they run."""
+
+    def __init__(self, runner, job):
+        self.runner = runner
+        self.id = job.id
+        self.type = job.type
+        self.attempts = job.attempts
+
+    def progress(self, percent, commit=True):
+        """
+        Store the job progress and renew its lease. With ``commit`` the
+        handler's pending work is committed too, so a chunked handler that
+        is interrupted resumes after the last finished chunk.
+        """
+        db.session.execute(
+            update(Job)
+            .where(Job.id == self.id)
+            .values(progress=int(percent), locked_until=self.runner.lease_deadline())
+            .execution_options(synchronize_session=False)
+        )
+        if commit:
+            db.session.commit()
+
+class JobRunner:
+    """
+    Runs background jobs on a thread pool with a per-type concurrency limit.
+
+    Jobs are rows of the jobs table. A worker claims a job by moving it to
+    running with a lease; jobs still queued, or running with an expired
+    lease (their worker died), are picked up again by the first request a
+    (re)started worker process serves, and every JOBS_REAP_INTERVAL seconds
+    by a reaper thread in each process, so a job outlives a worker that
+    died while holding its lease.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.handlers = {}
+        self._pid = None
+        self._reaper_pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions["jobs"] = self
+
+        @app.before_request
+        def start_jobs():
+            if self._pid != os.getpid():
+                self.start()
+
+    def handler(self, job_type, max_concurrency=1):
+        def decorator(func):
+            self.handlers[job_type] = JobHandler(func, max_concurrency)
+            return func
+        return decorator
+
+    def start(self):
+        """Reset the per-process pool state and resume unfinished jobs."""
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._pending = defaultdict(deque)
+        self._running = defaultdict(int)
+        self._scheduled = set()
+        self._executor = None
+
+        if self.app.config.get("JOBS_RESUME_ON_START", True):
+            try:
+                self.resume()
+            except SQLAlchemyError:
+                db.session.rollback()
+                logger.warning("Could not resume background jobs", exc_info=True)
+
+        interval = self.app.config.get("JOBS_REAP_INTERVAL", 60)
+        if interval and self.app.config.get("JOBS_EXECUTOR", "thread") != "inline" and self._reaper_pid != self._pid:
+            self._reaper_pid = self._pid
+            threading.Thread(target=self._reap_periodically, args=(interval,), name="jobs-reaper", daemon=True).start()
+
+    def resume(self, queued_before=None):
+        """
+        Schedule queued jobs and running jobs whose lease expired. With
+        ``queued_before`` only jobs queued before then are taken, leaving
+        fresh ones to the process that enqueued them.
+        """
+        now = utcnow()
+        queued = Job.status == JobStatus.queued
+        if queued_before is not None:
+            queued = and_(queued, Job.created_at < queued_before)
+
+        rows = db.session.execute(
+            select(Job.id, Job.type)
+            .where(or_(
+                queued,
+                and_(Job.status == JobStatus.running, Job.locked_until < now)
+            ))
+            .order_by(Job.id)
+        ).all()
+
+        for job_id, job_type in rows:
+            if job_type in self.handlers:
+                self._schedule(job_id, job_type)
+
+        return len(rows)
+
+    def enqueue(self, job_type, payload=None, user=None):
+        if job_type not in self.handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+        if db.session.info.get('defer_commit'):
+            # A worker would look for the job before the caller's transaction commits it
+            raise RuntimeError("Background jobs cannot be queued in an atomic batch")
+
+        job = Job(
+            type=job_type,
+            status=JobStatus.queued,
+            payload=payload or {},
+            created_by=user.id if user else None
+        )
+        db.session.add(job)
+        db.session.commit()
+
+        self._schedule(job.id, job_type)
+        return job
+
+    def reap(self):
+        """Pick up jobs left behind by dead workers. Returns the number found."""
+        lease = timedelta(seconds=self.app.config.get("JOBS_LEASE_SECONDS", 300))
+        return self.resume(queued_before=utcnow() - lease)
+
+    def export_path(self, job_id):
+        """File a job writes its output to, under JOBS_EXPORT_DIR."""
+        directory = self.app.config.get("JOBS_EXPORT_DIR") or os.path.join(self.app.instance_path, "exports")
+        return os.path.join(directory, f"job-{job_id}.json")
+
+    def lease_deadline(self):
+        return utcnow() + timedelta(seconds=self.app.config.get("JOBS_LEASE_SECONDS", 300))
+
+    def _limit(self, job_type):
+        limits = self.app.config.get("JOBS_CONCURRENCY", {})
+        return limits.get(job_type, self.handlers[job_type].max_concurrency)
+
+    def _schedule(self, job_id, job_type):
+        if self._pid != os.getpid():
+            self.start()
+
+        if self.app.config.get("JOBS_EXECUTOR", "thread") == "inline":
+            self._execute(job_id)
+            return
+
+        with self._lock:
+            # The reaper also finds jobs that wait here for a free slot
+            if job_id in self._scheduled:
+                return
+            self._scheduled.add(job_id)
+            self._pending[job_type].append(job_id)
+        self._dispatch(job_type)
+
+    def _dispatch(self, job_type):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.app.config.get("JOBS_MAX_WORKERS", 4),
+                    thread_name_prefix="jobs"
+                )
+
+            while self._pending[job_type] and self._running[job_type] < self._limit(job_type):
+                job_id = self._pending[job_type].popleft()
+                self._running[job_type] += 1
+                self._executor.submit(self._run_and_release, job_id, job_type)
+
+    def _run_and_release(self, job_id, job_type):
+        try:
+            self._execute(job_id)
+        finally:
+            with self._lock:
+                self._running[job_type] -= 1
+                self._scheduled.discard(job_id)
+            self._dispatch(job_type)
+
+    def _reap_periodically(self, interval):
+        while True:
+            time.sleep(interval)
+            with self.app.app_context():
+                try:
+                    self.reap()
+                except SQLAlchemyError:
+                    db.session.rollback()
+                    logger.warning("Could not reap background jobs", exc_info=True)
+
+    def _claim(self, job_id):
+        now = utcnow()
+        result = db.session.execute(
+            update(Job)
+            .where(
+                Job.id == job_id,
+                or_(
+                    Job.status == JobStatus.queued,
+                    and_(Job.status == JobStatus.running, Job.locked_until < now)
+                )
+            )
+            .values(
+                status=JobStatus.running,
+                attempts=Job.attempts + 1,
+                locked_until=self.lease_deadline(),
+                started_at=func.coalesce(Job.started_at, now)
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    def _execute(self, job_id):
+        with self.app.app_context():
+            try:
+                if not self._claim(job_id):
+                    return
+
+                job = db.session.get(Job, job_id)
+                handler = self.handlers[job.type]
+                # Writes made by the job are audited as the user who queued it
+                g.current_user_id = job.created_by
+                result = handler.func(JobContext(self, job), dict(job.payload))
+
+                job = db.session.get(Job, job_id)
+                job.status = JobStatus.succeeded
+                job.result = result
+                job.progress = 100
+                job.locked_until = None
+                job.finished_at = utcnow()
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.exception("Job %s failed", job_id)
+
+                db.session.execute(
+                    update(Job)
+                    .where(Job.id == job_id)
+                    .values(
+                        status=JobStatus.failed,
+                        error=str(e),
+                        locked_until=None,
+                        finished_at=utcnow()
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                db.session.commit()
+
+jobs = JobRunner()
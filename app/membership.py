@@ -0,0 +1,111 @@
+
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import delete, insert, select, update
+
+from app.extensions import db
+from app.models.project_members import ProjectMember
+from app.models.users import User
+
+class MembershipCache:
+    """
+    The project IDs each user is a member of, kept per process.
+
+    An entry is tagged with the user's membership_version, which every
+    membership change bumps in the same transaction. token_required loads
+    the user row on each request anyway, so a stale entry is noticed
+    without a query of its own, and the set is reloaded with one indexed
+    query only after a change. The least recently used users are evicted
+    beyond ``max_users``.
+    """
+
+    def __init__(self, max_users=10000):
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def projects(self, user):
+        with self._lock:
+            entry = self._entries.get(user.id)
+            if entry is not None and entry[0] == user.membership_version:
+                self._entries.move_to_end(user.id)
+                return entry[1]
+
+        project_ids = frozenset(db.session.execute(
+            select(ProjectMember.project_id).where(ProjectMember.user_id == user.id)
+        ).scalars())
+
+        with self._lock:
+            self._entries[user.id] = (user.membership_version, project_ids)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        return project_ids
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+memberships = MembershipCache()
+
+def sees_all_projects(user):
+    return user.role.value == 'manager'
+
+def accessible_projects(user):
+    """The IDs of the projects ``user`` can access, or None for all of them."""
+    if sees_all_projects(user):
+        return None
+    return memberships.projects(user)
+
+def can_access(user, project_id):
+    """Whether ``user`` can read ``project_id``, answered from memory."""
+    projects = accessible_projects(user)
+    return projects is None or project_id in projects
+
+def filter_projects(query, user, project_column):
+    """Limit ``query`` to the projects of ``user`` with a join on project_members."""
+    if sees_all_projects(user):
+        return query
+    return query.join(ProjectMember, (ProjectMember.project_id == project_column) & (ProjectMember.user_id == user.id))
+
+def bump_versions(user_ids):
+    db.session.execute(
+        update(User)
+        .where(User.id.in_(user_ids))
+        .values(membership_version=User.membership_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+def add_member(project_id, user_id):
+    """Add the membership unless it exists. Returns whether it was added. The caller commits."""
+    if db.session.execute(select(ProjectMember.user_id).where(
+        ProjectMember.project_id == project_id, ProjectMember.user_id == user_id
+    )).first():
+        return False
+
+    db.session.execute(insert(ProjectMember).values(project_id=project_id, user_id=user_id))
+    bump_versions([user_id])
+    return True
+
+def remove_member(project_id, user_id):
+    """Remove the membership. Returns whether it existed. The caller commits."""
+    removed = db.session.execute(delete(ProjectMember).where(
+        ProjectMember.project_id == project_id, ProjectMember.user_id == user_id
+    )).rowcount > 0
+    if removed:
+        bump_versions([user_id])
+    return removed
+
+def remove_project(project_id):
+    """Remove every membership of a project being deleted. The caller commits."""
+    user_ids = db.session.execute(
+        select(ProjectMember.user_id).where(ProjectMember.project_id == project_id)
+    ).scalars().all()
+    if user_ids:
+        db.session.execute(delete(ProjectMember).where(ProjectMember.project_id == project_id))
+        bump_versions(user_ids)
+
+def remove_user(user_id):
+    """Remove every membership of a user being deleted. The caller commits."""
+    db.session.execute(delete(ProjectMember).where(ProjectMember.user_id == user_id))
@@ -0,0 +1,36 @@
+
+import threading
+from collections import defaultdict
+
+class Metrics:
+    """Process-local counters, keyed by name and an optional set of labels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(int)
+
+    def incr(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] += value
+
+    def get(self, name, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def snapshot(self):
+        with self._lock:
+            items = list(self._counters.items())
+
+        result = {}
+        for (name, labels), value in items:
+            label = ",".join(f"{k}={v}" for k, v in labels) or "total"
+            result.setdefault(name, {})[label] = value
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+
+metrics = Metrics()
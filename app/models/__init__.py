@@ -1,2 +1,2 @@
 
-from . import users, projects, tasks
\ No newline at end of file
+from . import users, projects, tasks, rate_limits, jobs, idempotency_keys, change_events, audit_log, tombstones, project_members, task_closure, task_dependencies
\ No newline at end of file
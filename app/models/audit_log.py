@@ -0,0 +1,34 @@
+from datetime import datetime, timezone
+
+from app.extensions import db
+
+class AuditLog(db.Model):
+    __tablename__ = 'audit_log'
+    __table_args__ = (
+        db.Index('ix_audit_log_entity_entity_id_id', 'entity', 'entity_id', 'id'),
+        db.Index('ix_audit_log_user_id_id', 'user_id', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=True)
+    action = db.Column(db.String(10), nullable=False)
+    entity = db.Column(db.String(20), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    changes = db.Column(db.JSON, nullable=True)
+    route = db.Column(db.String(100), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self):
+        return f"<AuditLog {self.id} {self.action} {self.entity} {self.entity_id}>"
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "action": self.action,
+            "entity": self.entity,
+            "entity_id": self.entity_id,
+            "changes": self.changes,
+            "route": self.route,
+            "created_at": self.created_at.isoformat() if self.created_at else None
+        }
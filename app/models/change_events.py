@@ -0,0 +1,31 @@
+from datetime import datetime, timezone
+
+from app.extensions import db
+
+class ChangeEvent(db.Model):
+    __tablename__ = 'change_events'
+    __table_args__ = (
+        db.Index('ix_change_events_project_id_id', 'project_id', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(20), nullable=False)
+    op = db.Column(db.String(10), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    project_id = db.Column(db.Integer, nullable=True)
+    data = db.Column(db.JSON, nullable=True)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self):
+        return f"<ChangeEvent {self.id} {self.entity}.{self.op} {self.entity_id}>"
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "entity": self.entity,
+            "op": self.op,
+            "entity_id": self.entity_id,
+            "project_id": self.project_id,
+            "data": self.data,
+            "created_at": self.created_at.isoformat() if self.created_at else None
+        }
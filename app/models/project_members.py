@@ -0,0 +1,24 @@
+
+from app.extensions import db
+from app.models.timestamps import utcnow
+
+class ProjectMember(db.Model):
+    __tablename__ = 'project_members'
+    __table_args__ = (
+        # The primary key serves lookups by user; this one listing a project's members
+        db.Index('ix_project_members_project_id_user_id', 'project_id', 'user_id'),
+    )
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id', ondelete='CASCADE'), primary_key=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=utcnow)
+
+    def __repr__(self):
+        return f"<ProjectMember {self.user_id}/{self.project_id}>"
+
+    def to_dict(self):
+        return {
+            "user_id": self.user_id,
+            "project_id": self.project_id,
+            "created_at": self.created_at.isoformat() if self.created_at else None
+        }
@@ -1,13 +1,28 @@
 
 from app.extensions import db
+from app.models.timestamps import Timestamps
 
-class Project(db.Model):
+class Project(Timestamps, db.Model):
     __tablename__ = 'projects'
+    __table_args__ = (
+        db.Index('ix_projects_updated_at_id', 'updated_at', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
+    version = db.Column(db.Integer, nullable=False, default=1)
     tasks = db.relationship('Task', back_populates='project', lazy=True, cascade="all, delete-orphan")
 
+    __mapper_args__ = {"version_id_col": version}
+
     def __repr__(self):
         return f"<Project {self.name}>"
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "description": self.description,
+            "version": self.version
+        }
@@ -0,0 +1,15 @@
+
+from app.extensions import db
+
+class RateLimitBucket(db.Model):
+    __tablename__ = 'rate_limit_buckets'
+    __table_args__ = (
+        db.Index('ix_rate_limit_buckets_updated_at', 'updated_at'),
+    )
+
+    key = db.Column(db.String(200), primary_key=True)
+    tokens = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.Float, nullable=False)
+
+    def __repr__(self):
+        return f"<RateLimitBucket {self.key}>"
@@ -0,0 +1,18 @@
+
+from app.extensions import db
+
+class TaskClosure(db.Model):
+    """One row per ancestor of a task, see app.subtasks."""
+    __tablename__ = 'task_closure'
+    __table_args__ = (
+        # The primary key serves subtrees; this one ancestor lists, nearest first
+        db.Index('ix_task_closure_descendant_id_depth', 'descendant_id', 'depth'),
+    )
+
+    # No foreign keys: a partitioned tasks table has no unique key on id alone
+    ancestor_id = db.Column(db.Integer, primary_key=True)
+    descendant_id = db.Column(db.Integer, primary_key=True)
+    depth = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<TaskClosure {self.ancestor_id}/{self.descendant_id}>"
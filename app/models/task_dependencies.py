@@ -0,0 +1,26 @@
+
+from app.extensions import db
+
+class TaskDependency(db.Model):
+    """``task_id`` cannot start before ``depends_on_id`` is done; both are tasks of ``project_id``."""
+    __tablename__ = 'task_dependencies'
+    __table_args__ = (
+        # The primary key serves a task's prerequisites; these a project's graph and a task's dependents
+        db.Index('ix_task_dependencies_project_id', 'project_id'),
+        db.Index('ix_task_dependencies_depends_on_id', 'depends_on_id'),
+    )
+
+    # No foreign keys to tasks, as for task_closure: a partitioned tasks table has no unique key on id alone
+    task_id = db.Column(db.Integer, primary_key=True)
+    depends_on_id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id', ondelete='CASCADE'), nullable=False)
+
+    def __repr__(self):
+        return f"<TaskDependency {self.task_id}/{self.depends_on_id}>"
+
+    def to_dict(self):
+        return {
+            "task_id": self.task_id,
+            "depends_on_id": self.depends_on_id,
+            "project_id": self.project_id
+        }
@@ -1,14 +1,42 @@
 
 from app.extensions import db
+from app.models.timestamps import Timestamps
 
-class Task(db.Model):
+class Task(Timestamps, db.Model):
     __tablename__ = 'tasks'
+    __table_args__ = (
+        db.Index('ix_tasks_project_id_id', 'project_id', 'id'),
+        db.Index('ix_tasks_assignee_id_id', 'assignee_id', 'id'),
+        db.Index('ix_tasks_updated_at_id', 'updated_at', 'id'),
+        db.Index('ix_tasks_project_id_rank', 'project_id', 'rank', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
     project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
+    assignee_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
+    # Parent task in the same project, kept in task_closure as well (see app.subtasks);
+    # no foreign key for the same reason as task_closure's
+    parent_id = db.Column(db.Integer, nullable=True)
+    version = db.Column(db.Integer, nullable=False, default=1)
+    # Order within the project, see app.ranks; compared byte by byte on every database
+    rank = db.Column(db.String(255).with_variant(db.String(255, collation='C'), 'postgresql'), nullable=False)
     project = db.relationship('Project', back_populates='tasks', lazy=True)
-    
+
+    __mapper_args__ = {"version_id_col": version}
+
     def __repr__(self):
-        return f"<Task {self.title}/{self.project_id}>"
\ No newline at end of file
+        return f"<Task {self.title}/{self.project_id}>"
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "title": self.title,
+            "description": self.description,
+            "project_id": self.project_id,
+            "assignee_id": self.assignee_id,
+            "parent_id": self.parent_id,
+            "rank": self.rank,
+            "version": self.version
+        }
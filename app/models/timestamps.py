@@ -0,0 +1,17 @@
+from datetime import datetime, timezone
+
+from app.extensions import db
+
+def utcnow():
+    # Stored naive, like the other DateTime columns
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+class Timestamps:
+    """
+    created_at and updated_at columns. The defaults are called per row;
+    updated_at also changes with every UPDATE, ORM flushes and Core
+    statements alike, which is what delta sync relies on.
+    """
+
+    created_at = db.Column(db.DateTime, nullable=False, default=utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=utcnow, onupdate=utcnow)
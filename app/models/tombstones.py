@@ -0,0 +1,19 @@
+from app.extensions import db
+from app.models.timestamps import utcnow
+
+class Tombstone(db.Model):
+    """A deleted project, task or user, kept for SYNC_TOMBSTONE_RETAIN_DAYS for delta sync."""
+
+    __tablename__ = 'tombstones'
+    __table_args__ = (
+        db.Index('ix_tombstones_deleted_at_id', 'deleted_at', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(20), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    project_id = db.Column(db.Integer, nullable=True)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=utcnow)
+
+    def __repr__(self):
+        return f"<Tombstone {self.entity} {self.entity_id}>"
@@ -1,16 +1,19 @@
-from datetime import datetime, timezone
 from sqlalchemy.orm import validates
 from werkzeug.security import generate_password_hash, check_password_hash
 
 from enum import Enum
 from app.extensions import db
+from app.models.timestamps import Timestamps
 
 class Role(Enum):
     manager = 'manager'
     employee = 'employee'
 
-class User(db.Model):
+class User(Timestamps, db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        db.Index('ix_users_updated_at_id', 'updated_at', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     first_name = db.Column(db.String(50), nullable=False)
@@ -18,8 +21,11 @@ class User(db.Model):
     email = db.Column(db.String(100), unique=True, nullable=False)
     role = db.Column(db.Enum(Role), nullable=False)
     password = db.Column(db.String(300), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.now(timezone.utc))
-    updated_at = db.Column(db.DateTime, default=datetime.now(timezone.utc), onupdate=datetime.now(timezone.utc))
+    version = db.Column(db.Integer, nullable=False, default=1)
+    # Bumped when the user's project memberships change, see app.membership
+    membership_version = db.Column(db.Integer, nullable=False, default=1)
+
+    __mapper_args__ = {"version_id_col": version}
 
     def __repr__(self):
         return f"<User {self.first_name} {self.last_name}>"
@@ -30,3 +36,13 @@ class User(db.Model):
 
     def check_password(self, password):
         return check_password_hash(self.password, password)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "first_name": self.first_name,
+            "last_name": self.last_name,
+            "email": self.email,
+            "role": self.role.value,
+            "version": self.version
+        }
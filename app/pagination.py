@@ -0,0 +1,250 @@
+
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Response, current_app, request, stream_with_context
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.metrics import metrics
+from app.reads import row_dict
+
+COUNT_STRATEGIES = ('exact', 'cached', 'estimated')
+
+class CountCache:
+    """
+    Totals of filtered queries, kept for PAGINATION_COUNT_TTL seconds.
+
+    Each table has a generation that is bumped when a transaction that
+    wrote to it commits in this process; an entry counted at an older
+    generation of one of its tables is stale. Writes committed by other
+    processes are only seen once the entry expires.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._generations = {}
+
+    def generations(self, tables):
+        with self._lock:
+            return tuple(self._generations.get(table, 0) for table in tables)
+
+    def get(self, key, tables):
+        generations = self.generations(tables)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            total, expires_at, counted_at = entry
+            if counted_at != generations or expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            return total
+
+    def set(self, key, total, ttl, generations):
+        with self._lock:
+            self._entries[key] = (total, time.monotonic() + ttl, generations)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tables):
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+count_cache = CountCache()
+
+@event.listens_for(Session, 'after_flush')
+def track_flushed_tables(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(type(obj), '__tablename__', None)
+        if table:
+            session.info.setdefault('written_tables', set()).add(table)
+
+@event.listens_for(Session, 'do_orm_execute')
+def track_statement_tables(orm_execute_state):
+    # UPDATE and DELETE statements run by app.writes and the delete routes bypass the flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table is not None:
+            orm_execute_state.session.info.setdefault('written_tables', set()).add(table.name)
+
+@event.listens_for(Session, 'after_commit')
+def invalidate_counts_on_commit(session):
+    tables = session.info.pop('written_tables', None)
+    if tables:
+        count_cache.invalidate(tables)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def forget_tables_on_rollback(session, previous_transaction):
+    # Tables written in a rolled back savepoint stay listed; a spare invalidation is harmless
+    if not previous_transaction.nested:
+        session.info.pop('written_tables', None)
+
+def count_strategy():
+    config = current_app.config
+    strategy = config.get('PAGINATION_COUNT_BY_ENDPOINT', {}).get(request.endpoint) \
+        or config.get('PAGINATION_COUNT', 'exact')
+    if strategy not in COUNT_STRATEGIES:
+        raise ValueError(f"Unknown PAGINATION_COUNT strategy: {strategy}")
+    return strategy
+
+def estimate_rows(statement):
+    """The planner's row estimate for ``statement``, or None where there is no planner estimate to read."""
+    connection = db.session.connection()
+    if connection.dialect.name != 'postgresql':
+        return None
+
+    compiled = statement.compile(dialect=connection.dialect)
+    plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled.string}", compiled.params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+def count_rows(statement):
+    return db.session.execute(select(func.count()).select_from(statement.subquery())).scalar_one()
+
+def count_total(statement):
+    """
+    Return the total number of rows of the select ``statement`` and whether that number is
+    exact, counted the way PAGINATION_COUNT says:
+
+    ``exact``
+        ``COUNT(*)`` on every request.
+    ``cached``
+        ``COUNT(*)`` at most once per PAGINATION_COUNT_TTL seconds per
+        filter, recounted after this process commits a write to the table.
+        A total served from the cache is not reported as exact.
+    ``estimated``
+        The planner's row estimate on PostgreSQL, counted exactly when the
+        estimate is below PAGINATION_COUNT_EXACT_BELOW or when the
+        database has no planner estimate.
+    """
+    statement = statement.order_by(None)
+    strategy = count_strategy()
+
+    if strategy == 'estimated':
+        estimate = estimate_rows(statement)
+        if estimate is not None and estimate >= current_app.config.get('PAGINATION_COUNT_EXACT_BELOW', 1000):
+            metrics.incr("pagination_count", strategy="estimated")
+            return estimate, False
+
+    elif strategy == 'cached':
+        compiled = statement.compile()
+        key = (compiled.string, tuple(sorted(compiled.params.items())))
+        tables = tuple(sorted(table.name for table in statement.get_final_froms()))
+
+        total = count_cache.get(key, tables)
+        if total is not None:
+            metrics.incr("pagination_count", strategy="cached")
+            return total, False
+
+        # Taken before counting, so a write committed during the count makes the entry stale
+        generations = count_cache.generations(tables)
+        total = count_rows(statement)
+        count_cache.set(key, total, current_app.config.get('PAGINATION_COUNT_TTL', 30), generations)
+        metrics.incr("pagination_count", strategy="exact")
+        return total, True
+
+    metrics.incr("pagination_count", strategy="exact")
+    return count_rows(statement), True
+
+def page_args(default_per_page=10):
+    """
+    Read ``page`` and ``per_page`` from the query string. ``per_page`` is
+    capped at MAX_PER_PAGE, so one request cannot ask for an unbounded page.
+    """
+    page = max(request.args.get("page", 1, int), 1)
+    per_page = request.args.get("per_page", default_per_page, int)
+    per_page = min(max(per_page, 1), current_app.config.get('MAX_PER_PAGE', 100))
+    return page, per_page
+
+def stream_page(statement, page, per_page, serialize=row_dict, expand=None, cursor=None):
+    """
+    Respond with one page of the select ``statement`` in the usual envelope
+    (total, total_exact, page, per_page, pages, data), encoding the rows as
+    they are read. Rows are mappings of the selected columns, turned into
+    response dicts by ``serialize``. The total is counted by ``count_total``.
+
+    The page is read through a server-side cursor STREAM_BATCH_SIZE rows at
+    a time and each batch is written out before the next one is fetched, so
+    a request holds one batch of rows and their JSON at most, never the
+    whole page. ``expand(rows, items)`` is called once per batch with the
+    rows and their serialized dicts, to add related data with one query per
+    batch rather than one per row. With ``cursor(row)``, a full page ends with
+    ``next_cursor``, the cursor of its last row, for keyset reads of the rest.
+    """
+    total, exact = count_total(statement)
+    envelope = {
+        "total": total,
+        "total_exact": exact,
+        "page": page,
+        "per_page": per_page,
+        "pages": math.ceil(total / per_page)
+    }
+
+    rows = db.session.execute(
+        statement.limit(per_page).offset((page - 1) * per_page),
+        execution_options={"yield_per": current_app.config.get('STREAM_BATCH_SIZE', 100)}
+    ).mappings()
+
+    def end(count, last):
+        if cursor is None:
+            return ''
+        return ', "next_cursor": ' + json.dumps(cursor(last) if count == per_page else None)
+
+    return Response(stream_with_context(encode_rows(envelope, rows, serialize, expand, end)),
+                    status=200, mimetype='application/json')
+
+def stream_rows(statement, envelope, serialize=row_dict):
+    """
+    Respond with ``envelope`` and every row of the select ``statement``
+    under ``data``, encoded batch by batch as in ``stream_page`` but with no
+    count and no page bounds. For reads that are bounded by what they select.
+    """
+    rows = db.session.execute(
+        statement, execution_options={"yield_per": current_app.config.get('STREAM_BATCH_SIZE', 100)}
+    ).mappings()
+    return Response(stream_with_context(encode_rows(envelope, rows, serialize)),
+                    status=200, mimetype='application/json')
+
+def encode_rows(envelope, rows, serialize, expand=None, end=None):
+    """Yield the JSON of ``envelope`` with ``rows`` under ``data``, a batch of rows at a time."""
+    batch_size = current_app.config.get('STREAM_BATCH_SIZE', 100)
+
+    def encode(batch):
+        items = [serialize(row) for row in batch]
+        if expand:
+            expand(batch, items)
+        return ', '.join(json.dumps(item) for item in items)
+
+    # The envelope without its closing brace, then the rows, then the end of both
+    yield json.dumps(envelope)[:-1] + ', "data": ['
+
+    batch = []
+    first = True
+    count = 0
+    last = None
+    for row in rows:
+        batch.append(row)
+        count += 1
+        last = row
+        if len(batch) == batch_size:
+            yield ('' if first else ', ') + encode(batch)
+            first = False
+            batch = []
+    if batch:
+        yield ('' if first else ', ') + encode(batch)
+
+    yield ']' + (end(count, last) if end else '') + '}'
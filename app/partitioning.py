@@ -0,0 +1,212 @@
+
+import time
+
+import click
+from sqlalchemy import text
+
+from app.extensions import db
+from app.models.tasks import Task
+
+# Online conversion of tasks into a table partitioned by hash of project_id.
+# PostgreSQL only, run step by step with `flask partition-tasks ...`:
+#
+#   prepare  create tasks_partitioned and a trigger that mirrors every
+#            write to tasks into it from now on
+#   copy     copy the rows that existed before, in committed chunks
+#   swap     rename the tables in one short transaction
+#   drop-old drop the unpartitioned table once the swap has been checked
+
+PARTITIONED = "tasks_partitioned"
+OLD = "tasks_unpartitioned"
+STATE = "tasks_partition_state"
+SYNC = "tasks_partition_sync"
+
+def check_postgres():
+    if db.engine.dialect.name != "postgresql":
+        raise click.ClickException("Partitioning tasks needs PostgreSQL")
+
+def table_exists(connection, name):
+    return connection.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is not None
+
+def prepare(partitions=16):
+    """Create the partitioned table, its partitions, indexes and foreign keys, and the sync trigger."""
+    check_postgres()
+    table = Task.__table__
+
+    with db.engine.begin() as connection:
+        if table_exists(connection, PARTITIONED):
+            raise click.ClickException(f"{PARTITIONED} already exists")
+
+        # Lock out writes while the trigger is installed and the copy bound is taken
+        connection.execute(text("LOCK TABLE tasks IN SHARE ROW EXCLUSIVE MODE"))
+
+        # Same columns, in the same order, with the same defaults (and so the same id sequence)
+        connection.execute(text(
+            f"CREATE TABLE {PARTITIONED} (LIKE tasks INCLUDING DEFAULTS) PARTITION BY HASH (project_id)"
+        ))
+        # The partition key has to be part of every unique constraint
+        connection.execute(text(f"ALTER TABLE {PARTITIONED} ADD CONSTRAINT {PARTITIONED}_pkey PRIMARY KEY (id, project_id)"))
+        for remainder in range(partitions):
+            connection.execute(text(
+                f"CREATE TABLE {PARTITIONED}_p{remainder} PARTITION OF {PARTITIONED} "
+                f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})"
+            ))
+
+        for index in table.indexes:
+            columns = ", ".join(column.name for column in index.columns)
+            connection.execute(text(f"CREATE INDEX {index.name}_partitioned ON {PARTITIONED} ({columns})"))
+
+        for constraint in table.foreign_key_constraints:
+            columns = ", ".join(constraint.column_keys)
+            referred = ", ".join(element.column.name for element in constraint.elements)
+            on_delete = f" ON DELETE {constraint.ondelete}" if constraint.ondelete else ""
+            connection.execute(text(
+                f"ALTER TABLE {PARTITIONED} ADD FOREIGN KEY ({columns}) "
+                f"REFERENCES {constraint.referred_table.name} ({referred}){on_delete}"
+            ))
+
+        # Rows up to copy_until are copied by `copy`, later ones by the trigger
+        connection.execute(text(f"CREATE TABLE {STATE} (copied_to integer NOT NULL, copy_until integer NOT NULL)"))
+        connection.execute(text(
+            f"INSERT INTO {STATE} SELECT 0, coalesce(max(id), 0) FROM tasks"
+        ))
+
+        connection.execute(text(f"""
+            CREATE FUNCTION {SYNC}() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                    DELETE FROM {PARTITIONED} WHERE id = OLD.id AND project_id = OLD.project_id;
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    INSERT INTO {PARTITIONED} SELECT NEW.*;
+                END IF;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        """))
+        connection.execute(text(
+            f"CREATE TRIGGER {SYNC} AFTER INSERT OR UPDATE OR DELETE ON tasks "
+            f"FOR EACH ROW EXECUTE FUNCTION {SYNC}()"
+        ))
+
+def copy(chunk_size=5000, pause=0.0, progress=None):
+    """
+    Copy the rows that existed when ``prepare`` ran, ``chunk_size`` IDs per
+    committed transaction. Resumes where it stopped. Returns the number of
+    rows copied.
+    """
+    check_postgres()
+    copied = 0
+
+    while True:
+        with db.engine.begin() as connection:
+            copied_to, copy_until = connection.execute(text(f"SELECT copied_to, copy_until FROM {STATE}")).one()
+            if copied_to >= copy_until:
+                return copied
+
+            upper = min(copied_to + chunk_size, copy_until)
+            # FOR SHARE makes a concurrent update wait for this chunk, so its
+            # trigger replaces the copied row instead of racing with it
+            result = connection.execute(text(
+                f"INSERT INTO {PARTITIONED} SELECT * FROM tasks "
+                f"WHERE id > :lower AND id <= :upper FOR SHARE "
+                f"ON CONFLICT DO NOTHING"
+            ), {"lower": copied_to, "upper": upper})
+            connection.execute(text(f"UPDATE {STATE} SET copied_to = :upper"), {"upper": upper})
+
+        copied += result.rowcount
+        if progress:
+            progress(upper, copy_until)
+        if pause:
+            time.sleep(pause)
+
+def swap():
+    """Replace tasks with the partitioned table, keeping the old one as tasks_unpartitioned."""
+    check_postgres()
+
+    with db.engine.begin() as connection:
+        copied_to, copy_until = connection.execute(text(f"SELECT copied_to, copy_until FROM {STATE}")).one()
+        if copied_to < copy_until:
+            raise click.ClickException(f"Copy has not finished ({copied_to}/{copy_until}), run copy first")
+
+        connection.execute(text("LOCK TABLE tasks IN ACCESS EXCLUSIVE MODE"))
+        connection.execute(text(f"DROP TRIGGER {SYNC} ON tasks"))
+        connection.execute(text(f"DROP FUNCTION {SYNC}()"))
+        connection.execute(text(f"DROP TABLE {STATE}"))
+
+        connection.execute(text(f"ALTER TABLE tasks RENAME TO {OLD}"))
+        connection.execute(text(f"ALTER INDEX tasks_pkey RENAME TO {OLD}_pkey"))
+        for index in Task.__table__.indexes:
+            connection.execute(text(f"ALTER INDEX {index.name} RENAME TO {index.name}_unpartitioned"))
+            connection.execute(text(f"ALTER INDEX {index.name}_partitioned RENAME TO {index.name}"))
+
+        connection.execute(text(f"ALTER TABLE {PARTITIONED} RENAME TO tasks"))
+        connection.execute(text(f"ALTER INDEX {PARTITIONED}_pkey RENAME TO tasks_pkey"))
+        partitions = connection.execute(text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'tasks'::regclass"
+        )).scalars().all()
+        for partition in partitions:
+            connection.execute(text(f"ALTER TABLE {partition} RENAME TO {partition.replace(PARTITIONED, 'tasks')}"))
+
+        # The id sequence belongs to the old table's column and would be dropped with it
+        connection.execute(text("ALTER SEQUENCE tasks_id_seq OWNED BY tasks.id"))
+
+def drop_old():
+    check_postgres()
+    with db.engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE {OLD}"))
+
+def status():
+    """Return the conversion step tasks is at, with the copy progress while copying."""
+    check_postgres()
+    with db.engine.connect() as connection:
+        if table_exists(connection, STATE):
+            copied_to, copy_until = connection.execute(text(f"SELECT copied_to, copy_until FROM {STATE}")).one()
+            return {"step": "copy" if copied_to < copy_until else "swap", "copied_to": copied_to, "copy_until": copy_until}
+
+        partitioned = connection.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'tasks'::regclass)"
+        )).scalar()
+        if not partitioned:
+            return {"step": "prepare"}
+
+        return {"step": "drop-old" if table_exists(connection, OLD) else "done"}
+
+def init_partitioning(app):
+
+    @app.cli.group("partition-tasks")
+    def partition_cli():
+        """Convert tasks into a table hash partitioned by project_id (PostgreSQL)."""
+
+    @partition_cli.command("prepare")
+    @click.option("--partitions", default=16, show_default=True, help="Number of hash partitions.")
+    def prepare_command(partitions):
+        """Create the partitioned table and start mirroring writes into it."""
+        prepare(partitions)
+        click.echo(f"Created {PARTITIONED} with {partitions} partitions, run copy next")
+
+    @partition_cli.command("copy")
+    @click.option("--chunk-size", default=5000, show_default=True, help="Task IDs copied per transaction.")
+    @click.option("--pause", default=0.0, show_default=True, help="Seconds to sleep between chunks.")
+    def copy_command(chunk_size, pause):
+        """Copy existing tasks in chunks; safe to interrupt and rerun."""
+        copied = copy(chunk_size, pause, progress=lambda done, total: click.echo(f"Copied up to ID {done}/{total}"))
+        click.echo(f"Copied {copied} tasks, run swap next")
+
+    @partition_cli.command("swap")
+    def swap_command():
+        """Swap the partitioned table in for tasks."""
+        swap()
+        click.echo(f"tasks is partitioned, the old table is kept as {OLD}")
+
+    @partition_cli.command("drop-old")
+    def drop_old_command():
+        """Drop the unpartitioned table left by swap."""
+        drop_old()
+        click.echo(f"Dropped {OLD}")
+
+    @partition_cli.command("status")
+    def status_command():
+        """Show which step the conversion is at."""
+        click.echo(status())
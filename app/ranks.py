@@ -0,0 +1,216 @@
+
+import base64
+import json
+
+from flask import current_app
+from sqlalchemy import bindparam, event, func, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models.tasks import Task
+
+# Task order within a project: each task has a rank, a string key compared
+# byte by byte, and a task is moved by giving it a key between its new
+# neighbours' keys, so no other row is written.
+#
+# A key is an integer part, one digit n (1-9) followed by n base-36 digits,
+# then an optional fraction of base-36 digits without trailing zeros. The
+# integer part grows by one at each append, so keys stay short when tasks are
+# added at the end, and the fraction only gets longer when tasks are moved
+# again and again into the same gap. Lists start in the middle of the 5 digit
+# integer parts, leaving millions of them for moves to the top; keys made of
+# "0" and a fraction sort before every integer part, in case those run out.
+
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+BASE = len(DIGITS)
+MAX_INTEGER_DIGITS = 9
+MAX_LENGTH = 255  # Task.rank's column size
+INTEGER_DIGITS = 5
+
+def split(key):
+    if key[0] == '0':
+        return '0', key[1:]
+    length = int(key[0]) + 1
+    return key[:length], key[length:]
+
+def encode_integer(value, length):
+    digits = []
+    for _ in range(length):
+        value, digit = divmod(value, BASE)
+        digits.append(DIGITS[digit])
+    return str(length) + ''.join(reversed(digits))
+
+def decode_integer(integer):
+    value = 0
+    for digit in integer[1:]:
+        value = value * BASE + DIGITS.index(digit)
+    return value
+
+def increment(integer):
+    """The next integer part, or None past the largest one."""
+    if integer == '0':
+        return encode_integer(0, 1)
+
+    length = len(integer) - 1
+    value = decode_integer(integer) + 1
+    if value < BASE ** length:
+        return encode_integer(value, length)
+    if length < MAX_INTEGER_DIGITS:
+        return encode_integer(0, length + 1)
+    return None
+
+def decrement(integer):
+    """The previous integer part, or None below the smallest one."""
+    length = len(integer) - 1
+    value = decode_integer(integer)
+    if value > 0:
+        return encode_integer(value - 1, length)
+    if length > 1:
+        return encode_integer(BASE ** (length - 1) - 1, length - 1)
+    return None
+
+def midpoint(low, high):
+    """A fraction strictly between the fractions ``low`` and ``high`` (None: 1)."""
+    if high is not None:
+        # Keep the common prefix and split the rest
+        n = 0
+        while n < len(high) and (low[n] if n < len(low) else '0') == high[n]:
+            n += 1
+        if n > 0:
+            return high[:n] + midpoint(low[n:], high[n:])
+
+    low_digit = DIGITS.index(low[0]) if low else 0
+    high_digit = DIGITS.index(high[0]) if high is not None else BASE
+    if high_digit - low_digit > 1:
+        return DIGITS[(low_digit + high_digit + 1) // 2]
+    if high is not None and len(high) > 1:
+        return high[0]
+    return DIGITS[low_digit] + midpoint(low[1:], None)
+
+def key_between(before, after):
+    """
+    A key that sorts after ``before`` and before ``after``; None stands for
+    the start or the end of the list. Raises ValueError unless before < after.
+    """
+    if before is not None and after is not None and before >= after:
+        raise ValueError('Keys are not in order')
+
+    if before is None and after is None:
+        return encode_integer(BASE ** INTEGER_DIGITS // 2, INTEGER_DIGITS)
+
+    if before is None:
+        integer, fraction = split(after)
+        if integer == '0':
+            return '0' + midpoint('', fraction)
+        if fraction:
+            return integer
+        previous = decrement(integer)
+        return previous if previous is not None else '0' + midpoint('', None)
+
+    integer, fraction = split(before)
+    if after is None:
+        following = increment(integer)
+        return following if following is not None else integer + midpoint(fraction, None)
+
+    after_integer, after_fraction = split(after)
+    if integer == after_integer:
+        return integer + midpoint(fraction, after_fraction)
+    following = increment(integer)
+    if following is not None and (following != after_integer or after_fraction):
+        return following
+    return integer + midpoint(fraction, None)
+
+def sequence(count):
+    """``count`` consecutive integer keys in order, centred like a new list's."""
+    length = INTEGER_DIGITS
+    while BASE ** length < 2 * count:
+        length += 1
+    start = (BASE ** length - count) // 2
+    return [encode_integer(start + i, length) for i in range(count)]
+
+def last_rank(project_id):
+    return db.session.execute(select(func.max(Task.rank)).where(Task.project_id == project_id)).scalar()
+
+@event.listens_for(Session, 'before_flush')
+def rank_new_tasks(session, flush_context, instances):
+    """New tasks without a rank go to the end of their project."""
+    ranks = {}
+    for task in session.new:
+        if isinstance(task, Task) and task.rank is None:
+            if task.project_id not in ranks:
+                with session.no_autoflush:
+                    ranks[task.project_id] = last_rank(task.project_id)
+            task.rank = ranks[task.project_id] = key_between(ranks[task.project_id], None)
+
+def neighbours(project_id, task_id, anchor_id, place_before):
+    """
+    The ranks around the slot next to ``anchor_id`` (after it, or before it
+    with ``place_before``), skipping the task being moved; None for an end of
+    the list. Without an anchor the slot is the top (after nothing) or the
+    bottom (before nothing). Two indexed seeks. Raises LookupError when the
+    anchor is not in the project.
+    """
+    others = [Task.project_id == project_id, Task.id != task_id]
+    position = (Task.rank, Task.id)
+
+    if anchor_id is None:
+        order = [Task.rank.desc(), Task.id.desc()] if place_before else [Task.rank, Task.id]
+        edge = db.session.execute(select(Task.rank).where(*others).order_by(*order).limit(1)).scalar()
+        return (edge, None) if place_before else (None, edge)
+
+    anchor = db.session.execute(select(Task.rank).where(*others, Task.id == anchor_id)).scalar()
+    if anchor is None:
+        raise LookupError(anchor_id)
+
+    if place_before:
+        other = db.session.execute(
+            select(Task.rank).where(*others, tuple_(*position) < tuple_(anchor, anchor_id))
+            .order_by(Task.rank.desc(), Task.id.desc()).limit(1)
+        ).scalar()
+        return other, anchor
+
+    other = db.session.execute(
+        select(Task.rank).where(*others, tuple_(*position) > tuple_(anchor, anchor_id))
+        .order_by(Task.rank, Task.id).limit(1)
+    ).scalar()
+    return anchor, other
+
+def needs_rebalance(key):
+    return len(key) > current_app.config.get('RANK_REBALANCE_LENGTH', 24)
+
+def rebalance(project_id, batch_size=1000):
+    """
+    Give every task of the project a short key, in the current order. Runs
+    in the caller's transaction, which should lock the project row against
+    moves. Returns the number of tasks ranked.
+    """
+    rows = db.session.execute(
+        select(Task.id, Task.rank).where(Task.project_id == project_id).order_by(Task.rank, Task.id)
+    ).all()
+    keys = sequence(len(rows))
+
+    statement = update(Task.__table__) \
+      .where(Task.__table__.c.id == bindparam('task_id')) \
+      .values(rank=bindparam('new_rank'))
+    for start in range(0, len(rows), batch_size):
+        chunk = [
+            {"task_id": task_id, "new_rank": key}
+            for (task_id, rank), key in zip(rows[start:start + batch_size], keys[start:start + batch_size])
+            if rank != key
+        ]
+        if chunk:
+            db.session.execute(statement, chunk)
+    return len(rows)
+
+def encode_cursor(rank, task_id):
+    return base64.urlsafe_b64encode(json.dumps([rank, task_id]).encode()).decode()
+
+def decode_cursor(cursor):
+    """Return the (rank, id) a cursor points after. Raises ValueError on a cursor this module did not make."""
+    try:
+        rank, task_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(rank, str) or not isinstance(task_id, int):
+            raise ValueError
+        return rank, task_id
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
@@ -0,0 +1,167 @@
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, jsonify, current_app
+from sqlalchemy import case, delete, insert, update
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.metrics import metrics
+from app.models.rate_limits import RateLimitBucket
+
+class MemoryBucketStore:
+    """Token buckets kept in this process, evicting the least recently used keys."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, rate, now=None):
+        now = time.monotonic() if now is None else now
+
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+
+        return allowed, 0 if allowed else math.ceil((1 - tokens) / rate)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+class DatabaseBucketStore:
+    """
+    Token buckets shared by every process through the rate_limit_buckets table.
+
+    A bucket is refilled and debited by a single conditional UPDATE on its
+    primary key, on a connection of its own so the caller's session is untouched.
+
+    A bucket left alone for ``ttl`` seconds is full again, the same as having
+    no row, so rows that old are deleted at most every ``sweep_interval``
+    seconds, when a new bucket is created.
+    """
+
+    def __init__(self, ttl=3600, sweep_interval=60):
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._swept_at = 0
+
+    def consume(self, key, capacity, rate, now=None):
+        now = time.time() if now is None else now
+        refilled = RateLimitBucket.tokens + (now - RateLimitBucket.updated_at) * rate
+        refilled = case((refilled > capacity, capacity), else_=refilled)
+
+        with db.engine.begin() as connection:
+            result = connection.execute(
+                update(RateLimitBucket)
+                .where(RateLimitBucket.key == key, refilled >= 1)
+                .values(tokens=refilled - 1, updated_at=now)
+            )
+            if result.rowcount:
+                return True, 0
+
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(
+                    insert(RateLimitBucket).values(key=key, tokens=capacity - 1, updated_at=now)
+                )
+        except IntegrityError:
+            # The bucket exists, so the UPDATE above found it empty
+            return False, math.ceil(1 / rate)
+
+        if now - self._swept_at >= self.sweep_interval:
+            self.sweep(now)
+        return True, 0
+
+    def sweep(self, now=None):
+        """Delete buckets that have refilled completely. Returns the number deleted."""
+        now = time.time() if now is None else now
+        self._swept_at = now
+        with db.engine.begin() as connection:
+            return connection.execute(
+                delete(RateLimitBucket).where(RateLimitBucket.updated_at < now - self.ttl)
+            ).rowcount
+
+    def clear(self):
+        with db.engine.begin() as connection:
+            connection.execute(RateLimitBucket.__table__.delete())
+
+class RateLimiter:
+
+    def __init__(self, app=None):
+        self.store = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        storage = app.config.get("AUTH_RATE_LIMIT_STORAGE", "memory")
+        if storage == "memory":
+            self.store = MemoryBucketStore(app.config.get("AUTH_RATE_LIMIT_MAX_KEYS", 100000))
+        elif storage == "database":
+            # The slowest bucket to refill from empty bounds how long rows are worth keeping
+            ttl = max(
+                app.config["AUTH_RATE_LIMIT_ADDRESS_BURST"] / app.config["AUTH_RATE_LIMIT_ADDRESS_RATE"],
+                app.config["AUTH_RATE_LIMIT_EMAIL_BURST"] / app.config["AUTH_RATE_LIMIT_EMAIL_RATE"]
+            )
+            self.store = DatabaseBucketStore(ttl, app.config.get("AUTH_RATE_LIMIT_SWEEP_INTERVAL", 60))
+        else:
+            raise ValueError(f"Unknown rate limit storage: {storage}")
+
+        app.extensions["rate_limiter"] = self
+
+    def consume(self, scope, value, capacity, rate):
+        allowed, retry_after = self.store.consume(f"{scope}:{value}", capacity, rate)
+        if not allowed:
+            metrics.incr("auth_rate_limited", scope=scope)
+        return allowed, retry_after
+
+    def reset(self):
+        self.store.clear()
+
+limiter = RateLimiter()
+
+def login_rate_limited(func):
+    """Reject login attempts with 429 once the client address or the email runs out of tokens."""
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        config = current_app.config
+        if not config.get("AUTH_RATE_LIMIT_ENABLED", True):
+            return func(*args, **kwargs)
+
+        metrics.incr("auth_attempts")
+
+        allowed, retry_after = limiter.consume(
+            "address",
+            request.remote_addr or "unknown",
+            config["AUTH_RATE_LIMIT_ADDRESS_BURST"],
+            config["AUTH_RATE_LIMIT_ADDRESS_RATE"]
+        )
+
+        data = request.get_json(silent=True)
+        email = data.get("email") if isinstance(data, dict) else None
+        if allowed and isinstance(email, str):
+            allowed, retry_after = limiter.consume(
+                "email",
+                email.strip().lower(),
+                config["AUTH_RATE_LIMIT_EMAIL_BURST"],
+                config["AUTH_RATE_LIMIT_EMAIL_RATE"]
+            )
+
+        if not allowed:
+            return jsonify({"error": "Too many login attempts"}), 429, {"Retry-After": str(retry_after)}
+
+        return func(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,33 @@
+
+from datetime import datetime
+from enum import Enum
+
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models.project_members import ProjectMember
+from app.models.projects import Project
+from app.models.tasks import Task
+from app.models.users import User
+
+# Read path of the GET routes: column-only selects whose rows are mapped
+# straight to response dicts. Nothing is loaded into the identity map, so a
+# page of rows costs no instances, attribute instrumentation or flush checks.
+
+PROJECT_COLUMNS = (Project.id, Project.name, Project.description, Project.version)
+TASK_COLUMNS = (Task.id, Task.title, Task.description, Task.project_id, Task.assignee_id, Task.parent_id, Task.rank, Task.version)
+USER_COLUMNS = (User.id, User.first_name, User.last_name, User.email, User.role, User.version)
+MEMBER_COLUMNS = (ProjectMember.user_id, ProjectMember.project_id, ProjectMember.created_at)
+
+def row_dict(row):
+    """The response dict of a row mapping, with enums as their values and datetimes in ISO 8601."""
+    item = dict(row)
+    for key, value in item.items():
+        if isinstance(value, (Enum, datetime)):
+            item[key] = value.value if isinstance(value, Enum) else value.isoformat()
+    return item
+
+def fetch_one(model, columns, ident):
+    """``columns`` of the row with primary key ``ident`` as a response dict, or None."""
+    row = db.session.execute(select(*columns).where(model.id == ident)).mappings().first()
+    return row_dict(row) if row is not None else None
@@ -2,10 +2,22 @@
 
 from .users import users_bp
 from .projects import projects_bp
+from .tasks import tasks_bp
 from .auth import auth_bp
+from .admin import admin_bp
+from .jobs import jobs_bp
+from .events import events_bp
+from .batch import batch_bp
+from .sync import sync_bp
 
 def register_routes(app):
 
     app.register_blueprint(users_bp, url_prefix="/api/users")
     app.register_blueprint(projects_bp, url_prefix="/api/projects")
-    app.register_blueprint(auth_bp, url_prefix="/auth")
\ No newline at end of file
+    app.register_blueprint(tasks_bp, url_prefix="/api/tasks")
+    app.register_blueprint(auth_bp, url_prefix="/auth")
+    app.register_blueprint(admin_bp, url_prefix="/api/admin")
+    app.register_blueprint(jobs_bp, url_prefix="/api/jobs")
+    app.register_blueprint(events_bp, url_prefix="/api/events")
+    app.register_blueprint(batch_bp, url_prefix="/api/batch")
+    app.register_blueprint(sync_bp, url_prefix="/api/sync")
\ No newline at end of file
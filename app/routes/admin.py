@@ -0,0 +1,201 @@
+from flask import Blueprint, jsonify, request
+
+from app.auth import token_required, manager_required
+from app.metrics import metrics
+from app.slow_queries import slow_queries
+from app.models.audit_log import AuditLog
+
+admin_bp = Blueprint('admin', __name__)
+
+@admin_bp.route('/metrics', methods=['GET'])
+@token_required
+@manager_required
+def get_metrics(current_user):
+    """
+    Get process metrics
+    ---
+    tags:
+      - Admin
+    responses:
+      200:
+        description: Counters collected by this worker process
+        content:
+          application/json:
+            schema:
+              type: object
+              additionalProperties:
+                type: object
+                additionalProperties:
+                  type: integer
+      403:
+        description: Manager role required
+    """
+
+    return jsonify(metrics.snapshot()), 200
+
+@admin_bp.route('/audit', methods=['GET'])
+@token_required
+@manager_required
+def get_audit_log(current_user):
+    """
+    Get the audit log of project, task and user writes, newest first
+    ---
+    tags:
+      - Admin
+    parameters:
+      - name: entity
+        in: query
+        type: string
+        enum: [project, task, user]
+        required: false
+      - name: entity_id
+        in: query
+        type: integer
+        required: false
+        description: Only with entity
+      - name: user_id
+        in: query
+        type: integer
+        required: false
+        description: Only writes made by this user
+      - name: cursor
+        in: query
+        type: integer
+        required: false
+        description: next_cursor from the previous page
+      - name: per_page
+        in: query
+        type: integer
+        required: false
+        default: 50
+        description: Number of entries per page, at most 200
+    responses:
+      200:
+        description: >
+          Audit entries. Entries are written in batches, so the latest
+          writes can take a moment to show up.
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                data:
+                  type: array
+                  items:
+                    type: object
+                    properties:
+                      id:
+                        type: integer
+                      user_id:
+                        type: integer
+                      action:
+                        type: string
+                        enum: [create, update, delete]
+                      entity:
+                        type: string
+                      entity_id:
+                        type: integer
+                      changes:
+                        type: object
+                        description: New values of the written fields
+                      route:
+                        type: string
+                      created_at:
+                        type: string
+                next_cursor:
+                  type: integer
+                  description: Pass as cursor to get the next page, null on the last page
+      400:
+        description: entity_id given without entity
+      403:
+        description: Manager role required
+    """
+
+    entity = request.args.get("entity")
+    entity_id = request.args.get("entity_id", None, int)
+    user_id = request.args.get("user_id", None, int)
+    cursor = request.args.get("cursor", None, int)
+    limit = min(max(request.args.get("per_page", 50, int), 1), 200)
+
+    if entity_id is not None and entity is None:
+        return jsonify({"error": "entity_id requires entity"}), 400
+
+    query = AuditLog.query
+    if entity is not None:
+        query = query.filter(AuditLog.entity == entity)
+        if entity_id is not None:
+            query = query.filter(AuditLog.entity_id == entity_id)
+    if user_id is not None:
+        query = query.filter(AuditLog.user_id == user_id)
+    if cursor is not None:
+        query = query.filter(AuditLog.id < cursor)
+
+    entries = query.order_by(AuditLog.id.desc()).limit(limit + 1).all()
+    next_cursor = entries[limit - 1].id if len(entries) > limit else None
+
+    return jsonify({
+        "data": [entry.to_dict() for entry in entries[:limit]],
+        "next_cursor": next_cursor
+    }), 200
+
+@admin_bp.route('/slow-queries', methods=['GET'])
+@token_required
+@manager_required
+def get_slow_queries(current_user):
+    """
+    Get the statements with the most time spent in slow executions
+    ---
+    tags:
+      - Admin
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        default: 20
+        description: Number of statements, at most 100
+    responses:
+      200:
+        description: >
+          Statements of this worker process that took longer than
+          SLOW_QUERY_THRESHOLD_MS, by total time. Every slow execution is
+          also written to SLOW_QUERY_LOG_FILE.
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                data:
+                  type: array
+                  items:
+                    type: object
+                    properties:
+                      sql:
+                        type: string
+                        description: Normalized SQL
+                      params:
+                        description: Types of the bound parameters
+                      count:
+                        type: integer
+                      total_ms:
+                        type: number
+                      mean_ms:
+                        type: number
+                      max_ms:
+                        type: number
+                      routes:
+                        type: object
+                        description: Slow executions per route
+                      plan:
+                        type: array
+                        items:
+                          type: string
+                        description: Latest EXPLAIN output, null until captured
+                      last_seen:
+                        type: string
+      403:
+        description: Manager role required
+    """
+
+    limit = min(max(request.args.get("limit", 20, int), 1), 100)
+    return jsonify({"data": slow_queries.top(limit)}), 200
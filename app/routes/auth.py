@@ -3,6 +3,7 @@ import jwt
 from flask import Blueprint, jsonify, request, current_app
 
 from app.models.users import User
+from app.rate_limit import login_rate_limited
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -26,6 +27,7 @@ def create_auth_token(user):
     return token
 
 @auth_bp.route("/token", methods=["POST"])
+@login_rate_limited
 def token():
     """
     Generate authentication token
@@ -59,6 +61,8 @@ def token():
                 token:
                   type: string
                   example: eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9...
+      429:
+        description: Too many login attempts from this address or for this email
       401:
         description: Invalid credentials
         content:
@@ -0,0 +1,230 @@
+import re
+
+from flask import Blueprint, jsonify, request, current_app, g
+from werkzeug.test import EnvironBuilder
+
+from app.extensions import db
+from app.auth import token_required
+
+batch_bp = Blueprint('batch', __name__)
+
+# $name.field.field refers to the body of the earlier operation named name
+REFERENCE = re.compile(r'\$([A-Za-z_][\w-]*)((?:\.\w+)+)')
+
+# Streams, token issuing and batches themselves cannot be batched
+EXCLUDED_PATHS = ('/api/batch', '/api/events', '/auth/')
+
+PASSED_HEADERS = ('ETag', 'Location')
+
+class BadReference(Exception):
+    pass
+
+def resolve(match, results):
+    name, path = match.group(1), match.group(2)[1:].split('.')
+    result = results.get(name)
+    if result is None:
+        raise BadReference(f"Unknown operation: {name}")
+    if result["status"] >= 400:
+        raise BadReference(f"Operation {name} failed")
+
+    value = result["body"]
+    for field in path:
+        if isinstance(value, list) and field.isdigit() and int(field) < len(value):
+            value = value[int(field)]
+        elif isinstance(value, dict) and field in value:
+            value = value[field]
+        else:
+            raise BadReference(f"{match.group(0)} not found")
+    return value
+
+def substitute(value, results):
+    """Replace the references in ``value``; a string that is only a reference takes the referenced value's type."""
+    if isinstance(value, dict):
+        return {key: substitute(item, results) for key, item in value.items()}
+    if isinstance(value, list):
+        return [substitute(item, results) for item in value]
+    if isinstance(value, str):
+        match = REFERENCE.fullmatch(value)
+        if match:
+            return resolve(match, results)
+        return REFERENCE.sub(lambda match: str(resolve(match, results)), value)
+    return value
+
+def validate(operation):
+    if not isinstance(operation, dict):
+        return "Operation must be an object"
+
+    method = operation.get('method')
+    path = operation.get('path')
+    if method not in ('GET', 'POST', 'PUT', 'PATCH', 'DELETE'):
+        return "Invalid method"
+    if not isinstance(path, str) or not path.startswith('/api/') or path.startswith(EXCLUDED_PATHS):
+        return "Invalid path"
+    if not isinstance(operation.get('headers', {}), dict):
+        return "Invalid headers"
+    return None
+
+def run(operation, results):
+    """Dispatch one operation through the app's routes and return its result."""
+    try:
+        path = substitute(operation['path'], results)
+        body = substitute(operation.get('body'), results)
+    except BadReference as e:
+        return {"status": 424, "body": {"error": str(e)}, "headers": {}}
+
+    headers = {key: value for key, value in operation.get('headers', {}).items() if key.lower() != 'authorization'}
+    environ = EnvironBuilder(
+        path=path,
+        base_url=request.host_url,
+        method=operation['method'],
+        headers=headers,
+        json=body
+    ).get_environ()
+    environ['REMOTE_ADDR'] = request.remote_addr
+
+    # Runs in the batch's app context, so it shares db.session and g with the batch
+    with current_app.request_context(environ):
+        response = current_app.full_dispatch_request()
+        status = response.status_code
+        data = response.get_json(silent=True) if response.is_json else response.get_data(as_text=True)
+
+    return {
+        "status": status,
+        "body": data,
+        "headers": {key: response.headers[key] for key in PASSED_HEADERS if key in response.headers}
+    }
+
+@batch_bp.route('', methods=['POST'])
+@token_required
+def batch(current_user):
+    """
+    Run several API requests in one call
+    ---
+    tags:
+      - Batch
+    parameters:
+      - in: body
+        name: batch
+        description: >
+          Operations run in order, each through its route with the batch's
+          token and role checks. A string in an operation's path or body can
+          refer to the response body of an earlier operation with
+          $name.field, e.g. "/api/projects/$project.id/tasks"; a value that
+          is only a reference keeps its type. With atomic, all operations
+          run in one transaction that is committed only if every one of
+          them succeeds, and the batch stops at the first failure.
+          Operations that queue background jobs cannot run atomically.
+        schema:
+          type: object
+          required:
+            - operations
+          properties:
+            atomic:
+              type: boolean
+              default: false
+            operations:
+              type: array
+              items:
+                type: object
+                required:
+                  - method
+                  - path
+                properties:
+                  name:
+                    type: string
+                    description: Name later operations refer to this one by
+                  method:
+                    type: string
+                    enum: [GET, POST, PUT, PATCH, DELETE]
+                  path:
+                    type: string
+                    description: API path with query string, e.g. /api/projects/1/tasks?page=2
+                  headers:
+                    type: object
+                    description: Extra headers such as If-Match or Idempotency-Key
+                  body:
+                    type: object
+    responses:
+      200:
+        description: >
+          Results in operation order. An operation referring to a failed or
+          unknown one is not run and gets status 424. In an atomic batch,
+          committed tells whether the writes were kept, and operations after
+          the first failure are not run.
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                committed:
+                  type: boolean
+                  description: Only for atomic batches
+                results:
+                  type: array
+                  items:
+                    type: object
+                    properties:
+                      name:
+                        type: string
+                      status:
+                        type: integer
+                      body:
+                        type: object
+                      headers:
+                        type: object
+      400:
+        description: Malformed batch, too many operations or an invalid operation
+    """
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('operations'), list):
+        return jsonify({"error": "Invalid input"}), 400
+
+    operations = data['operations']
+    max_operations = current_app.config.get('BATCH_MAX_OPERATIONS', 50)
+    if not operations or len(operations) > max_operations:
+        return jsonify({"error": f"A batch needs 1 to {max_operations} operations"}), 400
+
+    for i, operation in enumerate(operations):
+        error = validate(operation)
+        if error:
+            return jsonify({"error": f"Operation {i}: {error}"}), 400
+
+    atomic = bool(data.get('atomic', False))
+    results = {}
+    output = []
+    failed = False
+
+    # Read by token_required: operations are authenticated once, by this request
+    g.batch_user = current_user
+    if atomic:
+        db.session.info['defer_commit'] = True
+    try:
+        for operation in operations:
+            result = run(operation, results)
+            name = operation.get('name')
+            if name is not None:
+                results[name] = result
+            output.append({"name": name, **result})
+
+            if atomic and result["status"] >= 400:
+                failed = True
+                break
+    finally:
+        g.pop('batch_user', None)
+        db.session.info.pop('defer_commit', None)
+
+    if not atomic:
+        return jsonify({"results": output}), 200
+
+    if failed:
+        db.session.rollback()
+        return jsonify({"committed": False, "results": output}), 200
+
+    try:
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": "Internal server error"}), 500
+
+    return jsonify({"committed": True, "results": output}), 200
@@ -0,0 +1,116 @@
+
+import json
+import time
+
+from flask import Blueprint, Response, jsonify, request, current_app, stream_with_context
+from sqlalchemy import select
+
+from app.models.projects import Project
+from app.extensions import db
+from app.auth import token_required
+from app.events import feed
+from app.membership import can_access, accessible_projects
+
+events_bp = Blueprint('events', __name__)
+
+def format_event(change, resume_id):
+    return f"id: {resume_id}\nevent: {change['entity']}.{change['op']}\ndata: {json.dumps(change)}\n\n"
+
+@events_bp.route('', methods=['GET'])
+@token_required
+def stream_events(current_user):
+    """
+    Stream project and task changes as Server-Sent Events
+    ---
+    tags:
+      - Events
+    produces:
+      - text/event-stream
+    parameters:
+      - name: project_id
+        in: query
+        type: integer
+        required: false
+        description: >
+          Only stream changes of this project and its tasks. Employees only
+          get the changes of projects they are members of.
+      - in: header
+        name: Last-Event-ID
+        type: integer
+        required: false
+        description: >
+          Resume from this event ID; sent by EventSource clients when they
+          reconnect. The id of an event is the point every earlier event has
+          been sent up to, which is below the event's own ID while an
+          earlier transaction may still commit, so an event can be sent
+          again after a reconnect; the ID in its data tells repeats apart.
+    responses:
+      200:
+        description: >
+          Event stream. Each event is named entity.op (project.create,
+          project.update, project.delete, task.create, task.update,
+          task.delete, dependency.create, dependency.delete) and its data
+          holds the change with the row under data; deleting a project
+          sends a task.delete for each of its tasks before the
+          project.delete. A reset event means events since Last-Event-ID
+          are no longer available and the client has to reload. Comment
+          lines are sent as heartbeats while idle, and the stream ends
+          after CHANGE_FEED_MAX_STREAM_SECONDS for the client to reconnect.
+      400:
+        description: Invalid project ID or Last-Event-ID
+      404:
+        description: Project not found
+    """
+
+    project_id = request.args.get('project_id')
+    if project_id is not None:
+        try:
+            project_id = int(project_id)
+        except ValueError:
+            return jsonify({'error': 'Invalid ID format'}), 400
+
+        if not can_access(current_user, project_id) or \
+                not db.session.execute(select(Project.id).where(Project.id == project_id)).first():
+            return jsonify({'error': 'Project not found'}), 404
+        project_ids = {project_id}
+    else:
+        # Taken when the stream starts; a new membership shows on the next reconnect
+        project_ids = accessible_projects(current_user)
+
+    last_event_id = request.headers.get('Last-Event-ID')
+    if last_event_id is not None:
+        try:
+            last_event_id = int(last_event_id)
+        except ValueError:
+            return jsonify({'error': 'Invalid Last-Event-ID'}), 400
+
+    subscription, reset = feed.subscribe(project_ids, last_event_id)
+    db.session.close()
+
+    config = current_app.config
+    heartbeat = config.get('CHANGE_FEED_HEARTBEAT_SECONDS', 15)
+    deadline = time.monotonic() + config.get('CHANGE_FEED_MAX_STREAM_SECONDS', 300)
+
+    def generate():
+        try:
+            yield f"retry: {config.get('CHANGE_FEED_RETRY_MS', 3000)}\n\n"
+            if reset:
+                yield f"id: {subscription.resume_id}\nevent: reset\ndata: {{}}\n\n"
+
+            while not subscription.overflowed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+
+                events = feed.wait(subscription, min(heartbeat, remaining))
+                if not events:
+                    yield ": heartbeat\n\n"
+                for resume_id, change in events:
+                    yield format_event(change, resume_id)
+        finally:
+            feed.unsubscribe(subscription)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
@@ -0,0 +1,116 @@
+import os
+
+from flask import Blueprint, jsonify, send_file
+
+from app.models.jobs import Job, JobStatus
+from app.jobs import jobs
+from app.extensions import db
+from app.auth import token_required
+
+jobs_bp = Blueprint('jobs', __name__)
+
+@jobs_bp.route('/<job_id>', methods=['GET'])
+@token_required
+def get_job(current_user, job_id):
+    """
+    Get background job status
+    ---
+    tags:
+      - Jobs
+    parameters:
+      - in: path
+        name: job_id
+        required: true
+        schema:
+          type: integer
+    responses:
+      200:
+        description: Job retrieved successfully
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                id:
+                  type: integer
+                type:
+                  type: string
+                status:
+                  type: string
+                  enum: [queued, running, succeeded, failed]
+                progress:
+                  type: integer
+                  description: Percent done
+                attempts:
+                  type: integer
+                result:
+                  type: object
+                error:
+                  type: string
+                created_at:
+                  type: string
+                started_at:
+                  type: string
+                finished_at:
+                  type: string
+      404:
+        description: Job not found
+    """
+
+    try:
+        job_id = int(job_id)
+    except ValueError:
+        return jsonify({'error': 'Invalid ID format'}), 400
+
+    job = db.session.get(Job, job_id)
+    if not job or (current_user.role.value != 'manager' and job.created_by != current_user.id):
+        return jsonify({'error': 'Job not found'}), 404
+
+    return jsonify(job.to_dict()), 200
+
+@jobs_bp.route('/<job_id>/download', methods=['GET'])
+@token_required
+def download_job_output(current_user, job_id):
+    """
+    Download the file written by a finished export job
+    ---
+    tags:
+      - Jobs
+    parameters:
+      - in: path
+        name: job_id
+        required: true
+        schema:
+          type: integer
+    responses:
+      200:
+        description: The exported project and its tasks
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                project:
+                  type: object
+                tasks:
+                  type: array
+                  items:
+                    type: object
+      404:
+        description: Job not found, not finished or without output
+    """
+
+    try:
+        job_id = int(job_id)
+    except ValueError:
+        return jsonify({'error': 'Invalid ID format'}), 400
+
+    job = db.session.get(Job, job_id)
+    if not job or (current_user.role.value != 'manager' and job.created_by != current_user.id):
+        return jsonify({'error': 'Job not found'}), 404
+
+    path = jobs.export_path(job.id)
+    if job.status != JobStatus.succeeded or not os.path.exists(path):
+        return jsonify({'error': 'Job output not found'}), 404
+
+    return send_file(path, mimetype='application/json', as_attachment=True, download_name=f"{job.type}-{job.id}.json")
@@ -1,16 +1,154 @@
 
-from flask import Blueprint, jsonify, request
+import json
+import os
+
+from flask import Blueprint, Response, jsonify, request, current_app
+from sqlalchemy import delete, func, select, tuple_
 
 from app.models.projects import Project
 from app.models.tasks import Task
+from app.models.users import User
+from app.models.project_members import ProjectMember
 from app.extensions import db
 from app.auth import token_required, manager_required
+from app.coalescing import coalesced, access_scope
+from app.batch import parse_ids, fetch_by_ids
+from app.pagination import page_args, stream_page
+from app.idempotency import idempotent
+from app.jobs import jobs
+from app.events import record_change
+from app import audit, dependencies, ranks, subtasks
+from app.sync import record_deletes
+from app.membership import can_access, filter_projects, add_member, remove_member, remove_project
+from app.reads import PROJECT_COLUMNS, TASK_COLUMNS, MEMBER_COLUMNS, row_dict, fetch_one
+from app.writes import row_exists, update_returning, delete_returning, if_match_version, etag, VersionConflict
 
 projects_bp = Blueprint('projects', __name__)
 
+def parse_includes():
+    """
+    Return the task limit when ``include=tasks`` is asked for, else None.
+    Raises ValueError with a client-facing message on bad input.
+    """
+    include = request.args.get('include')
+    if include is None:
+        return None
+
+    for name in include.split(','):
+        if name.strip() != 'tasks':
+            raise ValueError(f'Unknown include: {name.strip()}')
+
+    limit = request.args.get('tasks_limit', 10, int)
+    return min(max(limit, 1), current_app.config.get('MAX_PER_PAGE', 100))
+
+def load_tasks(project_ids, limit):
+    """
+    Load the first ``limit`` tasks (in rank order) of each of ``project_ids`` with one
+    query, and return them grouped by project ID.
+
+    Works like ``selectinload(Project.tasks)``, a single ``WHERE project_id IN
+    (...)`` for all projects, but ranks the tasks per project so the limit
+    applies to each project and not to the whole result.
+    """
+    ranked = select(
+        *TASK_COLUMNS,
+        func.row_number().over(partition_by=Task.project_id, order_by=(Task.rank, Task.id)).label('position')
+    ).where(Task.project_id.in_(project_ids)).subquery()
+
+    rows = db.session.execute(
+        select(*[ranked.c[column.key] for column in TASK_COLUMNS])
+        .where(ranked.c.position <= limit)
+        .order_by(ranked.c.project_id, ranked.c.rank, ranked.c.id)
+    ).mappings()
+
+    tasks = {project_id: [] for project_id in project_ids}
+    for row in rows:
+        tasks[row["project_id"]].append(dict(row))
+    return tasks
+
+def include_tasks(limit):
+    """An ``expand`` for app.pagination.stream_page adding each project's tasks."""
+    def expand(projects, items):
+        tasks = load_tasks([item["id"] for item in items], limit)
+        for item in items:
+            item["tasks"] = tasks[item["id"]]
+    return expand
+
+@jobs.handler('delete_project', max_concurrency=2)
+def delete_project_job(job, payload):
+    project_id = payload['project_id']
+    chunk_size = current_app.config.get('JOBS_CHUNK_SIZE', 500)
+    total = Task.query.filter_by(project_id=project_id).count()
+    deleted = 0
+
+    # Tasks go in committed chunks so a restarted job picks up where it stopped
+    while True:
+        task_ids = [task_id for (task_id,) in db.session.query(Task.id)
+                    .filter_by(project_id=project_id)
+                    .limit(chunk_size)]
+        if not task_ids:
+            break
+
+        db.session.execute(delete(Task).where(Task.id.in_(task_ids)))
+        subtasks.remove_tasks(task_ids)
+        dependencies.remove_tasks(task_ids)
+        audit.record('delete', Task, task_ids)
+        record_deletes(Task, task_ids, project_id)
+        for task_id in task_ids:
+            record_change('task', 'delete', task_id, project_id, {"id": task_id})
+        deleted += len(task_ids)
+        job.progress(min(99, deleted * 100 // max(total, 1)))
+
+    remove_project(project_id)
+    if delete_returning(Project, project_id):
+        record_change('project', 'delete', project_id, project_id, {"id": project_id})
+    db.session.commit()
+
+    return {"project_id": project_id, "deleted_tasks": deleted}
+
+@jobs.handler('export_project', max_concurrency=2)
+def export_project_job(job, payload):
+    project_id = payload['project_id']
+    project = db.session.get(Project, project_id)
+    if not project:
+        raise LookupError('Project not found')
+
+    chunk_size = current_app.config.get('JOBS_CHUNK_SIZE', 500)
+    total = Task.query.filter_by(project_id=project_id).count()
+    exported = 0
+    last_id = 0
+
+    # The export goes to a file chunk by chunk; the job result only points to it
+    path = jobs.export_path(job.id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.part', 'w') as f:
+        f.write(f'{{"project": {json.dumps(project.to_dict())}, "tasks": [')
+
+        while True:
+            chunk = Task.query \
+              .filter(Task.project_id == project_id, Task.id > last_id) \
+              .order_by(Task.id) \
+              .limit(chunk_size) \
+              .all()
+            if not chunk:
+                break
+
+            for task in chunk:
+                f.write((', ' if exported else '') + json.dumps(task.to_dict()))
+                exported += 1
+            last_id = chunk[-1].id
+            db.session.expunge_all()
+            job.progress(min(99, exported * 100 // max(total, 1)), commit=False)
+
+        f.write(']}')
+    os.replace(path + '.part', path)
+
+    return {"project_id": project_id, "tasks": exported, "download": f"/api/jobs/{job.id}/download"}
+
 @projects_bp.route('', methods=['POST'])
 @token_required
 @manager_required
+@idempotent
 def create_project(current_user):
     """
     Create a new project
@@ -18,6 +156,11 @@ def create_project(current_user):
     tags:
       - Projects
     parameters:
+      - in: header
+        name: Idempotency-Key
+        type: string
+        required: false
+        description: Retries with the same key and body get the stored response instead of creating a duplicate
       - in: body
         name: project
         description: The project to create
@@ -63,6 +206,10 @@ def create_project(current_user):
 
     db.session.add(new_project)
     try:
+        db.session.flush()
+        # The creator keeps access should they stop being a manager
+        add_member(new_project.id, current_user.id)
+        record_change('project', 'create', new_project.id, new_project.id, new_project.to_dict())
         db.session.commit()
     except Exception as e:
         db.session.rollback()
@@ -76,13 +223,36 @@ def create_project(current_user):
 
 @projects_bp.route('', methods=['GET'])
 @token_required
+@coalesced(access_scope)
 def get_projects(current_user):
     """
-    Get projects with pagination
+    Get projects with pagination, or a batch of projects by ID
+
+    Employees only see the projects they are members of, managers see all.
     ---
     tags:
       - Projects
     parameters:
+      - name: include
+        in: query
+        type: string
+        enum: [tasks]
+        required: false
+        description: tasks adds each project's first tasks, in rank order, under tasks
+      - name: tasks_limit
+        in: query
+        type: integer
+        required: false
+        default: 10
+        description: Number of tasks included per project, at most MAX_PER_PAGE (100)
+      - name: ids
+        in: query
+        type: string
+        required: false
+        description: >
+          Comma separated project IDs (e.g. 1,2,3). When given, pagination is
+          ignored and the response has the found projects in request order
+          under data plus the unknown IDs under missing.
       - name: page
         in: query
         type: integer
@@ -94,7 +264,7 @@ def get_projects(current_user):
         type: integer
         required: false
         default: 10
-        description: Number of projects per page
+        description: Number of projects per page, at most MAX_PER_PAGE (100)
     responses:
       200:
         description: Projects retrieved successfully
@@ -106,6 +276,9 @@ def get_projects(current_user):
                 total:
                   type: integer
                   description: Total number of projects
+                total_exact:
+                  type: boolean
+                  description: False when total is a cached or estimated count (see PAGINATION_COUNT)
                 page:
                   type: integer
                   description: Current page number
@@ -126,34 +299,66 @@ def get_projects(current_user):
                         type: string
                       description:
                         type: string
+                      tasks:
+                        type: array
+                        description: Only with include=tasks
+                        items:
+                          type: object
     """
 
-    page = request.args.get("page", 1, int)
-    limit = request.args.get("per_page", 10, int)
+    try:
+        tasks_limit = parse_includes()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-    pagination = Project.query.paginate(page=page, per_page=limit, error_out=False)
+    ids = request.args.get("ids")
+    if ids is not None:
+        try:
+            ids = parse_ids(ids)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
-    return jsonify({
-        "total": pagination.total,
-        "page": pagination.page,
-        "per_page": pagination.per_page,
-        "pages": pagination.pages,
-        "data": [{
-          "id": project.id, 
-          "name": project.name, 
-          "description": project.description} for project in pagination.items
-        ]
-    }), 200
+        projects, missing = fetch_by_ids(filter_projects(select(*PROJECT_COLUMNS), current_user, Project.id), Project, ids)
+        if tasks_limit is not None and projects:
+            include_tasks(tasks_limit)(projects, projects)
+
+        return jsonify({
+            "data": projects,
+            "missing": missing
+        }), 200
+
+    page, limit = page_args()
+
+    statement = filter_projects(
+        select(Project.id, Project.name, Project.description), current_user, Project.id
+    ).order_by(Project.id)
+
+    return stream_page(statement, page, limit, expand=include_tasks(tasks_limit) if tasks_limit is not None else None)
 
 @projects_bp.route('/<project_id>', methods=['GET'])
 @token_required
+@coalesced(access_scope)
 def get_project(current_user, project_id):
     """
     Get project by ID
+
+    Employees only see the projects they are members of, managers see all.
     ---
     tags:
       - Projects
     parameters:
+      - name: include
+        in: query
+        type: string
+        enum: [tasks]
+        required: false
+        description: tasks adds each project's first tasks, in rank order, under tasks
+      - name: tasks_limit
+        in: query
+        type: integer
+        required: false
+        default: 10
+        description: Number of tasks included per project, at most MAX_PER_PAGE (100)
       - in: path
         name: project_id
         required: true
@@ -161,7 +366,7 @@ def get_project(current_user, project_id):
           type: integer
     responses:
       200:
-        description: Project retrieved successfully
+        description: Project retrieved successfully, its version is also sent as the ETag
         content:
           application/json:
             schema:
@@ -173,6 +378,13 @@ def get_project(current_user, project_id):
                   type: string
                 description:
                   type: string
+                version:
+                  type: integer
+                tasks:
+                  type: array
+                  description: Only with include=tasks
+                  items:
+                    type: object
       404:
         description: Project not found
     """
@@ -182,22 +394,33 @@ def get_project(current_user, project_id):
     except ValueError:
         return jsonify({'error': 'Invalid ID format'}), 400
 
-    project = Project.query.get(project_id)
+    try:
+        tasks_limit = parse_includes()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Projects the user is not a member of do not exist for them
+    if not can_access(current_user, project_id):
+        return jsonify({'error': 'Project not found'}), 404
+
+    project = fetch_one(Project, PROJECT_COLUMNS, project_id)
     if not project:
         return jsonify({'error': 'Project not found'}), 404
 
-    return jsonify({
-        "id": project.id,
-        "name": project.name,
-        "description": project.description
-    }), 200
+    if tasks_limit is not None:
+        include_tasks(tasks_limit)([project], [project])
+
+    return jsonify(project), 200, etag(project["version"])
 
-@projects_bp.route('/<project_id>', methods=['PUT'])
+@projects_bp.route('/<project_id>', methods=['PUT', 'PATCH'])
 @token_required
 @manager_required
 def update_project(current_user, project_id):
     """
     Update project by ID
+
+    PUT and PATCH both only change the fields given; PATCH also rejects
+    fields that cannot be updated.
     ---
     tags:
       - Projects
@@ -207,6 +430,11 @@ def update_project(current_user, project_id):
         required: true
         schema:
           type: integer
+      - in: header
+        name: If-Match
+        type: string
+        required: false
+        description: ETag of the version being edited; the update fails with 412 if the project changed since
       - in: body
         name: project
         description: The project data to update
@@ -219,7 +447,7 @@ def update_project(current_user, project_id):
               type: string
     responses:
       200:
-        description: Project updated successfully
+        description: Project updated successfully, the new version is also sent as the ETag
         content:
           application/json:
             schema:
@@ -231,8 +459,12 @@ def update_project(current_user, project_id):
                   type: string
                 description:
                   type: string
+                version:
+                  type: integer
       404:
         description: Project not found
+      412:
+        description: The project was modified since the version given in If-Match
     """
 
     try:
@@ -240,31 +472,45 @@ def update_project(current_user, project_id):
     except ValueError:
         return jsonify({'error': 'Invalid ID format'}), 400
     
-    project = Project.query.get(project_id)
-    if not project:
-        return jsonify({'error': 'Project not found'}), 404
-    
-    data = request.get_json()
+    def invalid(error):
+        # A missing project is reported before a bad body; only this path pays for the lookup
+        if not row_exists(Project, project_id):
+            return jsonify({'error': 'Project not found'}), 404
+        return jsonify({"error": error}), 400
+
+    data = request.get_json(silent=True)
     if not data:
-        return jsonify({"error": "Invalid input"}), 400
+        return invalid("Invalid input")
     
     data_fields = ['name', 'description']
 
-    for field in data_fields:
-        if field in data:
-            setattr(project, field, data[field])
+    if request.method == 'PATCH':
+        for field in data:
+            if field not in data_fields:
+                return invalid(f"Unknown field: {field}")
+
+    values = {field: data[field] for field in data_fields if field in data}
 
     try:
+        project = update_returning(
+            Project, project_id, values,
+            [Project.id, Project.name, Project.description, Project.version],
+            expected_version=if_match_version()
+        )
+        if project:
+            record_change('project', 'update', project_id, project_id, dict(project))
         db.session.commit()
+    except VersionConflict:
+        db.session.rollback()
+        return jsonify({'error': 'Project was modified by another request'}), 412
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": "Internal server error"}), 500
 
-    return jsonify({
-        "id": project.id,
-        "name": project.name,
-        "description": project.description
-    }), 200
+    if not project:
+        return jsonify({'error': 'Project not found'}), 404
+
+    return jsonify(dict(project)), 200, etag(project["version"])
 
 @projects_bp.route('/<project_id>', methods=['DELETE'])
 @token_required
@@ -281,9 +527,17 @@ def delete_project(current_user, project_id):
         required: true
         schema:
           type: integer
+      - name: async
+        in: query
+        type: boolean
+        required: false
+        default: false
+        description: Delete in a background job and return its ID right away
     responses:
       200:
         description: Project deleted successfully
+      202:
+        description: Deletion job queued, poll /api/jobs/{id} for progress
       404:
         description: Project not found
     """
@@ -292,23 +546,187 @@ def delete_project(current_user, project_id):
         project_id = int(project_id)
     except ValueError:
         return jsonify({'error': 'Invalid ID format'}), 400
-    
-    project = Project.query.get(project_id)
-    if not project:
-        return jsonify({'error': 'Project not found'}), 404
 
-    db.session.delete(project)
+    if request.args.get('async', 'false').lower() in ('1', 'true'):
+        if not db.session.execute(select(Project.id).where(Project.id == project_id)).first():
+            return jsonify({'error': 'Project not found'}), 404
+
+        job = jobs.enqueue('delete_project', {'project_id': project_id}, user=current_user)
+        return jsonify(job.to_dict()), 202, {'Location': f'/api/jobs/{job.id}'}
+
     try:
+        task_ids = db.session.execute(select(Task.id).where(Task.project_id == project_id)).scalars().all()
+        subtasks.remove_tasks(select(Task.id).where(Task.project_id == project_id))
+        dependencies.remove_project(project_id)
+        db.session.execute(delete(Task).where(Task.project_id == project_id))
+        audit.record('delete', Task, task_ids)
+        record_deletes(Task, task_ids, project_id)
+        for task_id in task_ids:
+            record_change('task', 'delete', task_id, project_id, {"id": task_id})
+        remove_project(project_id)
+        deleted = delete_returning(Project, project_id)
+        if deleted:
+            record_change('project', 'delete', project_id, project_id, {"id": project_id})
         db.session.commit()
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Internal server error'}), 500
 
+    if not deleted:
+        return jsonify({'error': 'Project not found'}), 404
+
     return jsonify({'message': 'Project deleted successfully'}), 200
 
+@projects_bp.route('/<project_id>/export', methods=['POST'])
+@token_required
+@manager_required
+def export_project(current_user, project_id):
+    """
+    Export a project with all its tasks in a background job
+    ---
+    tags:
+      - Projects
+    parameters:
+      - in: path
+        name: project_id
+        required: true
+        schema:
+          type: integer
+    responses:
+      202:
+        description: >
+          Export job queued, poll /api/jobs/{id}; once it succeeded the
+          project and its tasks are served as JSON from the job result's
+          download link, /api/jobs/{id}/download
+      404:
+        description: Project not found
+    """
+
+    try:
+        project_id = int(project_id)
+    except ValueError:
+        return jsonify({'error': 'Invalid ID format'}), 400
+
+    if not db.session.get(Project, project_id):
+        return jsonify({'error': 'Project not found'}), 404
+
+    job = jobs.enqueue('export_project', {'project_id': project_id}, user=current_user)
+    return jsonify(job.to_dict()), 202, {'Location': f'/api/jobs/{job.id}'}
+
+@projects_bp.route('/<project_id>/members', methods=['GET'])
+@token_required
+def get_members(current_user, project_id):
+    """
+    Get the members of a project
+    ---
+    tags:
+      - Projects
+    parameters:
+      - in: path
+        name: project_id
+        required: true
+        schema:
+          type: integer
+    responses:
+      200:
+        description: Members retrieved successfully
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                data:
+                  type: array
+                  items:
+                    type: object
+                    properties:
+                      user_id:
+                        type: integer
+                      project_id:
+                        type: integer
+                      created_at:
+                        type: string
+      404:
+        description: Project not found
+    """
+
+    try:
+        project_id = int(project_id)
+    except ValueError:
+        return jsonify({'error': 'Invalid ID format'}), 400
+
+    if not can_access(current_user, project_id) or not row_exists(Project, project_id):
+        return jsonify({'error': 'Project not found'}), 404
+
+    members = db.session.execute(
+        select(*MEMBER_COLUMNS)
+        .where(ProjectMember.project_id == project_id)
+        .order_by(ProjectMember.user_id)
+    ).mappings()
+
+    return jsonify({"data": [row_dict(member) for member in members]}), 200
+
+@projects_bp.route('/<project_id>/members/<user_id>', methods=['PUT', 'DELETE'])
+@token_required
+@manager_required
+def update_member(current_user, project_id, user_id):
+    """
+    Give a user access to a project (PUT) or take it away (DELETE)
+    ---
+    tags:
+      - Projects
+    parameters:
+      - in: path
+        name: project_id
+        required: true
+        schema:
+          type: integer
+      - in: path
+        name: user_id
+        required: true
+        schema:
+          type: integer
+    responses:
+      200:
+        description: The user already was a member (PUT), or no longer is one (DELETE)
+      201:
+        description: The user was made a member
+      404:
+        description: Project or user not found, or (DELETE) the user is not a member
+    """
+
+    try:
+        project_id = int(project_id)
+        user_id = int(user_id)
+    except ValueError:
+        return jsonify({'error': 'Invalid ID format'}), 400
+
+    if not row_exists(Project, project_id):
+        return jsonify({'error': 'Project not found'}), 404
+    if not row_exists(User, user_id):
+        return jsonify({'error': 'User not found'}), 404
+
+    try:
+        if request.method == 'PUT':
+            changed = add_member(project_id, user_id)
+        else:
+            changed = remove_member(project_id, user_id)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": "Internal server error"}), 500
+
+    if request.method == 'PUT':
+        return jsonify({"project_id": project_id, "user_id": user_id}), 201 if changed else 200
+
+    if not changed:
+        return jsonify({'error': 'User is not a member of the project'}), 404
+    return jsonify({'message': 'Member removed successfully'}), 200
+
 @projects_bp.route('/<project_id>/tasks', methods=['POST'])
 @token_required
 @manager_required
+@idempotent
 def create_task(current_user, project_id):
     """
     Create a new task under a project
@@ -316,6 +734,11 @@ def create_task(current_user, project_id):
     tags:
       - Tasks
     parameters:
+      - in: header
+        name: Idempotency-Key
+        type: string
+        required: false
+        description: Retries with the same key and body get the stored response instead of creating a duplicate
       - in: path
         name: project_id
         required: true
@@ -333,6 +756,11 @@ def create_task(current_user, project_id):
               type: string
             description:
               type: string
+            assignee_id:
+              type: integer
+            parent_id:
+              type: integer
+              description: Makes the task a subtask of this task of the same project
     responses:
       201:
         description: Task created successfully
@@ -349,6 +777,12 @@ def create_task(current_user, project_id):
                   type: string
                 project_id:
                   type: integer
+                assignee_id:
+                  type: integer
+                parent_id:
+                  type: integer
+      400:
+        description: Invalid input, unknown assignee or parent task not in the project
     """
 
     try:
@@ -369,15 +803,32 @@ def create_task(current_user, project_id):
     for field in data_fields:
         if field not in data:
             return jsonify({"error": f"Missing field: {field}"}), 400
+
+    assignee_id = data.get('assignee_id')
+    if assignee_id is not None and (
+        not isinstance(assignee_id, int) or isinstance(assignee_id, bool) or not db.session.get(User, assignee_id)
+    ):
+        return jsonify({"error": "Assignee not found"}), 400
+
+    parent_id = data.get('parent_id')
+    if parent_id is not None and (
+        not isinstance(parent_id, int) or isinstance(parent_id, bool) or not subtasks.parent_in_project(parent_id, project_id)
+    ):
+        return jsonify({"error": "Parent task not found in this project"}), 400
         
     new_task = Task(
         title=data['title'],
         description=data.get('description'),
-        project_id=project_id
+        project_id=project_id,
+        assignee_id=assignee_id,
+        parent_id=parent_id
     )
 
     db.session.add(new_task)
     try:
+        db.session.flush()
+        subtasks.add_task(new_task.id, parent_id)
+        record_change('task', 'create', new_task.id, project_id, new_task.to_dict())
         db.session.commit()
     except Exception as e:
         db.session.rollback()
@@ -387,14 +838,19 @@ def create_task(current_user, project_id):
         "id": new_task.id,
         "title": new_task.title,
         "description": new_task.description,
-        "project_id": new_task.project_id
+        "project_id": new_task.project_id,
+        "assignee_id": new_task.assignee_id,
+        "parent_id": new_task.parent_id
     }), 201
 
 @projects_bp.route('/<project_id>/tasks', methods=['GET'])
 @token_required
+@coalesced(access_scope)
 def get_tasks(current_user, project_id):
     """
-    Get tasks under a project with pagination
+    Get tasks under a project in rank order, by page or by cursor
+
+    Employees only see the projects they are members of, managers see all.
     ---
     tags:
       - Tasks
@@ -416,7 +872,15 @@ def get_tasks(current_user, project_id):
         type: integer
         required: false
         default: 10
-        description: Number of tasks per page
+        description: Number of tasks per page, at most MAX_PER_PAGE (100)
+      - name: cursor
+        in: query
+        type: string
+        required: false
+        description: >
+          next_cursor of the previous response. The page after it is read
+          with an index seek on (project_id, rank, id) and sent as
+          {next_cursor, data}, without page or total.
     responses:
       200:
         description: Tasks retrieved successfully
@@ -428,6 +892,9 @@ def get_tasks(current_user, project_id):
                 total:
                   type: integer
                   description: Total number of tasks
+                total_exact:
+                  type: boolean
+                  description: False when total is a cached or estimated count (see PAGINATION_COUNT)
                 page:
                   type: integer
                   description: Current page number
@@ -437,6 +904,9 @@ def get_tasks(current_user, project_id):
                 pages:
                   type: integer
                   description: Total number of pages
+                next_cursor:
+                  type: string
+                  description: Pass as cursor to read on from the end of this page, null on the last page
                 data:
                   type: array
                   items:
@@ -451,32 +921,114 @@ def get_tasks(current_user, project_id):
                       project_id:
                         type: integer
                         description: ID of the project this task belongs to
+                      rank:
+                        type: string
+                        description: Position key, tasks sort by rank then ID
+      400:
+        description: Invalid ID or cursor
     """
-    page = request.args.get("page", 1, int)
-    limit = request.args.get("per_page", 10, int)
-    
+    page, limit = page_args()
+
     try:
         project_id = int(project_id)
     except ValueError:
         return jsonify({'error': 'Invalid ID format'}), 400
 
-    project = Project.query.get(project_id)
-    if not project:
+    if not can_access(current_user, project_id):
+        return jsonify({'error': 'Project not found'}), 404
+
+    if not row_exists(Project, project_id):
         return jsonify({'error': 'Project not found'}), 404
 
-    pagination = Task.query \
-      .filter_by(project_id=project_id) \
-      .paginate(page=page, per_page=limit, error_out=False)
+    statement = select(Task.id, Task.title, Task.description, Task.project_id, Task.rank) \
+      .where(Task.project_id == project_id) \
+      .order_by(Task.rank, Task.id)
+    next_cursor = lambda task: ranks.encode_cursor(task["rank"], task["id"])
+
+    cursor = request.args.get('cursor')
+    if cursor is None:
+        return stream_page(statement, page, limit, cursor=next_cursor)
+
+    try:
+        position = ranks.decode_cursor(cursor)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    tasks = db.session.execute(
+        statement.where(tuple_(Task.rank, Task.id) > tuple_(*position)).limit(limit + 1)
+    ).mappings().all()
 
     return jsonify({
-        "total": pagination.total,
-        "page": pagination.page,
-        "per_page": pagination.per_page,
-        "pages": pagination.pages,
-        "data": [{
-          "id": task.id,
-          "title": task.title,
-          "description": task.description,
-          "project_id": task.project_id} for task in pagination.items
-        ]
-    }), 200
\ No newline at end of file
+        "next_cursor": next_cursor(tasks[limit - 1]) if len(tasks) > limit else None,
+        "data": [row_dict(task) for task in tasks[:limit]]
+    }), 200
+
+@projects_bp.route('/<project_id>/schedule', methods=['GET'])
+@token_required
+@coalesced(access_scope)
+def get_schedule(current_user, project_id):
+    """
+    Get the order the project's tasks can be done in, given their dependencies
+
+    Employees only see the projects they are members of, managers see all.
+    ---
+    tags:
+      - Tasks
+    parameters:
+      - in: path
+        name: project_id
+        required: true
+        schema:
+          type: integer
+    responses:
+      200:
+        description: >
+          Served from a per-project cache that is brought up to date from
+          the change event log, see app.dependencies.ScheduleCache.
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                project_id:
+                  type: integer
+                tasks:
+                  type: integer
+                  description: Number of tasks
+                dependencies:
+                  type: integer
+                  description: Number of dependencies
+                order:
+                  type: array
+                  description: >
+                    Every task ID, each after the tasks it depends on; tasks
+                    free to go in any order keep their rank order
+                  items:
+                    type: integer
+                critical_path:
+                  type: array
+                  description: >
+                    The longest chain of tasks that each depend on the one
+                    before, first task first; each task counts as one unit of work
+                  items:
+                    type: integer
+      404:
+        description: Project not found
+      409:
+        description: The project's dependencies have a cycle
+    """
+
+    try:
+        project_id = int(project_id)
+    except ValueError:
+        return jsonify({'error': 'Invalid ID format'}), 400
+
+    if not can_access(current_user, project_id) or not row_exists(Project, project_id):
+        return jsonify({'error': 'Project not found'}), 404
+
+    try:
+        body = dependencies.schedules.schedule(project_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 409
+
+    return Response(body, status=200, mimetype='application/json')
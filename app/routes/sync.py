@@ -0,0 +1,118 @@
+from datetime import timedelta
+
+from flask import Blueprint, jsonify, request, current_app
+
+from app.auth import token_required
+from app.sync import START, STREAMS, parse_since, decode_cursor, encode_cursor, read_changes, retention_horizon
+from app.models.timestamps import utcnow
+from app.membership import sees_all_projects
+
+sync_bp = Blueprint('sync', __name__)
+
+@sync_bp.route('', methods=['GET'])
+@token_required
+def get_changes(current_user):
+    """
+    Get the projects, tasks and users changed since the last sync
+    ---
+    tags:
+      - Sync
+    parameters:
+      - name: updated_since
+        in: query
+        type: string
+        format: date-time
+        required: false
+        description: >
+          Only rows created, updated or deleted after this time (ISO 8601).
+          Without it and without cursor, everything is sent.
+      - name: cursor
+        in: query
+        type: string
+        required: false
+        description: cursor of the previous response; takes precedence over updated_since
+    responses:
+      200:
+        description: >
+          Changed rows, up to SYNC_PAGE_SIZE per entity, plus the IDs of
+          deleted rows. Keep the cursor for the next sync and call again
+          right away while has_more is true. Rows changed in the last
+          SYNC_LAG_SECONDS can be sent twice. Employees only get the
+          projects and tasks of projects they are members of.
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                projects:
+                  type: array
+                  items:
+                    type: object
+                tasks:
+                  type: array
+                  items:
+                    type: object
+                users:
+                  type: array
+                  items:
+                    type: object
+                deleted:
+                  type: object
+                  description: Deleted IDs per entity (projects, tasks, users)
+                cursor:
+                  type: string
+                has_more:
+                  type: boolean
+                resync:
+                  type: boolean
+                  description: >
+                    The user's project memberships changed: the projects and
+                    tasks of this response and of the following ones, until
+                    has_more is false, replace the ones the client has
+      400:
+        description: Invalid updated_since or cursor
+      410:
+        description: >
+          The deletes since then are no longer kept
+          (SYNC_TOMBSTONE_RETAIN_DAYS); sync from scratch without
+          updated_since
+    """
+
+    cursor = request.args.get('cursor')
+    updated_since = request.args.get('updated_since')
+
+    access = None if sees_all_projects(current_user) else current_user.membership_version
+    resync = False
+
+    if cursor is not None:
+        try:
+            positions, cursor_access, resync = decode_cursor(cursor)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        if cursor_access != access:
+            # The projects the user can access changed, send their projects and tasks again
+            positions['projects'] = positions['tasks'] = START
+            resync = True
+    elif updated_since is not None:
+        try:
+            since = parse_since(updated_since)
+        except ValueError:
+            return jsonify({'error': 'Invalid updated_since'}), 400
+        positions = {stream: (since, 0) for stream in STREAMS}
+    else:
+        positions = {stream: START for stream in STREAMS}
+        # Deletes from before a full sync are not needed, the ones during it are
+        positions['deleted'] = (utcnow() - timedelta(seconds=current_app.config.get('SYNC_LAG_SECONDS', 5)), 0)
+
+    if positions['deleted'][0] < retention_horizon():
+        return jsonify({'error': 'Deletes since then are no longer kept, sync from scratch'}), 410
+
+    changes, positions, has_more = read_changes(positions, current_app.config.get('SYNC_PAGE_SIZE', 500), current_user)
+
+    return jsonify({
+        **changes,
+        "cursor": encode_cursor(positions, access, resync and has_more),
+        "has_more": has_more,
+        "resync": resync
+    }), 200
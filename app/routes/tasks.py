@@ -0,0 +1,781 @@
+from flask import Blueprint, jsonify, request
+from sqlalchemy import delete, select
+
+from app.models.jobs import Job, JobStatus
+from app.models.projects import Project
+from app.models.tasks import Task
+from app.models.task_closure import TaskClosure
+from app.models.task_dependencies import TaskDependency
+from app.models.users import User
+from app.extensions import db
+from app.auth import token_required, manager_required
+from app.coalescing import coalesced, access_scope
+from app.batch import parse_ids, fetch_by_ids
+from app.events import record_change
+from app.jobs import jobs
+from app import audit, dependencies, ranks, subtasks
+from app.membership import filter_projects
+from app.pagination import stream_rows
+from app.reads import TASK_COLUMNS, row_dict
+from app.sync import record_deletes
+from app.writes import update_returning, if_match_version, etag, VersionConflict
+
+tasks_bp = Blueprint('tasks', __name__)
+
+@tasks_bp.route('', methods=['GET'])
+@token_required
+@coalesced(access_scope)
+def get_tasks_by_ids(current_user):
+    """
+    Get a batch of tasks by ID
+    ---
+    tags:
+      - Tasks
+    parameters:
+      - name: ids
+        in: query
+        type: string
+        required: true
+        description: Comma separated task IDs (e.g. 1,2,3)
+    responses:
+      200:
+        description: Tasks retrieved successfully
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                data:
+                  type: array
+                  description: Found tasks, in request order
+                  items:
+                    type: object
+                    properties:
+                      id:
+                        type: integer
+                      title:
+                        type: string
+                      description:
+                        type: string
+                      project_id:
+                        type: integer
+                      assignee_id:
+                        type: integer
+                      version:
+                        type: integer
+                missing:
+                  type: array
+                  description: Requested IDs that do not exist, or are in projects the user is not a member of
+                  items:
+                    type: integer
+      400:
+        description: Missing, malformed or too many IDs
+    """
+
+    ids = request.args.get("ids")
+    if ids is None:
+        return jsonify({'error': 'Missing query parameter: ids'}), 400
+
+    try:
+        ids = parse_ids(ids)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    tasks, missing = fetch_by_ids(filter_projects(select(*TASK_COLUMNS), current_user, Task.project_id), Task, ids)
+    return jsonify({
+        "data": tasks,
+        "missing": missing
+    }), 200
+
+@tasks_bp.route('/<task_id>/assignee', methods=['PUT', 'DELETE'])
+@token_required
+@manager_required
+def assign_task(current_user, task_id):
+    """
+    Assign a task to a user (PUT) or unassign it (DELETE)
+    ---
+    tags:
+      - Tasks
+    parameters:
+      - in: path
+        name: task_id
+        required: true
+        schema:
+          type: integer
+      - in: header
+        name: If-Match
+        type: string
+        required: false
+        description: ETag of the task version being edited
+      - in: body
+        name: assignee
+        description: Only for PUT
+        schema:
+          type: object
+          required:
+            - assignee_id
+          properties:
+            assignee_id:
+              type: integer
+    responses:
+      200:
+        description: Task assignment updated
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                id:
+                  type: integer
+                title:
+                  type: string
+                description:
+                  type: string
+                project_id:
+                  type: integer
+                assignee_id:
+                  type: integer
+                version:
+                  type: integer
+      400:
+        description: Missing or unknown assignee
+      404:
+        description: Task not found
+      412:
+        description: The task was modified since the version given in If-Match
+    """
+
+    try:
+        task_id = int(task_id)
+    except ValueError:
+        return jsonify({'error': 'Invalid ID format'}), 400
+
+    assignee_id = None
+    if request.method == 'PUT':
+        data = request.get_json()
+        if not data or 'assignee_id' not in data:
+            return jsonify({"error": "Missing field: assignee_id"}), 400
+
+        assignee_id = data['assignee_id']
+        if not isinstance(assignee_id, int) or isinstance(assignee_id, bool) or not db.session.execute(
+            select(User.id).where(User.id == assignee_id)
+        ).first():
+            return jsonify({"error": "Assignee not found"}), 400
+
+    try:
+        task = update_returning(
+            Task, task_id, {'assignee_id': assignee_id}, TASK_COLUMNS,
+            expected_version=if_match_version()
+        )
+        if task:
+            record_change('task', 'update', task_id, task["project_id"], dict(task))
+        db.session.commit()
+    except VersionConflict:
+        db.session.rollback()
+        return jsonify({'error': 'Task was modified by another request'}), 412
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": "Internal server error"}), 500
+
+    if not task:
+        return jsonify({'error': 'Task not found'}), 404
+
+    return jsonify(dict(task)), 200, etag(task["version"])
+
+@jobs.handler('rebalance_ranks', max_concurrency=1)
+def rebalance_ranks_job(job, payload):
+    project_id = payload['project_id']
+    # Moves lock the project row too, so none of them runs between the read and the writes
+    if not db.session.execute(select(Project.id).where(Project.id == project_id).with_for_update()).first():
+        return {"project_id": project_id, "ranked_tasks": 0}
+
+    ranked = ranks.rebalance(project_id)
+    db.session.commit()
+    return {"project_id": project_id, "ranked_tasks": ranked}
+
+def schedule_rebalance(project_id, user):
+    """Queue a rebalance of the project's ranks unless one is waiting already. The caller has committed."""
+    if db.session.info.get('defer_commit'):
+        # Jobs cannot be queued in an atomic batch, a later move queues it
+        return None
+
+    pending = db.session.execute(
+        select(Job.payload)
+        .where(Job.type == 'rebalance_ranks', Job.status.in_([JobStatus.queued, JobStatus.running]))
+    ).scalars()
+    if any(payload.get('project_id') == project_id for payload in pending):
+        return None
+    return jobs.enqueue('rebalance_ranks', {'project_id': project_id}, user=user)
+
+@tasks_bp.route('/<task_id>/move', methods=['POST'])
+@token_required
+@manager_required
+def move_task(current_user, task_id):
+    """
+    Move a task within its project
+    ---
+    tags:
+      - Tasks
+    parameters:
+      - in: path
+        name: task_id
+        required: true
+        schema:
+          type: integer
+      - in: header
+        name: If-Match
+        type: string
+        required: false
+        description: ETag of the task version being moved
+      - in: body
+        name: position
+        description: >
+          Exactly one of after_id, to move the task right after that task
+          (null: to the top), or before_id, to move it right before that
+          task (null: to the bottom). Only the moved task is written.
+        schema:
+          type: object
+          properties:
+            after_id:
+              type: integer
+            before_id:
+              type: integer
+    responses:
+      200:
+        description: Task moved, with its new rank
+      400:
+        description: Invalid position, or the other task is not in the same project
+      404:
+        description: Task not found
+      409:
+        description: No rank is left between the neighbours; they are being rebalanced, retry shortly
+      412:
+        description: The task was modified since the version given in If-Match
+    """
+
+    try:
+        task_id = int(task_id)
+    except ValueError:
+        return jsonify({'error': 'Invalid ID format'}), 400
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or len(data.keys() & {'after_id', 'before_id'}) != 1:
+        return jsonify({"error": "Give exactly one of after_id and before_id"}), 400
+
+    place_before = 'before_id' in data
+    anchor_id = data['before_id'] if place_before else data['after_id']
+    if anchor_id is not None and (not isinstance(anchor_id, int) or isinstance(anchor_id, bool)):
+        return jsonify({"error": "Invalid ID format"}), 400
+    if anchor_id == task_id:
+        return jsonify({"error": "A task cannot be moved next to itself"}), 400
+
+    project_id = db.session.execute(select(Task.project_id).where(Task.id == task_id)).scalar()
+    if project_id is None:
+        return jsonify({'error': 'Task not found'}), 404
+
+    try:
+        # Taken by the rebalance job as well, where the database has row locks
+        db.session.execute(select(Project.id).where(Project.id == project_id).with_for_update())
+        before, after = ranks.neighbours(project_id, task_id, anchor_id, place_before)
+        if before is not None and after is not None and before >= after:
+            # Two tasks share a rank, e.g. after concurrent creates
+            rank = None
+        else:
+            rank = ranks.key_between(before, after)
+
+        if rank is None or len(rank) > ranks.MAX_LENGTH:
+            db.session.rollback()
+            schedule_rebalance(project_id, current_user)
+            return jsonify({"error": "No room between these tasks, retry after the project's tasks are rebalanced"}), 409
+
+        task = update_returning(
+            Task, task_id, {'rank': rank}, TASK_COLUMNS,
+            expected_version=if_match_version()
+        )
+        if task:
+            record_change('task', 'update', task_id, task["project_id"], dict(task))
+        db.session.commit()
+    except LookupError:
+        db.session.rollback()
+        return jsonify({"error": "The other task is not in this project"}), 400
+    except VersionConflict:
+        db.session.rollback()
+        return jsonify({'error': 'Task was modified by another request'}), 412
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": "Internal server error"}), 500
+
+    if not task:
+        return jsonify({'error': 'Task not found'}), 404
+
+    if ranks.needs_rebalance(rank):
+        schedule_rebalance(project_id, current_user)
+
+    return jsonify(dict(task)), 200, etag(task["version"])
+
+def visible_task(user, task_id):
+    """The task as a response dict when it exists and ``user`` can see its project, else None."""
+    row = db.session.execute(
+        filter_projects(select(*TASK_COLUMNS).where(Task.id == task_id), user, Task.project_id)
+    ).mappings().first()
+    return row_dict(row) if row is not None else None
+
+@tasks_bp.route('/<task_id>/subtree', methods=['GET'])
+@token_required
+@coalesced(access_scope)
+def get_subtree(current_user, task_id):
+    """
+    Get a task with all its subtasks, at any depth
+    ---
+    tags:
+      - Tasks
+    parameters:
+      - in: path
+        name: task_id
+        required: true
+        schema:
+          type: integer
+      - name: max_depth
+        in: query
+        type: integer
+        required: false
+        description: Only subtasks down to this depth (1 for the direct subtasks)
+    responses:
+      200:
+        description: >
+          The task and its subtasks, read with one indexed query. Subtasks
+          are listed level by level, each level in rank order, with their
+          parent_id and their depth below the task.
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                task:
+                  type: object
+                data:
+                  type: array
+                  items:
+                    type: object
+                    properties:
+                      id:
+                        type: integer
+                      title:
+                        type: string
+                      parent_id:
+                        type: integer
+                      depth:
+                        type: integer
+      400:
+        description: Invalid max_depth
+      404:
+        description: Task not found
+    """
+
+    try:
+        task_id = int(task_id)
+    except ValueError:
+        return jsonify({'error': 'Invalid ID format'}), 400
+
+    max_depth = request.args.get('max_depth', None, int)
+    if max_depth is not None and max_depth < 1:
+        return jsonify({'error': 'max_depth must be at least 1'}), 400
+
+    task = visible_task(current_user, task_id)
+    if not task:
+        return jsonify({'error': 'Task not found'}), 404
+
+    closure = TaskClosure.__table__
+    statement = select(*TASK_COLUMNS, closure.c.depth) \
+      .join(closure, closure.c.descendant_id == Task.id) \
+      .where(closure.c.ancestor_id == task_id) \
+      .order_by(closure.c.depth, Task.rank, Task.id)
+    if max_depth is not None:
+        statement = statement.where(closure.c.depth <= max_depth)
+
+    return stream_rows(statement, {"task": task})
+
+@tasks_bp.route('/<task_id>/ancestors', methods=['GET'])
+@token_required
+@coalesced(access_scope)
+def get_ancestors(current_user, task_id):
+    """
+    Get the ancestors of a task
+    ---
+    tags:
+      - Tasks
+    parameters:
+      - in: path
+        name: task_id
+        required: true
+        schema:
+          type: integer
+    responses:
+      200:
+        description: >
+          The task's parent, its parent's parent and so on up to a top level
+          task, read with one indexed query, top level task first; empty for
+          a top level task.
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                data:
+                  type: array
+                  items:
+                    type: object
+                    properties:
+                      id:
+                        type: integer
+                      title:
+                        type: string
+                      parent_id:
+                        type: integer
+                      depth:
+                        type: integer
+                        description: Levels above the task, 1 for the parent
+      404:
+        description: Task not found
+    """
+
+    try:
+        task_id = int(task_id)
+    except ValueError:
+        return jsonify({'error': 'Invalid ID format'}), 400
+
+    closure = TaskClosure.__table__
+    statement = select(*TASK_COLUMNS, closure.c.depth) \
+      .join(closure, closure.c.ancestor_id == Task.id) \
+      .where(closure.c.descendant_id == task_id) \
+      .order_by(closure.c.depth.desc())
+    ancestors = [row_dict(row) for row in db.session.execute(
+        filter_projects(statement, current_user, Task.project_id)
+    ).mappings()]
+
+    # A top level task has no rows, so only an empty result needs the task looked up
+    if not ancestors and not visible_task(current_user, task_id):
+        return jsonify({'error': 'Task not found'}), 404
+
+    return jsonify({"data": ancestors}), 200
+
+@tasks_bp.route('/<task_id>/parent', methods=['PUT'])
+@token_required
+@manager_required
+def set_parent(current_user, task_id):
+    """
+    Move a task, with its subtasks, under another task or to the top level
+    ---
+    tags:
+      - Tasks
+    parameters:
+      - in: path
+        name: task_id
+        required: true
+        schema:
+          type: integer
+      - in: header
+        name: If-Match
+        type: string
+        required: false
+        description: ETag of the task version being moved
+      - in: body
+        name: parent
+        schema:
+          type: object
+          required:
+            - parent_id
+          properties:
+            parent_id:
+              type: integer
+              description: A task of the same project, or null for the top level
+    responses:
+      200:
+        description: Task moved, with its new parent_id
+      400:
+        description: Parent not in the task's project, or one of the task's own subtasks
+      404:
+        description: Task not found
+      412:
+        description: The task was modified since the version given in If-Match
+    """
+
+    try:
+        task_id = int(task_id)
+    except ValueError:
+        return jsonify({'error': 'Invalid ID format'}), 400
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or 'parent_id' not in data:
+        return jsonify({"error": "Missing field: parent_id"}), 400
+
+    parent_id = data['parent_id']
+    if parent_id is not None and (not isinstance(parent_id, int) or isinstance(parent_id, bool)):
+        return jsonify({"error": "Invalid ID format"}), 400
+
+    project_id = db.session.execute(select(Task.project_id).where(Task.id == task_id)).scalar()
+    if project_id is None:
+        return jsonify({'error': 'Task not found'}), 404
+
+    try:
+        # Two moves checked against each other's old tree could make a cycle
+        db.session.execute(select(Project.id).where(Project.id == project_id).with_for_update())
+        if parent_id is not None:
+            if not subtasks.parent_in_project(parent_id, project_id):
+                db.session.rollback()
+                return jsonify({"error": "Parent task not found in this project"}), 400
+            if parent_id == task_id or subtasks.is_descendant(parent_id, task_id):
+                db.session.rollback()
+                return jsonify({"error": "A task cannot be moved under itself or its subtasks"}), 400
+
+        task = update_returning(
+            Task, task_id, {'parent_id': parent_id}, TASK_COLUMNS,
+            expected_version=if_match_version()
+        )
+        if task:
+            subtasks.move_task(task_id, parent_id)
+            record_change('task', 'update', task_id, task["project_id"], dict(task))
+        db.session.commit()
+    except VersionConflict:
+        db.session.rollback()
+        return jsonify({'error': 'Task was modified by another request'}), 412
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": "Internal server error"}), 500
+
+    if not task:
+        return jsonify({'error': 'Task not found'}), 404
+
+    return jsonify(dict(task)), 200, etag(task["version"])
+
+@tasks_bp.route('/<task_id>', methods=['DELETE'])
+@token_required
+@manager_required
+def delete_task(current_user, task_id):
+    """
+    Delete a task with all its subtasks
+    ---
+    tags:
+      - Tasks
+    parameters:
+      - in: path
+        name: task_id
+        required: true
+        schema:
+          type: integer
+    responses:
+      200:
+        description: Task and subtasks deleted
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                deleted_tasks:
+                  type: integer
+      404:
+        description: Task not found
+    """
+
+    try:
+        task_id = int(task_id)
+    except ValueError:
+        return jsonify({'error': 'Invalid ID format'}), 400
+
+    project_id = db.session.execute(select(Task.project_id).where(Task.id == task_id)).scalar()
+    if project_id is None:
+        return jsonify({'error': 'Task not found'}), 404
+
+    try:
+        # Locked like moves, so no subtask is added under the subtree while it goes
+        db.session.execute(select(Project.id).where(Project.id == project_id).with_for_update())
+        task_ids = [task_id, *subtasks.descendant_ids(task_id)]
+        deleted = select(subtasks.subtree(task_id).c.id)
+        dependencies.remove_tasks(deleted)
+        db.session.execute(delete(Task).where(Task.id.in_(deleted)))
+        subtasks.remove_tasks(deleted)
+        audit.record('delete', Task, task_ids)
+        record_deletes(Task, task_ids, project_id)
+        for deleted_id in task_ids:
+            record_change('task', 'delete', deleted_id, project_id, {"id": deleted_id})
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": "Internal server error"}), 500
+
+    return jsonify({'message': 'Task deleted successfully', 'deleted_tasks': len(task_ids)}), 200
+
+@tasks_bp.route('/<task_id>/dependencies', methods=['GET'])
+@token_required
+@coalesced(access_scope)
+def get_dependencies(current_user, task_id):
+    """
+    Get the tasks a task depends on
+    ---
+    tags:
+      - Tasks
+    parameters:
+      - in: path
+        name: task_id
+        required: true
+        schema:
+          type: integer
+    responses:
+      200:
+        description: The task's direct prerequisites, in rank order
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                data:
+                  type: array
+                  items:
+                    type: object
+      404:
+        description: Task not found
+    """
+
+    try:
+        task_id = int(task_id)
+    except ValueError:
+        return jsonify({'error': 'Invalid ID format'}), 400
+
+    if not visible_task(current_user, task_id):
+        return jsonify({'error': 'Task not found'}), 404
+
+    rows = db.session.execute(
+        select(*TASK_COLUMNS)
+        .join(TaskDependency, TaskDependency.depends_on_id == Task.id)
+        .where(TaskDependency.task_id == task_id)
+        .order_by(Task.rank, Task.id)
+    ).mappings()
+    return jsonify({"data": [row_dict(row) for row in rows]}), 200
+
+@tasks_bp.route('/<task_id>/dependencies', methods=['POST'])
+@token_required
+@manager_required
+def add_dependency(current_user, task_id):
+    """
+    Make a task depend on another task of its project
+    ---
+    tags:
+      - Tasks
+    parameters:
+      - in: path
+        name: task_id
+        required: true
+        schema:
+          type: integer
+      - in: body
+        name: dependency
+        schema:
+          type: object
+          required:
+            - depends_on_id
+          properties:
+            depends_on_id:
+              type: integer
+              description: The task that has to be done first
+    responses:
+      201:
+        description: Dependency added
+      200:
+        description: The task already depended on that task
+      400:
+        description: Invalid input, or the other task is not in the same project
+      404:
+        description: Task not found
+      409:
+        description: The other task already depends on this one, directly or not, so this would make a cycle
+    """
+
+    try:
+        task_id = int(task_id)
+    except ValueError:
+        return jsonify({'error': 'Invalid ID format'}), 400
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or 'depends_on_id' not in data:
+        return jsonify({"error": "Missing field: depends_on_id"}), 400
+
+    depends_on_id = data['depends_on_id']
+    if not isinstance(depends_on_id, int) or isinstance(depends_on_id, bool):
+        return jsonify({"error": "Invalid ID format"}), 400
+
+    project_id = db.session.execute(select(Task.project_id).where(Task.id == task_id)).scalar()
+    if project_id is None:
+        return jsonify({'error': 'Task not found'}), 404
+
+    dependency = {"task_id": task_id, "depends_on_id": depends_on_id, "project_id": project_id}
+    try:
+        # Two dependencies checked against each other's old graph could make a cycle
+        db.session.execute(select(Project.id).where(Project.id == project_id).with_for_update())
+        if not subtasks.parent_in_project(depends_on_id, project_id):
+            db.session.rollback()
+            return jsonify({"error": "The other task is not in this project"}), 400
+        if db.session.get(TaskDependency, (task_id, depends_on_id)):
+            # Nothing was written; a rollback here would discard an atomic batch's earlier operations
+            return jsonify(dependency), 200
+        if depends_on_id == task_id or dependencies.depends_on(depends_on_id, task_id):
+            db.session.rollback()
+            return jsonify({"error": "The other task depends on this one, a dependency would make a cycle"}), 409
+
+        db.session.add(TaskDependency(**dependency))
+        record_change('dependency', 'create', task_id, project_id, dependency)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": "Internal server error"}), 500
+
+    return jsonify(dependency), 201
+
+@tasks_bp.route('/<task_id>/dependencies/<depends_on_id>', methods=['DELETE'])
+@token_required
+@manager_required
+def remove_dependency(current_user, task_id, depends_on_id):
+    """
+    Remove a dependency between two tasks
+    ---
+    tags:
+      - Tasks
+    parameters:
+      - in: path
+        name: task_id
+        required: true
+        schema:
+          type: integer
+      - in: path
+        name: depends_on_id
+        required: true
+        schema:
+          type: integer
+    responses:
+      200:
+        description: Dependency removed
+      404:
+        description: The task does not depend on that task
+    """
+
+    try:
+        task_id = int(task_id)
+        depends_on_id = int(depends_on_id)
+    except ValueError:
+        return jsonify({'error': 'Invalid ID format'}), 400
+
+    criteria = [TaskDependency.task_id == task_id, TaskDependency.depends_on_id == depends_on_id]
+    try:
+        project_id = db.session.execute(select(TaskDependency.project_id).where(*criteria)).scalar()
+        removed = project_id is not None and db.session.execute(delete(TaskDependency).where(*criteria)).rowcount > 0
+        if removed:
+            record_change('dependency', 'delete', task_id, project_id,
+                          {"task_id": task_id, "depends_on_id": depends_on_id, "project_id": project_id})
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": "Internal server error"}), 500
+
+    if not removed:
+        return jsonify({'error': 'Dependency not found'}), 404
+
+    return jsonify({'message': 'Dependency removed successfully'}), 200
@@ -1,15 +1,27 @@
 
 from flask import Blueprint, jsonify, request
+from sqlalchemy import select, update
 
-from app.models.users import User
+from app.models.users import User, Role
+from app.models.tasks import Task
 from app.extensions import db
 from app.auth import token_required, manager_required
+from app.coalescing import coalesced, user_scope
+from app.batch import parse_ids, fetch_by_ids
+from app.pagination import page_args, stream_page
+from app.idempotency import idempotent
+from app.events import record_change
+from app.membership import remove_user
+from app import audit
+from app.reads import TASK_COLUMNS, USER_COLUMNS, row_dict, fetch_one
+from app.writes import row_exists, update_returning, delete_returning, if_match_version, etag, VersionConflict
 
 users_bp = Blueprint('users', __name__)
 
 @users_bp.route('', methods=['POST'])
 @token_required
 @manager_required
+@idempotent
 def create_user(current_user):
     """
     Create a new user
@@ -17,6 +29,11 @@ def create_user(current_user):
     tags:
       - Users
     parameters:
+      - in: header
+        name: Idempotency-Key
+        type: string
+        required: false
+        description: Retries with the same key and body get the stored response instead of creating a duplicate
       - in: body
         name: user
         description: The user to create
@@ -109,15 +126,25 @@ def create_user(current_user):
         "role": new_user.role.value
     }), 201
 
+@users_bp.route("", methods=["GET"])
 @users_bp.route("/", methods=["GET"])
 @token_required
+@coalesced()
 def list_users(current_user):
     """
-    Get users with pagination
+    Get users with pagination, or a batch of users by ID
     ---
     tags:
       - Users
     parameters:
+      - name: ids
+        in: query
+        type: string
+        required: false
+        description: >
+          Comma separated user IDs (e.g. 1,2,3). When given, pagination is
+          ignored and the response has the found users in request order
+          under data plus the unknown IDs under missing.
       - name: page
         in: query
         type: integer
@@ -129,7 +156,7 @@ def list_users(current_user):
         type: integer
         required: false
         default: 10
-        description: Number of users per page
+        description: Number of users per page, at most MAX_PER_PAGE (100)
     responses:
       200:
         description: Users retrieved successfully
@@ -141,6 +168,9 @@ def list_users(current_user):
                 total:
                   type: integer
                   description: Total number of users
+                total_exact:
+                  type: boolean
+                  description: False when total is a cached or estimated count (see PAGINATION_COUNT)
                 page:
                   type: integer
                   description: Current page number
@@ -167,27 +197,107 @@ def list_users(current_user):
                         type: string
     """
 
-    page = request.args.get("page", 1, int)
-    limit = request.args.get("per_page", 10, int)
+    ids = request.args.get("ids")
+    if ids is not None:
+        try:
+            ids = parse_ids(ids)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        users, missing = fetch_by_ids(select(*USER_COLUMNS), User, ids)
+        return jsonify({
+            "data": users,
+            "missing": missing
+        }), 200
+
+    page, limit = page_args()
 
-    pagination = User.query.paginate(page=page, per_page=limit, error_out=False)
+    statement = select(User.id, User.first_name, User.last_name, User.email, User.role).order_by(User.id)
+
+    return stream_page(statement, page, limit)
+
+@users_bp.route("/me/tasks", methods=["GET"])
+@token_required
+@coalesced(user_scope)
+def get_my_tasks(current_user):
+    """
+    Get the tasks assigned to the current user, across all projects
+    ---
+    tags:
+      - Users
+      - Tasks
+    parameters:
+      - name: cursor
+        in: query
+        type: integer
+        required: false
+        description: next_cursor from the previous page
+      - name: per_page
+        in: query
+        type: integer
+        required: false
+        default: 20
+        description: Number of tasks per page, at most MAX_PER_PAGE (100)
+    responses:
+      200:
+        description: >
+          Tasks retrieved successfully, newest first. Pages are read with an
+          index seek on (assignee_id, id), so they cost the same however
+          deep the client pages.
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                next_cursor:
+                  type: integer
+                  description: Pass as cursor to get the next page, null on the last page
+                data:
+                  type: array
+                  items:
+                    type: object
+                    properties:
+                      id:
+                        type: integer
+                      title:
+                        type: string
+                      description:
+                        type: string
+                      project_id:
+                        type: integer
+                      assignee_id:
+                        type: integer
+                      version:
+                        type: integer
+      400:
+        description: Invalid cursor
+    """
+
+    cursor = request.args.get("cursor")
+    if cursor is not None:
+        try:
+            cursor = int(cursor)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+    _, limit = page_args(default_per_page=20)
+
+    statement = select(*TASK_COLUMNS) \
+      .where(Task.assignee_id == current_user.id) \
+      .order_by(Task.id.desc())
+    if cursor is not None:
+        statement = statement.where(Task.id < cursor)
+
+    tasks = db.session.execute(statement.limit(limit + 1)).mappings().all()
+    next_cursor = tasks[limit - 1]["id"] if len(tasks) > limit else None
 
     return jsonify({
-        "total": pagination.total,
-        "page": pagination.page,
-        "per_page": pagination.per_page,
-        "pages": pagination.pages,
-        "data": [{
-          "id": user.id, 
-          "first_name": user.first_name, 
-          "last_name": user.last_name, 
-          "email": user.email, 
-          "role": user.role.value} for user in pagination.items
-        ]
+        "next_cursor": next_cursor,
+        "data": [row_dict(task) for task in tasks[:limit]]
     }), 200
 
 @users_bp.route("/<user_id>", methods=["GET"])
 @token_required
+@coalesced()
 def get_user(current_user, user_id):
     """
     Get user by ID
@@ -202,7 +312,7 @@ def get_user(current_user, user_id):
           type: integer
     responses:
       200:
-        description: User retrieved successfully
+        description: User retrieved successfully, its version is also sent as the ETag
         content:
           application/json:
             schema:
@@ -218,6 +328,8 @@ def get_user(current_user, user_id):
                   type: string
                 role:
                   type: string
+                version:
+                  type: integer
       404:
         description: User not found
     """
@@ -227,24 +339,21 @@ def get_user(current_user, user_id):
     except ValueError:
       return jsonify({'error': 'Invalid ID format'}), 400
 
-    user = User.query.get(user_id)
+    user = fetch_one(User, USER_COLUMNS, user_id)
     if not user:
       return jsonify({'error': 'User not found'}), 404
     
-    return jsonify({
-      "id": user.id, 
-      "first_name": user.first_name, 
-      "last_name": user.last_name, 
-      "email": user.email, 
-      "role": user.role.value
-    }), 200
+    return jsonify(user), 200, etag(user["version"])
 
-@users_bp.route("/<user_id>", methods=["PUT"])
+@users_bp.route("/<user_id>", methods=["PUT", "PATCH"])
 @token_required
 @manager_required
 def update_user(current_user, user_id):
     """
     Update user by ID
+
+    PUT and PATCH both only change the fields given; PATCH also rejects
+    fields that cannot be updated.
     ---
     tags:
       - Users
@@ -254,6 +363,11 @@ def update_user(current_user, user_id):
         required: true
         schema:
           type: integer
+      - in: header
+        name: If-Match
+        type: string
+        required: false
+        description: ETag of the version being edited; the update fails with 412 if the user changed since
       - in: body
         name: user
         description: The user data to update
@@ -270,7 +384,7 @@ def update_user(current_user, user_id):
               type: string
     responses:
       200:
-        description: User updated successfully
+        description: User updated successfully, the new version is also sent as the ETag
         content:
           application/json:
             schema:
@@ -286,8 +400,12 @@ def update_user(current_user, user_id):
                   type: string
                 role:
                   type: string
+                version:
+                  type: integer
       404:
         description: User not found
+      412:
+        description: The user was modified since the version given in If-Match
     """
 
     try:
@@ -295,22 +413,41 @@ def update_user(current_user, user_id):
     except ValueError:
         return jsonify({'error': 'Invalid ID format'}), 400
     
-    user = User.query.get(user_id)
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
-    
-    data = request.get_json()
+    def invalid(error):
+        # A missing user is reported before a bad body; only this path pays for the lookup
+        if not row_exists(User, user_id):
+            return jsonify({'error': 'User not found'}), 404
+        return jsonify({"error": error}), 400
+
+    data = request.get_json(silent=True)
     if not data:
-        return jsonify({"error": "Invalid input"}), 400
+        return invalid("Invalid input")
     
     data_fields = ['first_name', 'last_name', 'email', 'role']
 
-    for field in data_fields:
-        if field in data:
-            setattr(user, field, data[field])
+    if request.method == 'PATCH':
+        for field in data:
+            if field not in data_fields:
+                return invalid(f"Unknown field: {field}")
+
+    values = {field: data[field] for field in data_fields if field in data}
+
+    if 'role' in values:
+        try:
+            values['role'] = Role(values['role'])
+        except ValueError:
+            return invalid("Invalid role")
     
     try:
+        user = update_returning(
+            User, user_id, values,
+            [User.id, User.first_name, User.last_name, User.email, User.role, User.version],
+            expected_version=if_match_version()
+        )
         db.session.commit()
+    except VersionConflict:
+        db.session.rollback()
+        return jsonify({'error': 'User was modified by another request'}), 412
     except Exception as e:
         db.session.rollback()
         if 'unique constraint' in str(e).lower() or 'duplicate' in str(e).lower():
@@ -318,14 +455,18 @@ def update_user(current_user, user_id):
         elif 'enum role' in str(e).lower():
             return jsonify({"error": "Invalid role"}), 400
         return jsonify({"error": "Internal server error"}), 500
+
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
     
     return jsonify({
-        "id": user.id,
-        "first_name": user.first_name,
-        "last_name": user.last_name,
-        "email": user.email,
-        "role": user.role.value
-    }), 200
+        "id": user["id"],
+        "first_name": user["first_name"],
+        "last_name": user["last_name"],
+        "email": user["email"],
+        "role": user["role"].value,
+        "version": user["version"]
+    }), 200, etag(user["version"])
 
 @users_bp.route("/<user_id>", methods=["DELETE"])
 @token_required
@@ -354,15 +495,25 @@ def delete_user(current_user, user_id):
     except ValueError:
         return jsonify({'error': 'Invalid ID format'}), 400
     
-    user = User.query.get(user_id)
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
-    
-    db.session.delete(user)
     try:
+        unassigned = db.session.execute(select(Task.id).where(Task.assignee_id == user_id)).scalars().all()
+        if unassigned:
+            db.session.execute(
+                update(Task)
+                .where(Task.id.in_(unassigned))
+                .values(assignee_id=None, version=Task.version + 1)
+            )
+            audit.record('update', Task, unassigned, {'assignee_id': None})
+            for task in db.session.execute(select(*TASK_COLUMNS).where(Task.id.in_(unassigned))).mappings():
+                record_change('task', 'update', task["id"], task["project_id"], dict(task))
+        remove_user(user_id)
+        deleted = delete_returning(User, user_id)
         db.session.commit()
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Internal server error'}), 500
 
+    if not deleted:
+        return jsonify({'error': 'User not found'}), 404
+
     return jsonify({'message': 'User deleted successfully'}), 200
\ No newline at end of file
@@ -0,0 +1,244 @@
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.extensions import db
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Lists of placeholders, as expanded for IN (...) by each driver's paramstyle
+PLACEHOLDER = r'(?:\?|%s|%\(\w+\)s|:\w+|\$\d+)'
+PLACEHOLDER_LIST = re.compile(rf'\(\s*{PLACEHOLDER}(?:\s*,\s*{PLACEHOLDER})+\s*\)')
+WHITESPACE = re.compile(r'\s+')
+
+def normalize(statement):
+    """One line of SQL per query shape: whitespace collapsed and IN lists of any length folded."""
+    return PLACEHOLDER_LIST.sub('(...)', WHITESPACE.sub(' ', statement).strip())
+
+def parameter_shape(parameters, executemany):
+    """The types of the bound parameters, never their values."""
+    if executemany:
+        return {"executemany": len(parameters), "each": parameter_shape(parameters[0], False) if parameters else None}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return None
+
+def explain(connection, statement, parameters, analyze):
+    """Plan of ``statement`` as text lines, run on ``connection``. ANALYZE is only used for read-only SELECTs."""
+    dialect = connection.dialect.name
+    if dialect == 'postgresql':
+        options = "ANALYZE, BUFFERS" if analyze and is_read_only(statement) else "COSTS"
+        rows = connection.exec_driver_sql(f"EXPLAIN ({options}) {statement}", parameters)
+        return [row[0] for row in rows]
+    if dialect == 'sqlite':
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return [row[-1] for row in rows]
+    return None
+
+# EXPLAIN ANALYZE executes the statement. Only plain SELECTs are run that way:
+# a WITH can hold an UPDATE, DELETE or INSERT ... RETURNING, a locking read
+# takes row locks, and SELECT INTO creates a table.
+WRITES = re.compile(r"\bFOR\s+(?:NO\s+KEY\s+UPDATE|UPDATE|KEY\s+SHARE|SHARE)\b|\bINTO\b", re.IGNORECASE)
+
+def is_read_only(statement):
+    words = statement.split(None, 1)
+    return bool(words) and words[0].upper() == 'SELECT' and WRITES.search(statement) is None
+
+class SlowQueryLog:
+    """
+    Records SQL statements that take longer than SLOW_QUERY_THRESHOLD_MS.
+
+    Timing hooks on the engine pass each slow execution, with its normalized
+    SQL, parameter types and route, to a background thread. The thread
+    captures an EXPLAIN plan on a connection of its own, at most once per
+    statement every SLOW_QUERY_EXPLAIN_INTERVAL seconds, and appends the
+    record as a JSON line to SLOW_QUERY_LOG_FILE, a rotating log. Totals
+    per statement are kept in memory for the admin endpoint.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._stats = OrderedDict()
+        self._explained_at = {}
+        self._explaining = threading.local()
+        self._file = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions["slow_queries"] = self
+        if not app.config.get('SLOW_QUERY_ENABLED', True):
+            return
+
+        path = app.config.get('SLOW_QUERY_LOG_FILE') or os.path.join(app.instance_path, 'slow_queries.log')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = logging.getLogger(f"{__name__}.file")
+        self._file.propagate = False
+        self._file.setLevel(logging.INFO)
+        for handler in list(self._file.handlers):
+            self._file.removeHandler(handler)
+            handler.close()
+        self._file.addHandler(logging.handlers.RotatingFileHandler(
+            path,
+            maxBytes=app.config.get('SLOW_QUERY_LOG_MAX_BYTES', 10 * 1024 * 1024),
+            backupCount=app.config.get('SLOW_QUERY_LOG_BACKUPS', 5)
+        ))
+
+        with app.app_context():
+            engine = db.engine
+        if not event.contains(engine, 'before_cursor_execute', self._start):
+            event.listen(engine, 'before_cursor_execute', self._start)
+            event.listen(engine, 'after_cursor_execute', self._finish)
+
+    @property
+    def inline(self):
+        return self.app.config.get('SLOW_QUERY_EXPLAINER', 'thread') == 'inline'
+
+    def ensure_started(self):
+        if self.inline or self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._queue = queue.Queue(maxsize=self.app.config.get('SLOW_QUERY_QUEUE_SIZE', 1000))
+            threading.Thread(target=self._run, name="slow-query-log", daemon=True).start()
+
+    def _start(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._query_started = time.perf_counter()
+
+    def _finish(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_query_started', None)
+        if started is None or getattr(self._explaining, 'active', False):
+            return
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms < self.app.config.get('SLOW_QUERY_THRESHOLD_MS', 200):
+            return
+
+        record = {
+            "sql": normalize(statement),
+            "params": parameter_shape(parameters, executemany),
+            "duration_ms": round(elapsed_ms, 3),
+            "route": request.endpoint if has_request_context() else None,
+            "at": datetime.now(timezone.utc).isoformat()
+        }
+        self._count(record)
+        metrics.incr("slow_queries")
+
+        # The statement and parameters themselves only go to EXPLAIN, never to the log
+        explain_args = None if executemany else (statement, parameters)
+        if self.inline:
+            self._process(record, explain_args, conn)
+            return
+
+        self.ensure_started()
+        try:
+            self._queue.put_nowait((record, explain_args))
+        except queue.Full:
+            metrics.incr("slow_queries_dropped")
+
+    def _count(self, record):
+        max_statements = self.app.config.get('SLOW_QUERY_MAX_STATEMENTS', 1000)
+        with self._lock:
+            stats = self._stats.pop(record["sql"], None) or {
+                "sql": record["sql"],
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "routes": {},
+                "params": record["params"],
+                "plan": None
+            }
+            stats["count"] += 1
+            stats["total_ms"] += record["duration_ms"]
+            stats["max_ms"] = max(stats["max_ms"], record["duration_ms"])
+            stats["last_seen"] = record["at"]
+            route = record["route"] or "-"
+            stats["routes"][route] = stats["routes"].get(route, 0) + 1
+
+            self._stats[record["sql"]] = stats
+            while len(self._stats) > max_statements:
+                self._stats.popitem(last=False)
+
+    def _should_explain(self, sql):
+        interval = self.app.config.get('SLOW_QUERY_EXPLAIN_INTERVAL', 300)
+        now = time.monotonic()
+        with self._lock:
+            if now - self._explained_at.get(sql, -interval) < interval:
+                return False
+            self._explained_at[sql] = now
+            if len(self._explained_at) > self.app.config.get('SLOW_QUERY_MAX_STATEMENTS', 1000):
+                self._explained_at.pop(next(iter(self._explained_at)))
+            return True
+
+    def _process(self, record, explain_args, connection=None):
+        if explain_args and self.app.config.get('SLOW_QUERY_EXPLAIN', True) and self._should_explain(record["sql"]):
+            record["plan"] = self._explain(connection, *explain_args)
+            with self._lock:
+                if record["sql"] in self._stats:
+                    self._stats[record["sql"]]["plan"] = record["plan"]
+
+        self._file.info(json.dumps(record))
+
+    def _explain(self, connection, statement, parameters):
+        """EXPLAIN on ``connection`` when inline, else on a connection of its own."""
+        analyze = self.app.config.get('SLOW_QUERY_EXPLAIN_ANALYZE', False)
+        self._explaining.active = True
+        try:
+            if connection is not None:
+                return explain(connection, statement, parameters, analyze)
+            with self.app.app_context(), db.engine.connect() as connection:
+                return explain(connection, statement, parameters, analyze)
+        except SQLAlchemyError:
+            logger.warning("Could not explain slow query", exc_info=True)
+            return None
+        finally:
+            self._explaining.active = False
+
+    def _run(self):
+        while True:
+            record, explain_args = self._queue.get()
+            try:
+                self._process(record, explain_args)
+            except Exception:
+                logger.warning("Could not log slow query", exc_info=True)
+
+    def top(self, limit=20):
+        """Statements with the most total time, most first."""
+        with self._lock:
+            stats = [dict(item, routes=dict(item["routes"])) for item in self._stats.values()]
+
+        stats.sort(key=lambda item: item["total_ms"], reverse=True)
+        for item in stats[:limit]:
+            item["total_ms"] = round(item["total_ms"], 3)
+            item["mean_ms"] = round(item["total_ms"] / item["count"], 3)
+        return stats[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._explained_at.clear()
+
+slow_queries = SlowQueryLog()
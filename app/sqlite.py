@@ -0,0 +1,33 @@
+
+from sqlalchemy import event
+
+from app.extensions import db
+
+# SQLite deployments: PRAGMAs are per connection (journal_mode=WAL is kept in
+# the database file, the others are not), so they are set on every new pooled
+# connection through the engine's connect event.
+
+def use_pragmas(engine, pragmas):
+    """Run ``PRAGMA name = value`` for each of ``pragmas``, in order, on every new connection of ``engine``."""
+    statements = [f"PRAGMA {name} = {value}" for name, value in pragmas.items()]
+
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    event.listen(engine, "connect", set_pragmas)
+    return set_pragmas
+
+def init_sqlite(app):
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    if not pragmas:
+        return
+
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name == 'sqlite':
+        use_pragmas(engine, pragmas)
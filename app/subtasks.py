@@ -0,0 +1,87 @@
+
+from sqlalchemy import delete, insert, literal, select, true, union_all
+
+from app.extensions import db
+from app.models.task_closure import TaskClosure
+from app.models.tasks import Task
+
+# Subtasks: Task.parent_id is the hierarchy, and task_closure holds it
+# expanded, one (ancestor_id, descendant_id, depth) row for every ancestor of
+# every task, depth 1 being the parent. A subtree or a list of ancestors is
+# then one indexed read whatever the depth, and a move writes the rows of the
+# moved subtree only. A task's row with itself is not stored, so top level
+# tasks have no rows and tasks created without a parent, by the API or in
+# bulk, need nothing here.
+
+closure = TaskClosure.__table__
+COLUMNS = ('ancestor_id', 'descendant_id', 'depth')
+
+def parent_in_project(parent_id, project_id):
+    return db.session.execute(
+        select(Task.id).where(Task.id == parent_id, Task.project_id == project_id)
+    ).first() is not None
+
+def is_descendant(task_id, ancestor_id):
+    return db.session.execute(
+        select(closure.c.depth).where(closure.c.ancestor_id == ancestor_id, closure.c.descendant_id == task_id)
+    ).first() is not None
+
+def lineage(task_id):
+    """``task_id`` at depth 0 and its ancestors, as a subquery of (id, depth)."""
+    return union_all(
+        select(literal(task_id).label('id'), literal(0).label('depth')),
+        select(closure.c.ancestor_id, closure.c.depth).where(closure.c.descendant_id == task_id)
+    ).subquery()
+
+def subtree(task_id):
+    """``task_id`` at depth 0 and its descendants, as a subquery of (id, depth)."""
+    return union_all(
+        select(literal(task_id).label('id'), literal(0).label('depth')),
+        select(closure.c.descendant_id, closure.c.depth).where(closure.c.ancestor_id == task_id)
+    ).subquery()
+
+def add_task(task_id, parent_id):
+    """Rows for a new task under ``parent_id``, copied from the parent's. The caller commits."""
+    if parent_id is None:
+        return
+    above = lineage(parent_id)
+    db.session.execute(insert(closure).from_select(
+        COLUMNS, select(above.c.id, literal(task_id), above.c.depth + 1)
+    ))
+
+def move_task(task_id, parent_id):
+    """
+    Move the subtree of ``task_id`` under ``parent_id`` (None: to the top
+    level): the paths from its old ancestors are deleted and the ones from
+    its new ancestors inserted, as two statements. The caller has checked
+    that ``parent_id`` is not in the subtree, and commits.
+    """
+    moved = subtree(task_id)
+    ancestors = select(closure.c.ancestor_id).where(closure.c.descendant_id == task_id).scalar_subquery()
+    db.session.execute(delete(closure).where(
+        closure.c.descendant_id.in_(select(moved.c.id)),
+        closure.c.ancestor_id.in_(ancestors)
+    ))
+
+    if parent_id is None:
+        return
+    moved = subtree(task_id)
+    above = lineage(parent_id)
+    db.session.execute(insert(closure).from_select(
+        COLUMNS,
+        select(above.c.id, moved.c.id, above.c.depth + moved.c.depth + 1).join(moved, true())
+    ))
+
+def descendant_ids(task_id):
+    return db.session.execute(
+        select(closure.c.descendant_id).where(closure.c.ancestor_id == task_id)
+    ).scalars().all()
+
+def remove_tasks(task_ids):
+    """
+    Remove the rows of deleted tasks, given as a list of IDs or a select of
+    them. Every row of a task's descendants goes as well when they are among
+    the deleted tasks, as they are when a subtree or a project is deleted.
+    The caller commits.
+    """
+    db.session.execute(delete(closure).where(closure.c.descendant_id.in_(task_ids)))
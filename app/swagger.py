@@ -0,0 +1,57 @@
+
+import json
+import os
+
+import click
+from flasgger import Swagger
+
+class CachedSwagger(Swagger):
+    """
+    Swagger that serves a spec compiled ahead of time when one is available.
+
+    Outside debug mode the spec is built from the route docstrings once per
+    process, on the first request for it, unless SWAGGER_SPEC_FILE points to
+    a spec written by ``flask swagger build``, in which case that file is
+    served instead.
+    """
+
+    def get_apispecs(self, endpoint='apispec_1'):
+        spec_file = self.app.config.get('SWAGGER_SPEC_FILE')
+        if spec_file and os.path.exists(spec_file):
+            compiled = self.__dict__.setdefault('compiled_apispecs', {})
+            if endpoint not in compiled:
+                with open(spec_file) as f:
+                    compiled[endpoint] = json.load(f)
+            return compiled[endpoint]
+
+        return super().get_apispecs(endpoint)
+
+    def build(self, endpoint='apispec_1'):
+        self.apispecs.pop(endpoint, None)
+        return super().get_apispecs(endpoint)
+
+def init_swagger(app):
+    app.config['SWAGGER'] = {
+        "title": "Project Management API",
+        "uiversion": 3,
+        "swagger_ui": app.config.get('SWAGGER_UI', True)
+    }
+    swagger = CachedSwagger(app)
+
+    @app.cli.group("swagger")
+    def swagger_cli():
+        """Swagger spec commands."""
+
+    @swagger_cli.command("build")
+    @click.option("--output", "-o", default=None, help="Spec file, defaults to SWAGGER_SPEC_FILE.")
+    def build(output):
+        """Compile the API spec from the route docstrings into a JSON file."""
+        output = output or app.config.get('SWAGGER_SPEC_FILE') or 'swagger.json'
+        with app.test_request_context():
+            spec = swagger.build()
+
+        with open(output, 'w') as f:
+            json.dump(spec, f, indent=2, sort_keys=True)
+        click.echo(f"Swagger spec written to {output}")
+
+    return swagger
@@ -0,0 +1,156 @@
+
+import base64
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+import click
+from flask import current_app
+from sqlalchemy import delete, insert, select, tuple_
+
+from app.extensions import db
+from app.membership import filter_projects
+from app.reads import PROJECT_COLUMNS, TASK_COLUMNS, USER_COLUMNS, row_dict
+from app.models.projects import Project
+from app.models.tasks import Task
+from app.models.tombstones import Tombstone
+from app.models.timestamps import utcnow
+from app.models.users import User
+
+# Delta sync: each synced table and the tombstones are read in (updated_at, id)
+# order from a position per table, which the cursor carries between requests.
+
+SYNCED_MODELS = {'projects': Project, 'tasks': Task, 'users': User}
+SYNCED_COLUMNS = {'projects': PROJECT_COLUMNS, 'tasks': TASK_COLUMNS, 'users': USER_COLUMNS}
+STREAMS = (*SYNCED_MODELS, 'deleted')
+
+START = (datetime(1970, 1, 1), 0)
+
+_pruned_at = 0.0
+
+def record_deletes(model, entity_ids, project_id=None):
+    """
+    Leave a tombstone for each deleted row so that delta sync clients learn
+    about the delete. The caller commits.
+    """
+    if not entity_ids:
+        return
+
+    now = utcnow()
+    db.session.execute(insert(Tombstone), [{
+        "entity": model.__tablename__,
+        "entity_id": entity_id,
+        "project_id": entity_id if model is Project else project_id,
+        "deleted_at": now
+    } for entity_id in entity_ids])
+
+    # Expired tombstones go with a later delete, at most once per interval per process
+    global _pruned_at
+    interval = current_app.config.get('SYNC_TOMBSTONE_PRUNE_INTERVAL', 3600)
+    if interval and time.monotonic() - _pruned_at >= interval:
+        _pruned_at = time.monotonic()
+        prune_tombstones(current_app.config.get('SYNC_TOMBSTONE_PRUNE_BATCH_SIZE', 1000))
+
+def retention_horizon():
+    return utcnow() - timedelta(days=current_app.config.get('SYNC_TOMBSTONE_RETAIN_DAYS', 30))
+
+def prune_tombstones(batch_size=None):
+    """Delete tombstones older than SYNC_TOMBSTONE_RETAIN_DAYS, at most ``batch_size``. Returns the number deleted."""
+    query = select(Tombstone.id).where(Tombstone.deleted_at < retention_horizon())
+    if batch_size:
+        query = query.limit(batch_size)
+    return db.session.execute(delete(Tombstone).where(Tombstone.id.in_(query))).rowcount
+
+def parse_since(value):
+    """Parse an ISO 8601 ``updated_since`` into a naive UTC datetime. Raises ValueError."""
+    since = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return since
+
+def encode_cursor(positions, access=None, resync=False):
+    """
+    The cursor carries a position per stream, the membership_version the
+    projects and tasks were filtered with and whether a resync is running.
+    """
+    data = {stream: [position[0].isoformat(), position[1]] for stream, position in positions.items()}
+    data["access"] = access
+    data["resync"] = resync
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+def decode_cursor(cursor):
+    """Return the positions, access version and resync flag. Raises ValueError on a cursor this module did not make."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        positions = {stream: (datetime.fromisoformat(data[stream][0]), int(data[stream][1])) for stream in STREAMS}
+        return positions, data.get("access"), bool(data.get("resync"))
+    except (KeyError, TypeError, ValueError, IndexError, AttributeError, UnicodeDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+def read_changes(positions, limit, user):
+    """
+    Read up to ``limit`` rows per stream after ``positions``. Returns the
+    changes, the positions to continue from and whether any stream has more.
+    Projects and tasks are limited to the projects ``user`` can access;
+    deleted IDs are sent for all of them.
+
+    A stream that is read to the end does not move past now minus
+    SYNC_LAG_SECONDS, so a write that committed late with an earlier
+    updated_at is still picked up by the next sync; the rows of those last
+    seconds are sent again.
+    """
+    lag_bound = (utcnow() - timedelta(seconds=current_app.config.get('SYNC_LAG_SECONDS', 5)), 0)
+    changes = {}
+    deleted = {name: [] for name in SYNCED_MODELS}
+    next_positions = {}
+    has_more = False
+
+    for stream in STREAMS:
+        if stream == 'deleted':
+            timestamp, model = Tombstone.deleted_at, Tombstone
+            statement = select(Tombstone.id, Tombstone.entity, Tombstone.entity_id, Tombstone.deleted_at)
+        else:
+            model = SYNCED_MODELS[stream]
+            timestamp = model.updated_at
+            statement = select(*SYNCED_COLUMNS[stream], model.created_at, model.updated_at)
+
+        if model is Project:
+            statement = filter_projects(statement, user, Project.id)
+        elif model is Task:
+            statement = filter_projects(statement, user, Task.project_id)
+
+        rows = db.session.execute(
+            statement
+            .where(tuple_(timestamp, model.id) > tuple_(*positions[stream]))
+            .order_by(timestamp, model.id)
+            .limit(limit + 1)
+        ).mappings().all()
+
+        if len(rows) > limit:
+            rows = rows[:limit]
+            has_more = True
+            next_positions[stream] = (rows[-1][timestamp.key], rows[-1]["id"])
+        else:
+            reached = (rows[-1][timestamp.key], rows[-1]["id"]) if rows else positions[stream]
+            next_positions[stream] = max(positions[stream], min(reached, lag_bound))
+
+        if stream == 'deleted':
+            for tombstone in rows:
+                deleted[tombstone["entity"]].append(tombstone["entity_id"])
+        else:
+            changes[stream] = [row_dict(row) for row in rows]
+
+    return {**changes, "deleted": deleted}, next_positions, has_more
+
+def init_sync(app):
+
+    @app.cli.group("sync")
+    def sync_cli():
+        """Delta sync commands."""
+
+    @sync_cli.command("prune")
+    def prune():
+        """Delete tombstones older than SYNC_TOMBSTONE_RETAIN_DAYS."""
+        deleted = prune_tombstones()
+        db.session.commit()
+        click.echo(f"Deleted {deleted} tombstones")
@@ -4,6 +4,8 @@ import pytest
 from config import TestConfig
 from app import app_init
 from app.extensions import db
+from app.models.users import User
+from app.routes.auth import create_auth_token
 
 @pytest.fixture(scope='session')
 def app():
@@ -43,4 +45,21 @@ def db_session(app):
             transaction.rollback()
         except Exception:
             pass
-        connection.close()
\ No newline at end of file
+        connection.close()
+
+@pytest.fixture(scope='function')
+def manager_token(db_session):
+    """JWT of the shared manager user, created on first use."""
+    manager_user = db_session.query(User).filter_by(email="manager@example.com").first()
+    if not manager_user:
+        manager_user = User(
+            first_name="Manager",
+            last_name="User",
+            email="manager@example.com",
+            role="manager",
+            password="SecureP@ssword1"
+        )
+        db_session.add(manager_user)
+        db_session.commit()
+
+    return create_auth_token(manager_user)
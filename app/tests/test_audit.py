@@ -0,0 +1,94 @@
+import json
+import os
+import queue
+
+from app.audit import AuditWriter, audit_entry
+from app.metrics import metrics
+from app.models.audit_log import AuditLog
+from app.models.projects import Project
+
+def test_project_writes_are_audited(client, db_session, manager_token):
+    headers = {"Authorization": f"Bearer {manager_token}"}
+    response = client.post(
+        "/api/projects",
+        data=json.dumps({"name": "Audited project"}),
+        headers=headers,
+        content_type="application/json"
+    )
+    project_id = response.get_json()["id"]
+    client.patch(
+        f"/api/projects/{project_id}",
+        data=json.dumps({"description": "audited"}),
+        headers=headers,
+        content_type="application/json"
+    )
+    client.delete(f"/api/projects/{project_id}", headers=headers)
+
+    response = client.get(f"/api/admin/audit?entity=project&entity_id={project_id}", headers=headers)
+    assert response.status_code == 200
+    entries = response.get_json()["data"]
+    assert [entry["action"] for entry in entries] == ["delete", "update", "create"]
+    assert entries[1]["changes"] == {"description": "audited"}
+    assert entries[1]["route"] == "projects.update_project"
+    assert entries[2]["changes"]["name"] == "Audited project"
+    assert entries[2]["user_id"] is not None
+
+    response = client.get(
+        f"/api/admin/audit?entity=project&entity_id={project_id}&per_page=2",
+        headers=headers
+    )
+    payload = response.get_json()
+    assert len(payload["data"]) == 2
+    response = client.get(
+        f"/api/admin/audit?entity=project&entity_id={project_id}&per_page=2&cursor={payload['next_cursor']}",
+        headers=headers
+    )
+    assert [entry["action"] for entry in response.get_json()["data"]] == ["create"]
+    assert response.get_json()["next_cursor"] is None
+
+
+def test_rolled_back_writes_and_passwords_are_not_logged(client, db_session, manager_token):
+    headers = {"Authorization": f"Bearer {manager_token}"}
+    response = client.post(
+        "/api/users",
+        data=json.dumps({
+            "first_name": "Audited",
+            "last_name": "User",
+            "email": "audited@example.com",
+            "role": "employee",
+            "password": "SecureP@ssword1",
+            "confirm_password": "SecureP@ssword1"
+        }),
+        headers=headers,
+        content_type="application/json"
+    )
+    user_id = response.get_json()["id"]
+
+    db_session.add(Project(name="Never committed"))
+    db_session.flush()
+    db_session.rollback()
+
+    entries = db_session.query(AuditLog).filter_by(entity="user", entity_id=user_id).all()
+    assert [entry.action for entry in entries] == ["create"]
+    assert entries[0].changes["password"] == "***"
+    assert db_session.query(AuditLog).filter(AuditLog.changes["name"].as_string() == "Never committed").count() == 0
+
+
+def test_full_queue_drops_entries(app):
+    writer = AuditWriter()
+    writer.app = app
+    # Pretend the writer thread is running so entries stay queued
+    writer._pid = os.getpid()
+    writer._queue = queue.Queue(maxsize=2)
+
+    app.config.update(AUDIT_WRITER="thread", AUDIT_QUEUE_FULL="drop")
+    try:
+        with app.app_context():
+            dropped = metrics.get("audit_dropped")
+            writer.submit([audit_entry("delete", Project, project_id) for project_id in (-1, -2, -3)])
+            assert metrics.get("audit_dropped") == dropped + 1
+
+            assert writer.flush() == 2
+            assert AuditLog.query.filter(AuditLog.entity_id < 0).count() == 2
+    finally:
+        app.config.update(AUDIT_WRITER="inline", AUDIT_QUEUE_FULL="block")
@@ -0,0 +1,94 @@
+
+import json
+
+import pytest
+
+from app.metrics import metrics
+from app.models.users import User
+from app.models.rate_limits import RateLimitBucket
+from app.rate_limit import limiter, DatabaseBucketStore, MemoryBucketStore
+
+@pytest.fixture(autouse=True)
+def reset_limiter():
+    limiter.reset()
+    yield
+    limiter.reset()
+
+def create_user(session, email="login@example.com"):
+    user = User(
+        first_name="Login",
+        last_name="User",
+        email=email,
+        role="employee",
+        password="SecureP@ssword1"
+    )
+    session.add(user)
+    session.commit()
+    return user
+
+def login(client, email, password="SecureP@ssword1"):
+    return client.post(
+        "/auth/token",
+        data=json.dumps({"email": email, "password": password}),
+        content_type="application/json"
+    )
+
+def test_token_success(client, db_session):
+    create_user(db_session)
+    response = login(client, "login@example.com")
+    assert response.status_code == 200
+    assert "token" in response.get_json()
+
+
+def test_token_rate_limited_per_email(app, client, db_session):
+    create_user(db_session, "limited@example.com")
+    burst = app.config["AUTH_RATE_LIMIT_EMAIL_BURST"]
+    rejected = metrics.get("auth_rate_limited", scope="email")
+
+    for _ in range(burst):
+        assert login(client, "limited@example.com", "wrong").status_code == 401
+
+    response = login(client, "LIMITED@example.com")
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert metrics.get("auth_rate_limited", scope="email") == rejected + 1
+
+    assert login(client, "other@example.com").status_code == 401
+
+
+def test_token_rate_limited_per_address(app, client, db_session):
+    burst = app.config["AUTH_RATE_LIMIT_ADDRESS_BURST"]
+    for i in range(burst):
+        assert login(client, f"user{i}@example.com").status_code == 401
+
+    assert login(client, "login@example.com").status_code == 429
+
+
+def test_memory_bucket_refills():
+    store = MemoryBucketStore()
+    assert store.consume("k", 1, 1.0, now=0.0) == (True, 0)
+    assert store.consume("k", 1, 1.0, now=0.5) == (False, 1)
+    assert store.consume("k", 1, 1.0, now=1.5)[0] is True
+
+
+def test_database_bucket_store(app):
+    store = DatabaseBucketStore()
+    with app.app_context():
+        assert store.consume("k", 2, 1.0, now=100.0) == (True, 0)
+        assert store.consume("k", 2, 1.0, now=100.0) == (True, 0)
+        assert store.consume("k", 2, 1.0, now=100.0) == (False, 1)
+        assert store.consume("k", 2, 1.0, now=101.0) == (True, 0)
+        store.clear()
+
+
+def test_database_bucket_store_sweeps_refilled_buckets(app):
+    store = DatabaseBucketStore(ttl=10, sweep_interval=5)
+    with app.app_context():
+        assert store.consume("old", 2, 1.0, now=100.0) == (True, 0)
+        assert store.consume("recent", 2, 1.0, now=108.0) == (True, 0)
+
+        # A new bucket after the sweep interval deletes the ones idle for longer than ttl
+        assert store.consume("new", 2, 1.0, now=115.0) == (True, 0)
+        keys = {bucket.key for bucket in RateLimitBucket.query.all()}
+        assert keys == {"recent", "new"}
+        store.clear()
@@ -0,0 +1,68 @@
+import json
+
+from app.models.projects import Project
+
+def post_batch(client, token, batch):
+    return client.post(
+        "/api/batch",
+        data=json.dumps(batch),
+        headers={"Authorization": f"Bearer {token}"},
+        content_type="application/json"
+    )
+
+def test_batch_refers_to_earlier_results(client, db_session, manager_token):
+    response = post_batch(client, manager_token, {"operations": [
+        {"name": "project", "method": "POST", "path": "/api/projects", "body": {"name": "Batched project"}},
+        {"name": "task", "method": "POST", "path": "/api/projects/$project.id/tasks", "body": {"title": "First"}},
+        {"method": "GET", "path": "/api/projects/$project.id/tasks?per_page=5"},
+        {"method": "GET", "path": "/api/tasks?ids=$task.id"},
+        {"method": "POST", "path": "/api/projects/$missing.id/tasks", "body": {"title": "Orphan"}},
+        {"method": "DELETE", "path": "/api/projects/$project.id"}
+    ]})
+
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert [result["status"] for result in results] == [201, 201, 200, 200, 424, 200]
+    project_id = results[0]["body"]["id"]
+    assert results[1]["body"]["project_id"] == project_id
+    assert [task["title"] for task in results[2]["body"]["data"]] == ["First"]
+    assert results[3]["body"]["data"][0]["id"] == results[1]["body"]["id"]
+
+
+def test_atomic_batch_rolls_back_on_failure(client, db_session, manager_token):
+    response = post_batch(client, manager_token, {"atomic": True, "operations": [
+        {"name": "project", "method": "POST", "path": "/api/projects", "body": {"name": "Atomic project"}},
+        {"method": "POST", "path": "/api/projects/$project.id/tasks", "body": {"description": "no title"}},
+        {"method": "GET", "path": "/api/projects"}
+    ]})
+
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload["committed"] is False
+    assert [result["status"] for result in payload["results"]] == [201, 400]
+    assert db_session.query(Project).filter_by(name="Atomic project").count() == 0
+
+def test_atomic_batch_keeps_writes_before_an_existing_dependency(client, db_session, manager_token):
+    response = post_batch(client, manager_token, {"atomic": True, "operations": [
+        {"name": "project", "method": "POST", "path": "/api/projects", "body": {"name": "Atomic dependency project"}},
+        {"name": "first", "method": "POST", "path": "/api/projects/$project.id/tasks", "body": {"title": "First"}},
+        {"name": "second", "method": "POST", "path": "/api/projects/$project.id/tasks", "body": {"title": "Second"}},
+        {"method": "POST", "path": "/api/tasks/$second.id/dependencies", "body": {"depends_on_id": "$first.id"}},
+        {"method": "POST", "path": "/api/tasks/$second.id/dependencies", "body": {"depends_on_id": "$first.id"}}
+    ]})
+
+    payload = response.get_json()
+    assert [result["status"] for result in payload["results"]] == [201, 201, 201, 201, 200]
+    assert payload["committed"] is True
+    project = db_session.query(Project).filter_by(name="Atomic dependency project").one()
+    assert len(project.tasks) == 2
+
+    headers = {"Authorization": f"Bearer {manager_token}"}
+    assert client.delete(f"/api/projects/{project.id}", headers=headers).status_code == 200
+
+
+def test_batch_rejects_invalid_operations(client, db_session, manager_token):
+    response = post_batch(client, manager_token, {"operations": [
+        {"method": "POST", "path": "/api/batch", "body": {"operations": []}}
+    ]})
+    assert response.status_code == 400
@@ -0,0 +1,71 @@
+import threading
+import time
+
+from app.coalescing import SingleFlight
+
+def wait_for_waiters(flights, key, count):
+    deadline = time.monotonic() + 5
+    while flights._calls[key].waiters < count and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+def test_concurrent_calls_share_one_computation():
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "page"
+
+    def request():
+        results.append(flights.do("key", compute, timeout=5))
+
+    leader = threading.Thread(target=request)
+    leader.start()
+    started.wait(5)
+
+    followers = [threading.Thread(target=request) for _ in range(3)]
+    for follower in followers:
+        follower.start()
+    wait_for_waiters(flights, "key", 3)
+    release.set()
+
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert sorted(results, key=lambda result: result[1]) == [("page", False)] + [("page", True)] * 3
+    assert len(calls) == 1
+    assert "key" not in flights._calls
+
+def test_waiters_recompute_when_the_leader_fails():
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    results = []
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("database went away")
+
+    def leader():
+        try:
+            flights.do("key", failing, timeout=5)
+        except RuntimeError:
+            results.append("leader failed")
+
+    thread = threading.Thread(target=leader)
+    thread.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(flights.do("key", lambda: "own", timeout=5)))
+    follower.start()
+    wait_for_waiters(flights, "key", 1)
+    release.set()
+
+    thread.join(5)
+    follower.join(5)
+    assert sorted(results, key=str) == [("own", False), "leader failed"]
@@ -0,0 +1,140 @@
+import json
+
+from sqlalchemy import delete, func, select
+
+from app.events import prune_events
+from app.models.change_events import ChangeEvent
+
+def parse_stream(body):
+    events = []
+    for block in body.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line and not line.startswith(":"))
+        if "event" in fields:
+            events.append(fields)
+    return events
+
+def latest_event_id(session):
+    return session.execute(select(func.max(ChangeEvent.id))).scalar() or 0
+
+def test_stream_replays_changes_after_last_event_id(client, db_session, manager_token):
+    headers = {"Authorization": f"Bearer {manager_token}"}
+    start = latest_event_id(db_session)
+
+    response = client.post(
+        "/api/projects",
+        data=json.dumps({"name": "Streamed project"}),
+        headers=headers,
+        content_type="application/json"
+    )
+    project_id = response.get_json()["id"]
+    client.post(
+        f"/api/projects/{project_id}/tasks",
+        data=json.dumps({"title": "Streamed task"}),
+        headers=headers,
+        content_type="application/json"
+    )
+    client.post(
+        "/api/projects",
+        data=json.dumps({"name": "Other project"}),
+        headers=headers,
+        content_type="application/json"
+    )
+    client.patch(
+        f"/api/projects/{project_id}",
+        data=json.dumps({"name": "Renamed"}),
+        headers=headers,
+        content_type="application/json"
+    )
+
+    response = client.get(
+        f"/api/events?project_id={project_id}",
+        headers={**headers, "Last-Event-ID": str(start)}
+    )
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+
+    events = parse_stream(response.get_data(as_text=True))
+    assert [event["event"] for event in events] == ["project.create", "task.create", "project.update"]
+    assert json.loads(events[1]["data"])["data"]["title"] == "Streamed task"
+    assert json.loads(events[2]["data"])["data"]["name"] == "Renamed"
+
+    # Resuming from the last received event skips what was already seen
+    response = client.get(
+        f"/api/events?project_id={project_id}",
+        headers={**headers, "Last-Event-ID": events[-1]["id"]}
+    )
+    assert parse_stream(response.get_data(as_text=True)) == []
+
+def test_stream_sends_heartbeats_and_reset(client, db_session, manager_token):
+    headers = {"Authorization": f"Bearer {manager_token}"}
+    for name in ("Pruned 1", "Pruned 2", "Pruned 3"):
+        client.post("/api/projects", data=json.dumps({"name": name}), headers=headers, content_type="application/json")
+
+    response = client.get("/api/events", headers=headers)
+    body = response.get_data(as_text=True)
+    assert ": heartbeat" in body
+    assert parse_stream(body) == []
+
+    prune_events(1)
+    response = client.get("/api/events", headers={**headers, "Last-Event-ID": "1"})
+    assert [event["event"] for event in parse_stream(response.get_data(as_text=True))] == ["reset"]
+
+def test_stream_rejects_invalid_parameters(client, db_session, manager_token):
+    headers = {"Authorization": f"Bearer {manager_token}"}
+
+    assert client.get("/api/events?project_id=999999", headers=headers).status_code == 404
+    assert client.get("/api/events", headers={**headers, "Last-Event-ID": "abc"}).status_code == 400
+
+def test_deleting_project_streams_task_deletes(client, db_session, manager_token):
+    headers = {"Authorization": f"Bearer {manager_token}"}
+    response = client.post(
+        "/api/projects",
+        data=json.dumps({"name": "Doomed project"}),
+        headers=headers,
+        content_type="application/json"
+    )
+    project_id = response.get_json()["id"]
+    response = client.post(
+        f"/api/projects/{project_id}/tasks",
+        data=json.dumps({"title": "Doomed task"}),
+        headers=headers,
+        content_type="application/json"
+    )
+    task_id = response.get_json()["id"]
+    start = latest_event_id(db_session)
+
+    client.delete(f"/api/projects/{project_id}", headers=headers)
+
+    response = client.get("/api/events", headers={**headers, "Last-Event-ID": str(start)})
+    events = parse_stream(response.get_data(as_text=True))
+    assert [event["event"] for event in events] == ["task.delete", "project.delete"]
+    assert json.loads(events[0]["data"])["entity_id"] == task_id
+
+def test_feed_delivers_events_that_commit_out_of_order(client, db_session):
+    from app.events import feed
+    start = latest_event_id(db_session)
+    def commit_event(event_id):
+        db_session.add(ChangeEvent(id=event_id, entity="project", op="update", entity_id=event_id, project_id=None))
+        db_session.commit()
+
+    try:
+        # start + 1 is taken by a transaction that has not committed yet
+        commit_event(start + 2)
+        subscription, reset = feed.subscribe(None, start)
+        feed.poll([subscription])
+        assert [(resume_id, change["id"]) for resume_id, change in subscription.drain()] == [(start, start + 2)]
+
+        commit_event(start + 1)
+        feed.poll([subscription])
+        assert [(resume_id, change["id"]) for resume_id, change in subscription.drain()] == [(start + 2, start + 1)]
+
+        # A gap that never fills, a rollback, is given up on after the lag
+        commit_event(start + 4)
+        feed.poll([subscription])
+        assert subscription.resume_id == start + 2 and subscription.drain()[0][0] == start + 2
+        subscription.lag = 0
+        feed.poll([subscription])
+        assert subscription.resume_id == start + 4
+    finally:
+        db_session.execute(delete(ChangeEvent).where(ChangeEvent.id > start))
+        db_session.commit()
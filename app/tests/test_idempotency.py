@@ -0,0 +1,89 @@
+
+import json
+from datetime import timedelta
+
+from app import idempotency
+from app.extensions import db
+from app.idempotency import sweep_expired, utcnow, request_fingerprint
+from app.models.idempotency_keys import IdempotencyKey
+from app.models.projects import Project
+from app.models.users import User
+
+def post_project(client, token, key, name):
+    return client.post(
+        "/api/projects",
+        data=json.dumps({"name": name, "description": "desc"}),
+        headers={"Authorization": f"Bearer {token}", "Idempotency-Key": key},
+        content_type="application/json"
+    )
+
+def test_create_project_replayed(client, db_session, manager_token):
+    first = post_project(client, manager_token, "create-once", "Idempotent project")
+    assert first.status_code == 201
+
+    retry = post_project(client, manager_token, "create-once", "Idempotent project")
+    assert retry.status_code == 201
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.get_json() == first.get_json()
+
+    assert db_session.query(Project).filter_by(name="Idempotent project").count() == 1
+
+
+def test_idempotency_key_reused_for_other_request(client, db_session, manager_token):
+    assert post_project(client, manager_token, "reused-key", "Project A").status_code == 201
+    response = post_project(client, manager_token, "reused-key", "Project B")
+    assert response.status_code == 422
+    assert db_session.query(Project).filter_by(name="Project B").count() == 0
+
+
+def test_validation_errors_are_stored(client, db_session, manager_token):
+    headers = {"Authorization": f"Bearer {manager_token}", "Idempotency-Key": "bad-request"}
+
+    for _ in range(2):
+        response = client.post("/api/projects", data=json.dumps({"description": "x"}), headers=headers, content_type="application/json")
+        assert response.status_code == 400
+    assert response.headers["Idempotent-Replayed"] == "true"
+
+
+def test_sweep_expired_keys(app, db_session):
+    now = utcnow()
+    db_session.add_all([
+        IdempotencyKey(key=f"old-{i}", user_id=1, request_hash="x", created_at=now, expires_at=now - timedelta(seconds=1))
+        for i in range(5)
+    ] + [
+        IdempotencyKey(key="fresh", user_id=1, request_hash="x", created_at=now, expires_at=now + timedelta(hours=1))
+    ])
+    db_session.commit()
+
+    with app.app_context():
+        assert sweep_expired(batch_size=2) == 5
+        assert db.session.query(IdempotencyKey).filter_by(key="fresh").count() == 1
+
+
+def test_concurrent_retry_rolls_back_its_write(app, client, db_session, manager_token, monkeypatch):
+    body = json.dumps({"name": "Raced project", "description": "desc"})
+    manager = db_session.query(User).filter_by(email="manager@example.com").first()
+    with app.test_request_context("/api/projects", method="POST", data=body):
+        fingerprint = request_fingerprint()
+
+    # The winning request's key, committed while this one was running
+    now = utcnow()
+    db_session.add(IdempotencyKey(
+        key="raced", user_id=manager.id, request_hash=fingerprint,
+        status_code=201, response_body='{"id": 0}', content_type="application/json",
+        created_at=now, expires_at=now + timedelta(hours=1)
+    ))
+    db_session.commit()
+
+    lookups = []
+    real_find_key = idempotency.find_key
+    def find_key(user_id, key):
+        lookups.append(key)
+        return None if len(lookups) == 1 else real_find_key(user_id, key)
+    monkeypatch.setattr(idempotency, "find_key", find_key)
+
+    response = post_project(client, manager_token, "raced", "Raced project")
+    assert response.status_code == 201
+    assert response.headers["Idempotent-Replayed"] == "true"
+    assert response.get_json() == {"id": 0}
+    assert db_session.query(Project).filter_by(name="Raced project").count() == 0
@@ -0,0 +1,114 @@
+import json
+
+from datetime import timedelta
+
+from app.extensions import db
+from app.jobs import jobs, utcnow
+from app.models.jobs import Job, JobStatus
+from app.models.projects import Project
+from app.models.tasks import Task
+
+def test_delete_project_async(client, db_session, manager_token):
+    headers = {"Authorization": f"Bearer {manager_token}"}
+    project = Project(name="Async delete", description="desc")
+    db_session.add(project)
+    db_session.commit()
+    project_id = project.id
+    db_session.add_all([Task(title=f"Task {i}", project_id=project_id) for i in range(3)])
+    db_session.commit()
+
+    response = client.delete(f"/api/projects/{project_id}?async=true", headers=headers)
+    assert response.status_code == 202
+    job_id = response.get_json()["id"]
+    assert response.headers["Location"] == f"/api/jobs/{job_id}"
+
+    response = client.get(f"/api/jobs/{job_id}", headers=headers)
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload["status"] == "succeeded"
+    assert payload["progress"] == 100
+    assert payload["result"] == {"project_id": project_id, "deleted_tasks": 3}
+    assert db_session.get(Project, project_id) is None
+
+
+def test_export_project(client, db_session, manager_token):
+    headers = {"Authorization": f"Bearer {manager_token}"}
+    project = Project(name="Export", description="desc")
+    db_session.add(project)
+    db_session.commit()
+    db_session.add(Task(title="Exported task", project_id=project.id))
+    db_session.commit()
+
+    response = client.post(f"/api/projects/{project.id}/export", headers=headers)
+    assert response.status_code == 202
+
+    payload = client.get(response.headers["Location"], headers=headers).get_json()
+    assert payload["status"] == "succeeded"
+    assert payload["result"]["tasks"] == 1
+
+    response = client.get(payload["result"]["download"], headers=headers)
+    assert response.status_code == 200
+    exported = json.loads(response.get_data())
+    assert exported["project"]["name"] == "Export"
+    assert [t["title"] for t in exported["tasks"]] == ["Exported task"]
+
+
+def test_get_job_not_found(client, db_session, manager_token):
+    headers = {"Authorization": f"Bearer {manager_token}"}
+    response = client.get("/api/jobs/999", headers=headers)
+    assert response.status_code == 404
+    assert response.get_json()["error"] == "Job not found"
+
+
+def test_resume_unfinished_jobs(app, db_session):
+    project = Project(name="Resumed export", description="desc")
+    db_session.add(project)
+    db_session.commit()
+
+    queued = Job(type="export_project", status=JobStatus.queued, payload={"project_id": project.id})
+    stale = Job(
+        type="export_project",
+        status=JobStatus.running,
+        payload={"project_id": project.id},
+        attempts=1,
+        locked_until=utcnow() - timedelta(minutes=1)
+    )
+    leased = Job(
+        type="export_project",
+        status=JobStatus.running,
+        payload={"project_id": project.id},
+        attempts=1,
+        locked_until=utcnow() + timedelta(minutes=5)
+    )
+    db_session.add_all([queued, stale, leased])
+    db_session.commit()
+
+    with app.app_context():
+        jobs.start()
+        jobs.resume()
+
+        assert db.session.get(Job, queued.id).status == JobStatus.succeeded
+        assert db.session.get(Job, stale.id).status == JobStatus.succeeded
+        assert db.session.get(Job, stale.id).attempts == 2
+        assert db.session.get(Job, leased.id).status == JobStatus.running
+
+
+def test_reap_skips_fresh_jobs(app, db_session):
+    # Jobs of a project that does not exist fail when they run
+    fresh = Job(type="export_project", status=JobStatus.queued, payload={"project_id": 0})
+    orphaned = Job(
+        type="export_project",
+        status=JobStatus.queued,
+        payload={"project_id": 0},
+        created_at=utcnow() - timedelta(hours=1)
+    )
+    db_session.add_all([fresh, orphaned])
+    db_session.commit()
+
+    with app.app_context():
+        jobs.start()
+        jobs.reap()
+
+        assert db.session.get(Job, fresh.id).status == JobStatus.queued
+        assert db.session.get(Job, orphaned.id).status == JobStatus.failed
+        assert db.session.get(Job, orphaned.id).attempts == 1
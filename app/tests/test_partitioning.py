@@ -0,0 +1,67 @@
+import os
+
+import pytest
+from sqlalchemy import text
+
+from config import TestConfig
+from app import app_init, partitioning
+from app.extensions import db
+from app.models.projects import Project
+from app.models.tasks import Task
+
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+def test_partitioning_needs_postgres(app):
+    result = app.test_cli_runner().invoke(args=["partition-tasks", "status"])
+    assert result.exit_code != 0
+    assert "needs PostgreSQL" in result.output
+
+
+@pytest.mark.skipif(not POSTGRES_URL, reason="set TEST_POSTGRES_URL to a scratch PostgreSQL database")
+def test_partition_tasks_online():
+    class PostgresConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = POSTGRES_URL
+
+    app = app_init(PostgresConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        try:
+            projects = [Project(name=f"Partitioned {i}") for i in range(5)]
+            db.session.add_all(projects)
+            db.session.commit()
+            db.session.add_all([Task(title=f"Task {i}", project_id=projects[i % 5].id) for i in range(50)])
+            db.session.commit()
+
+            partitioning.prepare(partitions=4)
+            assert partitioning.status()["step"] == "copy"
+
+            # Writes during the copy reach the partitioned table through the trigger
+            first = Task.query.order_by(Task.id).first()
+            first.title = "Renamed while copying"
+            db.session.add(Task(title="Added while copying", project_id=projects[0].id))
+            db.session.delete(Task.query.order_by(Task.id.desc()).offset(1).first())
+            db.session.commit()
+
+            partitioning.copy(chunk_size=7)
+            partitioning.swap()
+            assert partitioning.status()["step"] == "drop-old"
+
+            old = db.session.execute(text("SELECT id, title, project_id FROM tasks_unpartitioned ORDER BY id")).all()
+            new = db.session.execute(text("SELECT id, title, project_id FROM tasks ORDER BY id")).all()
+            assert new == old
+            assert db.session.execute(
+                text("SELECT count(*) FROM pg_inherits WHERE inhparent = 'tasks'::regclass")
+            ).scalar() == 4
+
+            # IDs keep coming from the same sequence
+            task = Task(title="After swap", project_id=projects[1].id)
+            db.session.add(task)
+            db.session.commit()
+            assert task.id > old[-1].id
+
+            partitioning.drop_old()
+            assert partitioning.status()["step"] == "done"
+        finally:
+            db.session.remove()
+            db.drop_all()
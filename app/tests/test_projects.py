@@ -1,6 +1,9 @@
 
 import json
 
+from sqlalchemy import event
+
+from app.extensions import db
 from app.models.projects import Project
 from app.models.users import User
 from app.models.tasks import Task
@@ -220,3 +223,235 @@ def test_get_tasks_invalid_id_format(client, db_session):
     response = client.get("/api/projects/abc/tasks", headers=headers)
     assert response.status_code == 400
     assert response.get_json()["error"] == "Invalid ID format"
+
+
+def test_get_projects_by_ids(client, db_session):
+    headers = {"Authorization": f"Bearer {get_token(db_session)}"}
+    first = Project(name="Batch #1", description="desc")
+    second = Project(name="Batch #2", description="desc")
+    db_session.add_all([first, second])
+    db_session.commit()
+
+    response = client.get(f"/api/projects?ids={second.id},999,{first.id},{second.id}", headers=headers)
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert [p["id"] for p in payload["data"]] == [second.id, first.id]
+    assert payload["missing"] == [999]
+
+
+def test_get_projects_by_ids_too_many(app, client, db_session):
+    headers = {"Authorization": f"Bearer {get_token(db_session)}"}
+    ids = ",".join(str(i) for i in range(app.config["BATCH_MAX_IDS"] + 1))
+    response = client.get(f"/api/projects?ids={ids}", headers=headers)
+    assert response.status_code == 400
+    assert "Too many IDs" in response.get_json()["error"]
+
+
+def test_get_tasks_by_ids(client, db_session):
+    headers = {"Authorization": f"Bearer {get_token(db_session)}"}
+    project = Project(name="Project #1", description="desc")
+    db_session.add(project)
+    db_session.commit()
+
+    task = Task(title="Batch task", description="desc", project_id=project.id)
+    db_session.add(task)
+    db_session.commit()
+
+    response = client.get(f"/api/tasks?ids=999,{task.id}", headers=headers)
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert [t["title"] for t in payload["data"]] == ["Batch task"]
+    assert payload["missing"] == [999]
+
+    response = client.get("/api/tasks?ids=1,abc", headers=headers)
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Invalid ID format"
+
+
+def test_update_project_single_statement(client, db_session):
+    from sqlalchemy import event
+    from app.extensions import db
+
+    headers = {"Authorization": f"Bearer {get_token(db_session)}"}
+    project = Project(name="Returning", description="desc")
+    db_session.add(project)
+    db_session.commit()
+
+    statements = []
+    def count(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith(("UPDATE", "SELECT projects")):
+            statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", count)
+    try:
+        response = client.patch(f"/api/projects/{project.id}", data=json.dumps({"name": "Patched"}), headers=headers, content_type="application/json")
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count)
+
+    assert response.status_code == 200
+    assert response.get_json() == {"id": project.id, "name": "Patched", "description": "desc", "version": 2}
+    assert len(statements) == 1
+    assert "RETURNING" in statements[0]
+
+
+def test_update_project_without_returning(client, db_session, monkeypatch):
+    monkeypatch.setattr("app.writes.returning_supported", lambda kind: False)
+    headers = {"Authorization": f"Bearer {get_token(db_session)}"}
+    project = Project(name="Emulated", description="desc")
+    db_session.add(project)
+    db_session.commit()
+
+    response = client.put(f"/api/projects/{project.id}", data=json.dumps({"description": "new"}), headers=headers, content_type="application/json")
+    assert response.status_code == 200
+    assert response.get_json()["description"] == "new"
+
+    response = client.put("/api/projects/999", data=json.dumps({"description": "new"}), headers=headers, content_type="application/json")
+    assert response.status_code == 404
+
+    response = client.delete(f"/api/projects/{project.id}", headers=headers)
+    assert response.status_code == 200
+
+
+def test_patch_project_unknown_field(client, db_session):
+    headers = {"Authorization": f"Bearer {get_token(db_session)}"}
+    project = Project(name="Patch", description="desc")
+    db_session.add(project)
+    db_session.commit()
+
+    response = client.patch(f"/api/projects/{project.id}", data=json.dumps({"owner": "x"}), headers=headers, content_type="application/json")
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Unknown field: owner"
+
+
+def test_delete_project_with_tasks(client, db_session):
+    headers = {"Authorization": f"Bearer {get_token(db_session)}"}
+    project = Project(name="Delete with tasks", description="desc")
+    db_session.add(project)
+    db_session.commit()
+    project_id = project.id
+    db_session.add_all([Task(title=f"Task {i}", project_id=project_id) for i in range(3)])
+    db_session.commit()
+
+    response = client.delete(f"/api/projects/{project_id}", headers=headers)
+    assert response.status_code == 200
+    assert db_session.query(Task).filter_by(project_id=project_id).count() == 0
+
+
+def test_update_project_if_match(client, db_session):
+    headers = {"Authorization": f"Bearer {get_token(db_session)}"}
+    project = Project(name="Versioned", description="desc")
+    db_session.add(project)
+    db_session.commit()
+
+    response = client.get(f"/api/projects/{project.id}", headers=headers)
+    version = response.headers["ETag"]
+    assert version == '"1"'
+
+    response = client.put(
+        f"/api/projects/{project.id}",
+        data=json.dumps({"name": "First edit"}),
+        headers={**headers, "If-Match": version},
+        content_type="application/json"
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"2"'
+
+    response = client.patch(
+        f"/api/projects/{project.id}",
+        data=json.dumps({"name": "Stale edit"}),
+        headers={**headers, "If-Match": version},
+        content_type="application/json"
+    )
+    assert response.status_code == 412
+    assert db_session.get(Project, project.id).name == "First edit"
+
+    response = client.patch(
+        "/api/projects/999",
+        data=json.dumps({"name": "Missing"}),
+        headers={**headers, "If-Match": version},
+        content_type="application/json"
+    )
+    assert response.status_code == 404
+
+
+def test_list_projects_include_tasks_query_count(app, client, db_session):
+    headers = {"Authorization": f"Bearer {get_token(db_session)}"}
+    projects = [Project(name=f"Included #{i}", description="desc") for i in range(12)]
+    db_session.add_all(projects)
+    db_session.commit()
+    db_session.add_all([Task(title=f"Task {i}", project_id=project.id) for project in projects for i in range(3)])
+    db_session.commit()
+    ids = ",".join(str(project.id) for project in projects)
+
+    statements = []
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(db.engine, "before_cursor_execute", count)
+    try:
+        small = client.get("/api/projects?include=tasks&tasks_limit=2&per_page=2", headers=headers)
+        small_count = len(statements)
+        statements.clear()
+        large = client.get("/api/projects?include=tasks&tasks_limit=2&per_page=50", headers=headers)
+        large_count = len(statements)
+        statements.clear()
+        by_ids = client.get(f"/api/projects?ids={ids}&include=tasks&tasks_limit=2", headers=headers)
+        by_ids_count = len(statements)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count)
+
+    assert large.status_code == 200
+    assert small_count == large_count
+    assert len(large.get_json()["data"]) > 2
+    for project in by_ids.get_json()["data"]:
+        assert [task["title"] for task in project["tasks"]] == ["Task 0", "Task 1"]
+    # The token's user, the projects and their tasks
+    assert by_ids_count == 3
+
+    # The tests share one database, keep the first pages of projects small
+    for project in projects:
+        assert client.delete(f"/api/projects/{project.id}", headers=headers).status_code == 200
+
+
+def test_get_project_include_unknown(client, db_session):
+    headers = {"Authorization": f"Bearer {get_token(db_session)}"}
+    project = Project(name="Include project", description="desc")
+    db_session.add(project)
+    db_session.commit()
+
+    response = client.get(f"/api/projects/{project.id}?include=tasks", headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()["tasks"] == []
+
+    response = client.get(f"/api/projects/{project.id}?include=owner", headers=headers)
+    assert response.status_code == 400
+
+
+def test_employee_sees_member_projects_only(client, db_session):
+    headers = {"Authorization": f"Bearer {get_token(db_session)}"}
+    employee = User(first_name="Member", last_name="User", email="member@example.com", role="employee", password="SecureP@ssword1")
+    db_session.add(employee)
+    project = Project(name="Members project", description="desc")
+    db_session.add(project)
+    db_session.commit()
+    employee_headers = {"Authorization": f"Bearer {create_auth_token(employee)}"}
+
+    assert client.get(f"/api/projects/{project.id}", headers=employee_headers).status_code == 404
+    assert client.get(f"/api/projects/{project.id}/tasks", headers=employee_headers).status_code == 404
+
+    response = client.put(f"/api/projects/{project.id}/members/{employee.id}", headers=headers)
+    assert response.status_code == 201
+    assert client.put(f"/api/projects/{project.id}/members/{employee.id}", headers=headers).status_code == 200
+
+    assert client.get(f"/api/projects/{project.id}", headers=employee_headers).status_code == 200
+    listed = client.get("/api/projects", headers=employee_headers).get_json()
+    assert [p["id"] for p in listed["data"]] == [project.id]
+    members = client.get(f"/api/projects/{project.id}/members", headers=headers).get_json()
+    assert [member["user_id"] for member in members["data"]] == [employee.id]
+
+    response = client.delete(f"/api/projects/{project.id}/members/{employee.id}", headers=headers)
+    assert response.status_code == 200
+    assert client.get(f"/api/projects/{project.id}", headers=employee_headers).status_code == 404
+
+    # The tests share one database, keep the first pages of projects and users small
+    assert client.delete(f"/api/projects/{project.id}", headers=headers).status_code == 200
+    assert client.delete(f"/api/users/{employee.id}", headers=headers).status_code == 200
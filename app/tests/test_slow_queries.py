@@ -0,0 +1,68 @@
+import json
+
+from app.models.projects import Project
+from app.slow_queries import explain, normalize, slow_queries
+
+def test_normalize_folds_in_lists():
+    assert normalize("SELECT *\n  FROM tasks WHERE id IN (?, ?, ?)") == "SELECT * FROM tasks WHERE id IN (...)"
+    assert normalize("WHERE id IN (%(id_1_1)s, %(id_1_2)s)") == "WHERE id IN (...)"
+
+
+def test_explain_analyzes_read_only_selects_only():
+    class Connection:
+        class dialect:
+            name = 'postgresql'
+
+        def __init__(self):
+            self.executed = []
+
+        def exec_driver_sql(self, statement, parameters):
+            self.executed.append(statement)
+            return [("Seq Scan on tasks",)]
+
+    writes = [
+        "WITH moved AS (UPDATE tasks SET rank = %(rank)s WHERE id = %(id)s RETURNING id) SELECT id FROM moved",
+        "with gone as (delete from tasks where id = %(id)s returning id) select id from gone",
+        "SELECT id FROM projects WHERE id = %(id)s FOR UPDATE",
+        "SELECT id FROM tasks FOR NO KEY UPDATE",
+        "SELECT id FROM tasks FOR SHARE",
+        "SELECT id INTO task_copy FROM tasks",
+        "UPDATE tasks SET version = version + 1 WHERE id = %(id)s",
+    ]
+    for statement in writes:
+        connection = Connection()
+        assert explain(connection, statement, {}, analyze=True) == ["Seq Scan on tasks"]
+        assert connection.executed == [f"EXPLAIN (COSTS) {statement}"]
+
+    connection = Connection()
+    explain(connection, "  SELECT id FROM tasks WHERE project_id = %(id)s", {}, analyze=True)
+    assert connection.executed[0].startswith("EXPLAIN (ANALYZE, BUFFERS) ")
+
+
+def test_slow_queries_are_logged_with_plan(app, client, db_session, manager_token):
+    headers = {"Authorization": f"Bearer {manager_token}"}
+    project = Project(name="Slow project", description="desc")
+    db_session.add(project)
+    db_session.commit()
+
+    with open(app.config["SLOW_QUERY_LOG_FILE"], "w"):
+        pass
+    slow_queries.reset()
+    app.config["SLOW_QUERY_THRESHOLD_MS"] = 0
+    try:
+        response = client.get(f"/api/projects/{project.id}/tasks", headers=headers)
+        assert response.status_code == 200
+    finally:
+        app.config["SLOW_QUERY_THRESHOLD_MS"] = 200
+
+    response = client.get("/api/admin/slow-queries", headers=headers)
+    assert response.status_code == 200
+    entries = response.get_json()["data"]
+    tasks_query = next(entry for entry in entries if entry["sql"].startswith("SELECT tasks.id"))
+    assert tasks_query["routes"] == {"projects.get_tasks": 1}
+    assert tasks_query["plan"]
+    assert all(isinstance(value, str) for value in tasks_query["params"])
+
+    with open(app.config["SLOW_QUERY_LOG_FILE"]) as f:
+        records = [json.loads(line) for line in f]
+    assert any(record["route"] == "projects.get_tasks" and record.get("plan") for record in records)
@@ -0,0 +1,20 @@
+import os
+
+from sqlalchemy import create_engine
+
+from config import SQLiteConfig
+from app.sqlite import use_pragmas
+
+def test_sqlite_profile_pragmas_are_set_on_every_connection(tmp_path):
+    engine = create_engine(f"sqlite:///{os.path.join(tmp_path, 'profile.db')}", **SQLiteConfig.SQLALCHEMY_ENGINE_OPTIONS)
+    use_pragmas(engine, SQLiteConfig.SQLITE_PRAGMAS)
+    try:
+        with engine.connect() as first, engine.connect() as second:
+            for connection in (first, second):
+                pragma = lambda name: connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+                assert pragma("journal_mode") == "wal"
+                assert pragma("synchronous") == 1  # NORMAL
+                assert pragma("busy_timeout") == SQLiteConfig.SQLITE_PRAGMAS["busy_timeout"]
+                assert pragma("cache_size") == SQLiteConfig.SQLITE_PRAGMAS["cache_size"]
+    finally:
+        engine.dispose()
@@ -0,0 +1,48 @@
+
+import json
+
+from config import TestConfig
+from app import app_init
+
+def test_swagger_spec_generated_lazily(app, client):
+    swagger = app.swag
+    swagger.apispecs.clear()
+
+    response = client.get("/apispec_1.json")
+    assert response.status_code == 200
+    assert "/api/projects" in response.get_json()["paths"]
+    assert "apispec_1" in swagger.apispecs
+
+
+def test_swagger_build_and_serve_compiled_spec(app, client, tmp_path):
+    output = tmp_path / "swagger.json"
+    result = app.test_cli_runner().invoke(args=["swagger", "build", "-o", str(output)])
+    assert result.exit_code == 0
+    spec = json.loads(output.read_text())
+    assert "/api/projects/{project_id}" in spec["paths"]
+
+    spec["info"]["title"] = "Compiled"
+    output.write_text(json.dumps(spec))
+
+    app.config["SWAGGER_SPEC_FILE"] = str(output)
+    try:
+        response = client.get("/apispec_1.json")
+        assert response.get_json()["info"]["title"] == "Compiled"
+    finally:
+        app.config["SWAGGER_SPEC_FILE"] = None
+        app.swag.__dict__.pop("compiled_apispecs", None)
+
+
+def test_swagger_ui_and_spec_disabled():
+    class NoUIConfig(TestConfig):
+        SWAGGER_UI = False
+
+    class NoSwaggerConfig(TestConfig):
+        SWAGGER_ENABLED = False
+
+    rules = {rule.rule for rule in app_init(NoUIConfig).url_map.iter_rules()}
+    assert "/apidocs/" not in rules
+    assert "/apispec_1.json" in rules
+
+    rules = {rule.rule for rule in app_init(NoSwaggerConfig).url_map.iter_rules()}
+    assert "/apispec_1.json" not in rules
@@ -0,0 +1,72 @@
+import time
+
+from app.models.projects import Project
+from app.models.tasks import Task
+from app.models.timestamps import utcnow
+from app.models.users import User
+
+def sync(client, headers, **args):
+    response = client.get("/api/sync", query_string=args, headers=headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+def test_sync_sends_changes_and_deletes(client, db_session, manager_token, app):
+    headers = {"Authorization": f"Bearer {manager_token}"}
+    since = utcnow().isoformat()
+    project = Project(name="Synced project", description="desc")
+    db_session.add(project)
+    db_session.commit()
+    tasks = [Task(title=f"Synced task {i}", project_id=project.id) for i in range(3)]
+    db_session.add_all(tasks)
+    db_session.commit()
+    task_ids = sorted(task.id for task in tasks)
+
+    app.config["SYNC_PAGE_SIZE"] = 2
+    try:
+        first = sync(client, headers, updated_since=since)
+        assert first["has_more"] is True
+        assert [task["title"] for task in first["tasks"]] == ["Synced task 0", "Synced task 1"]
+        assert [p["name"] for p in first["projects"]] == ["Synced project"]
+
+        second = sync(client, headers, cursor=first["cursor"])
+        assert [task["title"] for task in second["tasks"]] == ["Synced task 2"]
+        assert second["has_more"] is False
+    finally:
+        app.config["SYNC_PAGE_SIZE"] = 500
+
+    response = client.delete(f"/api/projects/{project.id}", headers=headers)
+    assert response.status_code == 200
+
+    third = sync(client, headers, cursor=second["cursor"])
+    assert third["deleted"]["projects"] == [project.id]
+    assert sorted(third["deleted"]["tasks"]) == task_ids
+    assert project.id not in [p["id"] for p in third["projects"]]
+
+
+def test_sync_rejects_bad_input(client, db_session, manager_token, app):
+    headers = {"Authorization": f"Bearer {manager_token}"}
+    assert client.get("/api/sync?updated_since=yesterday", headers=headers).status_code == 400
+    assert client.get("/api/sync?cursor=abc", headers=headers).status_code == 400
+    assert client.get("/api/sync?updated_since=2000-01-01T00:00:00Z", headers=headers).status_code == 410
+
+
+def test_user_timestamps_are_set_per_row(db_session):
+    first = User(first_name="Early", last_name="User", email="early@example.com", role="employee", password="SecureP@ssword1")
+    db_session.add(first)
+    db_session.commit()
+    time.sleep(0.01)
+    second = User(first_name="Late", last_name="User", email="late@example.com", role="employee", password="SecureP@ssword1")
+    db_session.add(second)
+    db_session.commit()
+
+    assert second.created_at > first.created_at
+    updated_at = first.updated_at
+    time.sleep(0.01)
+    first.first_name = "Earlier"
+    db_session.commit()
+    assert first.updated_at > updated_at
+
+    # The tests share one database, keep the first page of users small
+    db_session.delete(first)
+    db_session.delete(second)
+    db_session.commit()
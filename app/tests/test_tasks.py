@@ -0,0 +1,472 @@
+
+import json
+
+import pytest
+from sqlalchemy import delete, event, func, insert, select
+
+from app import dependencies, ranks
+from app.extensions import db
+from app.models.projects import Project
+from app.models.task_closure import TaskClosure
+from app.models.task_dependencies import TaskDependency
+from app.models.tasks import Task
+from app.models.users import User
+from app.routes.auth import create_auth_token
+
+def create_employee(session, email):
+    user = User(
+        first_name="Employee",
+        last_name="User",
+        email=email,
+        role="employee",
+        password="SecureP@ssword1"
+    )
+    session.add(user)
+    session.commit()
+    return user
+
+def create_project(session, name="Project #1", tasks=0):
+    project = Project(name=name, description="desc")
+    session.add(project)
+    session.commit()
+    session.add_all([Task(title=f"{name} task {i}", project_id=project.id) for i in range(tasks)])
+    session.commit()
+    return project
+
+def test_assign_and_unassign_task(client, db_session, manager_token):
+    headers = {"Authorization": f"Bearer {manager_token}"}
+    employee = create_employee(db_session, "assignee@example.com")
+    project = create_project(db_session, tasks=1)
+    task = db_session.query(Task).filter_by(project_id=project.id).first()
+
+    response = client.put(
+        f"/api/tasks/{task.id}/assignee",
+        data=json.dumps({"assignee_id": employee.id}),
+        headers=headers,
+        content_type="application/json"
+    )
+    assert response.status_code == 200
+    assert response.get_json()["assignee_id"] == employee.id
+
+    response = client.delete(f"/api/tasks/{task.id}/assignee", headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()["assignee_id"] is None
+
+
+def test_assign_task_unknown_user(client, db_session, manager_token):
+    headers = {"Authorization": f"Bearer {manager_token}"}
+    project = create_project(db_session, tasks=1)
+    task = db_session.query(Task).filter_by(project_id=project.id).first()
+
+    response = client.put(
+        f"/api/tasks/{task.id}/assignee",
+        data=json.dumps({"assignee_id": 999}),
+        headers=headers,
+        content_type="application/json"
+    )
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Assignee not found"
+
+    response = client.put(
+        "/api/tasks/999/assignee",
+        data=json.dumps({"assignee_id": 1}),
+        headers=headers,
+        content_type="application/json"
+    )
+    assert response.status_code == 404
+
+
+def test_my_tasks_feed(client, db_session):
+    employee = create_employee(db_session, "feed@example.com")
+    headers = {"Authorization": f"Bearer {create_auth_token(employee)}"}
+
+    assigned = []
+    for name in ("Feed A", "Feed B", "Feed C"):
+        project = create_project(db_session, name, tasks=2)
+        for task in db_session.query(Task).filter_by(project_id=project.id):
+            task.assignee_id = employee.id
+            assigned.append(task.id)
+    db_session.commit()
+    create_project(db_session, "Unassigned", tasks=2)
+
+    seen = []
+    cursor = None
+    while True:
+        url = "/api/users/me/tasks?per_page=4" + (f"&cursor={cursor}" if cursor else "")
+        payload = client.get(url, headers=headers).get_json()
+        seen.extend(task["id"] for task in payload["data"])
+        cursor = payload["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == sorted(assigned, reverse=True)
+    assert client.get("/api/users/me/tasks?cursor=abc", headers=headers).status_code == 400
+
+
+def test_delete_user_unassigns_tasks(client, db_session, manager_token):
+    headers = {"Authorization": f"Bearer {manager_token}"}
+    employee = create_employee(db_session, "leaving@example.com")
+    project = create_project(db_session, tasks=1)
+    task = db_session.query(Task).filter_by(project_id=project.id).first()
+    task.assignee_id = employee.id
+    db_session.commit()
+
+    assert client.delete(f"/api/users/{employee.id}", headers=headers).status_code == 200
+    db_session.expire_all()
+    assert db_session.get(Task, task.id).assignee_id is None
+
+def test_get_tasks_caps_per_page_and_streams(client, db_session, manager_token, app):
+    headers = {"Authorization": f"Bearer {manager_token}"}
+    project = create_project(db_session, name="Streamed project", tasks=7)
+    app.config.update(MAX_PER_PAGE=5, STREAM_BATCH_SIZE=2)
+    try:
+        response = client.get(f"/api/projects/{project.id}/tasks?per_page=100000", headers=headers)
+    finally:
+        app.config.update(MAX_PER_PAGE=100, STREAM_BATCH_SIZE=100)
+
+    assert response.status_code == 200
+    assert response.is_streamed
+    payload = response.get_json()
+    assert (payload["total"], payload["per_page"], payload["pages"]) == (7, 5, 2)
+    assert [task["title"] for task in payload["data"]] == [f"Streamed project task {i}" for i in range(5)]
+
+def test_get_tasks_cached_total_is_invalidated_by_writes(client, db_session, manager_token, app):
+    headers = {"Authorization": f"Bearer {manager_token}"}
+    project = create_project(db_session, name="Counted project", tasks=3)
+    url = f"/api/projects/{project.id}/tasks"
+    app.config["PAGINATION_COUNT"] = "cached"
+    try:
+        first = client.get(url, headers=headers).get_json()
+        second = client.get(url, headers=headers).get_json()
+
+        response = client.post(
+            url,
+            data=json.dumps({"title": "One more"}),
+            headers=headers,
+            content_type="application/json"
+        )
+        assert response.status_code == 201
+        third = client.get(url, headers=headers).get_json()
+    finally:
+        app.config["PAGINATION_COUNT"] = "exact"
+
+    assert (first["total"], first["total_exact"]) == (3, True)
+    assert (second["total"], second["total_exact"]) == (3, False)
+    assert (third["total"], third["total_exact"]) == (4, True)
+
+def test_reads_load_no_instances(client, db_session, manager_token):
+    headers = {"Authorization": f"Bearer {manager_token}"}
+    project = create_project(db_session, name="Core read project", tasks=3)
+    loaded = []
+    def count(target, context):
+        loaded.append(target)
+    event.listen(Task, "load", count)
+    event.listen(Project, "load", count)
+    try:
+        tasks = client.get(f"/api/projects/{project.id}/tasks", headers=headers)
+        single = client.get(f"/api/projects/{project.id}?include=tasks", headers=headers)
+        projects = client.get("/api/projects", headers=headers)
+    finally:
+        event.remove(Task, "load", count)
+        event.remove(Project, "load", count)
+
+    assert [task["title"] for task in tasks.get_json()["data"]] == [f"Core read project task {i}" for i in range(3)]
+    assert single.get_json()["version"] == 1 and len(single.get_json()["tasks"]) == 3
+    assert single.headers["ETag"] == '"1"'
+    assert projects.status_code == 200
+    assert loaded == []
+
+
+def titles(client, headers, project_id, **args):
+    response = client.get(f"/api/projects/{project_id}/tasks", query_string=args, headers=headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+def test_key_between_keeps_order():
+    keys = [ranks.key_between(None, None)]
+    for i in range(3000):
+        if i % 3 == 0:
+            keys.append(ranks.key_between(keys[-1], None))
+        elif i % 3 == 1:
+            keys.insert(0, ranks.key_between(None, keys[0]))
+        else:
+            middle = len(keys) // 2
+            keys.insert(middle, ranks.key_between(keys[middle - 1], keys[middle]))
+    assert keys == sorted(keys)
+    assert len(set(keys)) == len(keys)
+    # Only the keys put into the same gap again and again grow
+    assert len(keys[0]) == len(keys[-1]) == 6
+
+def test_move_task_writes_one_row(client, db_session, manager_token):
+    headers = {"Authorization": f"Bearer {manager_token}"}
+    project = create_project(db_session, name="Ranked project", tasks=4)
+    tasks = [task["id"] for task in titles(client, headers, project.id)["data"]]
+
+    updates = []
+    def count(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE tasks"):
+            updates.append(parameters)
+    event.listen(db.engine, "before_cursor_execute", count)
+    try:
+        response = client.post(f"/api/tasks/{tasks[3]}/move", json={"after_id": tasks[0]}, headers=headers)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count)
+    assert response.status_code == 200
+    assert len(updates) == 1
+
+    assert client.post(f"/api/tasks/{tasks[0]}/move", json={"before_id": None}, headers=headers).status_code == 200
+    assert client.post(f"/api/tasks/{tasks[2]}/move", json={"after_id": None}, headers=headers).status_code == 200
+    order = [task["id"] for task in titles(client, headers, project.id)["data"]]
+    assert order == [tasks[2], tasks[3], tasks[1], tasks[0]]
+
+    other = create_project(db_session, name="Other ranked project", tasks=1)
+    response = client.post(f"/api/tasks/{tasks[1]}/move", json={"after_id": other.tasks[0].id}, headers=headers)
+    assert response.status_code == 400
+    assert client.post(f"/api/tasks/{tasks[1]}/move", json={}, headers=headers).status_code == 400
+
+def test_get_tasks_keyset_pages(client, db_session, manager_token):
+    headers = {"Authorization": f"Bearer {manager_token}"}
+    project = create_project(db_session, name="Keyset project", tasks=5)
+
+    first = titles(client, headers, project.id, per_page=2)
+    second = titles(client, headers, project.id, per_page=2, cursor=first["next_cursor"])
+    third = titles(client, headers, project.id, per_page=2, cursor=second["next_cursor"])
+    assert [task["title"] for task in first["data"] + second["data"] + third["data"]] == \
+        [f"Keyset project task {i}" for i in range(5)]
+    assert third["next_cursor"] is None
+    assert client.get(f"/api/projects/{project.id}/tasks?cursor=abc", headers=headers).status_code == 400
+
+def test_long_ranks_are_rebalanced(client, db_session, manager_token, app):
+    headers = {"Authorization": f"Bearer {manager_token}"}
+    project = create_project(db_session, name="Rebalanced project", tasks=3)
+    tasks = [task["id"] for task in titles(client, headers, project.id)["data"]]
+
+    app.config["RANK_REBALANCE_LENGTH"] = 8
+    try:
+        # Always into the same gap, each move makes the key longer
+        for i in range(12):
+            moved = tasks[1] if i % 2 == 0 else tasks[2]
+            response = client.post(f"/api/tasks/{moved}/move", json={"after_id": tasks[0]}, headers=headers)
+            assert response.status_code == 200
+    finally:
+        app.config["RANK_REBALANCE_LENGTH"] = 24
+
+    data = titles(client, headers, project.id)["data"]
+    assert [task["id"] for task in data] == [tasks[0], tasks[2], tasks[1]]
+    # The inline job runner rebalanced after the move that went past the limit
+    assert max(len(task["rank"]) for task in data) <= 8
+
+def test_subtasks_ten_levels_deep(client, db_session, manager_token):
+    headers = {"Authorization": f"Bearer {manager_token}"}
+    project = create_project(db_session, name="Subtask project", tasks=1)
+    other_root = project.tasks[0].id
+
+    chain = []
+    for level in range(10):
+        response = client.post(f"/api/projects/{project.id}/tasks", headers=headers,
+                               json={"title": f"Level {level}", "parent_id": chain[-1] if chain else None})
+        assert response.status_code == 201
+        chain.append(response.get_json()["id"])
+
+    ancestors = client.get(f"/api/tasks/{chain[9]}/ancestors", headers=headers).get_json()["data"]
+    assert [task["id"] for task in ancestors] == chain[:9]
+    assert [task["depth"] for task in ancestors] == list(range(9, 0, -1))
+    assert client.get(f"/api/tasks/{chain[0]}/ancestors", headers=headers).get_json() == {"data": []}
+
+    subtree = client.get(f"/api/tasks/{chain[0]}/subtree", headers=headers).get_json()
+    assert subtree["task"]["id"] == chain[0]
+    assert [(task["id"], task["parent_id"], task["depth"]) for task in subtree["data"]] == \
+        [(chain[i], chain[i - 1], i) for i in range(1, 10)]
+    assert len(client.get(f"/api/tasks/{chain[0]}/subtree?max_depth=2", headers=headers).get_json()["data"]) == 2
+
+    # Levels 5 to 9 go under the other top level task, then back to the top level
+    assert client.put(f"/api/tasks/{chain[0]}/parent", json={"parent_id": chain[9]}, headers=headers).status_code == 400
+    assert client.put(f"/api/tasks/{chain[5]}/parent", json={"parent_id": chain[5]}, headers=headers).status_code == 400
+    response = client.put(f"/api/tasks/{chain[5]}/parent", json={"parent_id": other_root}, headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()["parent_id"] == other_root
+    ancestors = client.get(f"/api/tasks/{chain[9]}/ancestors", headers=headers).get_json()["data"]
+    assert [task["id"] for task in ancestors] == [other_root, *chain[5:9]]
+    assert len(client.get(f"/api/tasks/{chain[0]}/subtree", headers=headers).get_json()["data"]) == 4
+
+    assert client.put(f"/api/tasks/{chain[5]}/parent", json={"parent_id": None}, headers=headers).status_code == 200
+    ancestors = client.get(f"/api/tasks/{chain[9]}/ancestors", headers=headers).get_json()["data"]
+    assert [task["id"] for task in ancestors] == chain[5:9]
+
+    other = create_project(db_session, name="Other subtask project", tasks=1)
+    response = client.post(f"/api/projects/{other.id}/tasks", json={"title": "Stray", "parent_id": chain[0]}, headers=headers)
+    assert response.status_code == 400
+
+    response = client.delete(f"/api/tasks/{chain[2]}", headers=headers)
+    assert response.get_json()["deleted_tasks"] == 3
+    assert [task["id"] for task in client.get(f"/api/tasks/{chain[0]}/subtree", headers=headers).get_json()["data"]] == [chain[1]]
+    assert db_session.execute(select(func.count()).select_from(TaskClosure).where(
+        TaskClosure.descendant_id.in_(chain[2:5]) | TaskClosure.ancestor_id.in_(chain[2:5])
+    )).scalar() == 0
+
+    assert client.delete(f"/api/projects/{project.id}", headers=headers).status_code == 200
+    assert db_session.execute(select(func.count()).select_from(TaskClosure).where(
+        TaskClosure.descendant_id.in_(chain + [other_root])
+    )).scalar() == 0
+
+def test_subtree_of_100k_tasks(client, db_session, manager_token):
+    headers = {"Authorization": f"Bearer {manager_token}"}
+    project = create_project(db_session, name="Large tree project")
+
+    # Ten subtasks under each task, five levels below the root: 111,111 tasks
+    first_id = (db_session.execute(select(func.max(Task.id))).scalar() or 0) + 1
+    tasks, paths = [], []
+    levels = [[first_id]]
+    parents = {first_id: None}
+    ancestors = {first_id: []}
+    next_id = first_id + 1
+    for _ in range(5):
+        level = []
+        for parent in levels[-1]:
+            for _ in range(10):
+                parents[next_id] = parent
+                ancestors[next_id] = [parent, *ancestors[parent]]
+                level.append(next_id)
+                next_id += 1
+        levels.append(level)
+    for task_id, rank in zip(parents, ranks.sequence(len(parents))):
+        tasks.append({"id": task_id, "title": f"Node {task_id}", "project_id": project.id,
+                      "parent_id": parents[task_id], "rank": rank, "version": 1})
+        paths.extend({"ancestor_id": ancestor, "descendant_id": task_id, "depth": depth}
+                      for depth, ancestor in enumerate(ancestors[task_id], 1))
+    db_session.execute(insert(Task), tasks)
+    db_session.execute(insert(TaskClosure), paths)
+    db_session.commit()
+
+    try:
+        leaf = levels[-1][-1]
+        response = client.get(f"/api/tasks/{leaf}/ancestors", headers=headers)
+        assert [task["id"] for task in response.get_json()["data"]] == list(reversed(ancestors[leaf]))
+
+        data = client.get(f"/api/tasks/{first_id}/subtree", headers=headers).get_json()["data"]
+        assert len(data) == len(parents) - 1
+        assert [task["depth"] for task in data[:10]] == [1] * 10 and data[-1]["depth"] == 5
+
+        middle = levels[2][37]
+        data = client.get(f"/api/tasks/{middle}/subtree", headers=headers).get_json()["data"]
+        assert len(data) == 1110
+        assert all(middle in ancestors[task["id"]] for task in data)
+
+        # Both reads are served by an index of task_closure, whatever the tree's size
+        connection = db_session.connection()
+        plans = [" ".join(str(row[-1]) for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", (middle,)))
+                 for sql in ("SELECT descendant_id FROM task_closure WHERE ancestor_id = ?",
+                             "SELECT ancestor_id FROM task_closure WHERE descendant_id = ? ORDER BY depth DESC")]
+        assert "USING PRIMARY KEY" in plans[0] or "sqlite_autoindex_task_closure" in plans[0]
+        assert "ix_task_closure_descendant_id_depth" in plans[1]
+    finally:
+        db_session.execute(delete(TaskClosure).where(TaskClosure.descendant_id >= first_id))
+        db_session.execute(delete(Task).where(Task.project_id == project.id))
+        db_session.execute(delete(Project).where(Project.id == project.id))
+        db_session.commit()
+
+
+def test_schedule_orders_tasks_after_their_dependencies():
+    order, path = dependencies.schedule([1, 2, 3, 4, 5], [(3, 1), (1, 2), (3, 4), (2, 4)])
+    assert order == [3, 5, 1, 2, 4]
+    assert path == [3, 1, 2, 4]
+    assert dependencies.schedule([], []) == ([], [])
+    with pytest.raises(ValueError):
+        dependencies.schedule([1, 2, 3], [(1, 2), (2, 3), (3, 1)])
+
+def test_task_dependencies(client, db_session, manager_token):
+    headers = {"Authorization": f"Bearer {manager_token}"}
+    project = create_project(db_session, name="Dependency project", tasks=4)
+    a, b, c, d = [task["id"] for task in titles(client, headers, project.id)["data"]]
+
+    def depend(task_id, depends_on_id):
+        return client.post(f"/api/tasks/{task_id}/dependencies", json={"depends_on_id": depends_on_id}, headers=headers)
+
+    assert depend(b, a).status_code == 201
+    assert depend(c, b).status_code == 201
+    assert depend(c, b).status_code == 200
+    assert depend(a, c).status_code == 409
+    assert depend(a, a).status_code == 409
+    other = create_project(db_session, name="Other dependency project", tasks=1)
+    assert depend(a, other.tasks[0].id).status_code == 400
+    prerequisites = client.get(f"/api/tasks/{c}/dependencies", headers=headers).get_json()["data"]
+    assert [task["id"] for task in prerequisites] == [b]
+
+    schedule = client.get(f"/api/projects/{project.id}/schedule", headers=headers).get_json()
+    assert schedule["order"] == [a, d, b, c]
+    assert schedule["critical_path"] == [a, b, c]
+
+    # Later reads apply the new change events to the cached graph, it is not read again
+    loads = []
+    load = dependencies.schedules.load
+    dependencies.schedules.load = lambda *args: loads.append(args) or load(*args)
+    try:
+        assert depend(a, d).status_code == 201
+        response = client.post(f"/api/projects/{project.id}/tasks", json={"title": "Last"}, headers=headers)
+        e = response.get_json()["id"]
+        assert depend(e, c).status_code == 201
+        schedule = client.get(f"/api/projects/{project.id}/schedule", headers=headers).get_json()
+        assert schedule["order"] == [d, a, b, c, e]
+        assert schedule["critical_path"] == [d, a, b, c, e]
+
+        assert client.delete(f"/api/tasks/{b}/dependencies/{a}", headers=headers).status_code == 200
+        assert client.delete(f"/api/tasks/{b}/dependencies/{a}", headers=headers).status_code == 404
+        assert client.delete(f"/api/tasks/{d}", headers=headers).status_code == 200
+        schedule = client.get(f"/api/projects/{project.id}/schedule", headers=headers).get_json()
+        assert schedule["order"] == [a, b, c, e]
+        assert schedule["critical_path"] == [b, c, e]
+        assert schedule["dependencies"] == 2
+
+        # Tasks free to go in any order follow a move
+        assert client.post(f"/api/tasks/{b}/move", json={"after_id": None}, headers=headers).status_code == 200
+        schedule = client.get(f"/api/projects/{project.id}/schedule", headers=headers).get_json()
+        assert schedule["order"] == [b, a, c, e]
+    finally:
+        dependencies.schedules.load = load
+    assert loads == []
+
+    assert client.delete(f"/api/projects/{project.id}", headers=headers).status_code == 200
+    assert db_session.execute(select(func.count()).select_from(TaskDependency).where(
+        TaskDependency.project_id == project.id
+    )).scalar() == 0
+
+def test_schedule_of_50k_tasks(client, db_session, manager_token):
+    headers = {"Authorization": f"Bearer {manager_token}"}
+    project = create_project(db_session, name="Large schedule project")
+
+    # A chain through every task, with shortcuts that do not make it any shorter
+    first_id = (db_session.execute(select(func.max(Task.id))).scalar() or 0) + 1
+    task_ids = list(range(first_id, first_id + 50000))
+    db_session.execute(insert(Task), [
+        {"id": task_id, "title": f"Step {task_id}", "project_id": project.id, "rank": rank, "version": 1}
+        for task_id, rank in zip(task_ids, ranks.sequence(len(task_ids)))
+    ])
+    db_session.execute(insert(TaskDependency), [
+        {"task_id": task_ids[i], "depends_on_id": task_ids[i - step], "project_id": project.id}
+        for i in range(1, len(task_ids)) for step in (1, 7, 100) if i >= step
+    ])
+    db_session.commit()
+
+    try:
+        schedule = client.get(f"/api/projects/{project.id}/schedule", headers=headers).get_json()
+        assert schedule["dependencies"] == 3 * 50000 - 1 - 7 - 100
+        assert schedule["order"] == task_ids
+        assert schedule["critical_path"] == task_ids
+
+        middle = task_ids[25000]
+        response = client.post(f"/api/tasks/{task_ids[0]}/dependencies", json={"depends_on_id": task_ids[-1]}, headers=headers)
+        assert response.status_code == 409
+        assert client.delete(f"/api/tasks/{middle}/dependencies/{middle - 1}", headers=headers).status_code == 200
+
+        schedule = client.get(f"/api/projects/{project.id}/schedule", headers=headers).get_json()
+        # The longest chains now skip six tasks with a shortcut around the removed link
+        path = schedule["critical_path"]
+        steps = [(before, after) for before, after in zip(path, path[1:])]
+        assert len(path) == 50000 - 6
+        assert all(after - before in (1, 7) for before, after in steps)
+        assert (middle - 1, middle) not in steps
+    finally:
+        db_session.execute(delete(TaskDependency).where(TaskDependency.project_id == project.id))
+        db_session.execute(delete(Task).where(Task.project_id == project.id))
+        db_session.execute(delete(Project).where(Project.id == project.id))
+        db_session.commit()
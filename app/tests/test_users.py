@@ -234,4 +234,102 @@ def test_delete_user_invalid_id(client, db_session):
     headers = {"Authorization": f"Bearer {get_token(db_session)}"}
     response = client.delete("/api/users/abc", headers=headers)
     assert response.status_code == 400
-    assert response.get_json()["error"] == "Invalid ID format"
\ No newline at end of file
+    assert response.get_json()["error"] == "Invalid ID format"
+
+def test_get_users_by_ids(client, db_session):
+    headers = {"Authorization": f"Bearer {get_token(db_session)}"}
+    user = User(
+        first_name="Batch",
+        last_name="User",
+        email="batchuser@example.com",
+        role="employee",
+        password="SecureP@ssword1"
+    )
+    db_session.add(user)
+    db_session.commit()
+
+    response = client.get(f"/api/users?ids={user.id},999", headers=headers)
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert [u["email"] for u in payload["data"]] == ["batchuser@example.com"]
+    assert payload["missing"] == [999]
+
+
+def test_update_user_invalid_role(client, db_session):
+    headers = {"Authorization": f"Bearer {get_token(db_session)}"}
+    user = User(
+        first_name="Role",
+        last_name="Test",
+        email="roletest@example.com",
+        role="employee",
+        password="SecureP@ssword1"
+    )
+    db_session.add(user)
+    db_session.commit()
+
+    response = client.patch(f"/api/users/{user.id}", data=json.dumps({"role": "owner"}), headers=headers, content_type="application/json")
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Invalid role"
+
+
+def test_update_user_duplicate_email(client, db_session):
+    headers = {"Authorization": f"Bearer {get_token(db_session)}"}
+    user = User(
+        first_name="Email",
+        last_name="Test",
+        email="emailtest@example.com",
+        role="employee",
+        password="SecureP@ssword1"
+    )
+    db_session.add(user)
+    db_session.commit()
+
+    response = client.patch(f"/api/users/{user.id}", data=json.dumps({"email": "manager@example.com"}), headers=headers, content_type="application/json")
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Email already exists"
+
+
+def test_update_user_if_match(client, db_session):
+    headers = {"Authorization": f"Bearer {get_token(db_session)}"}
+    user = User(
+        first_name="Versioned",
+        last_name="User",
+        email="versioned@example.com",
+        role="employee",
+        password="SecureP@ssword1"
+    )
+    db_session.add(user)
+    db_session.commit()
+
+    response = client.patch(
+        f"/api/users/{user.id}",
+        data=json.dumps({"first_name": "Stale"}),
+        headers={**headers, "If-Match": '"7"'},
+        content_type="application/json"
+    )
+    assert response.status_code == 412
+
+    response = client.patch(
+        f"/api/users/{user.id}",
+        data=json.dumps({"first_name": "Fresh"}),
+        headers={**headers, "If-Match": 'W/"1"'},
+        content_type="application/json"
+    )
+    assert response.status_code == 200
+    assert response.get_json()["version"] == 2
+
+
+def test_update_missing_user_reports_not_found_first(client, db_session):
+    headers = {"Authorization": f"Bearer {get_token(db_session)}"}
+
+    response = client.put("/api/users/999999", data="", headers=headers, content_type="application/json")
+    assert response.status_code == 404
+    assert response.get_json()["error"] == "User not found"
+
+    response = client.patch(
+        "/api/users/999999",
+        data=json.dumps({"unknown": "x"}),
+        headers=headers,
+        content_type="application/json"
+    )
+    assert response.status_code == 404
@@ -0,0 +1,13 @@
+
+from app.warmup import warm_up
+
+def test_warm_up(app, db_session, manager_token):
+    app.config["WARMUP_PATHS"] = ["/api/projects", "/api/users"]
+    try:
+        report = warm_up(app)
+    finally:
+        app.config.pop("WARMUP_PATHS")
+
+    assert report["connections"] == 1
+    assert "swagger_ms" in report
+    assert set(report) >= {"/api/projects", "/api/users"}
@@ -0,0 +1,69 @@
+
+import logging
+import time
+
+from app.extensions import db
+from app.jobs import jobs
+from app.models.users import User, Role
+from app.routes.auth import create_auth_token
+
+logger = logging.getLogger(__name__)
+
+def open_pool_connections(count):
+    """Check out ``count`` connections at once so the pool holds them when they are returned."""
+    connections = []
+    try:
+        for _ in range(count):
+            connection = db.engine.connect()
+            connection.exec_driver_sql("SELECT 1")
+            connections.append(connection)
+    finally:
+        for connection in connections:
+            connection.close()
+    return len(connections)
+
+def warm_up(app):
+    """
+    Prepare a freshly forked worker before it accepts traffic: fill the
+    connection pool, resume background jobs, load the Swagger spec and
+    serve WARMUP_PATHS once so their queries are compiled and cached.
+
+    Returns the time spent in each step, in milliseconds.
+    """
+    report = {}
+    config = app.config
+
+    with app.app_context():
+        started = time.perf_counter()
+        pool_size = getattr(db.engine.pool, "size", lambda: 1)()
+        report["connections"] = open_pool_connections(min(config.get("WARMUP_CONNECTIONS", 5), pool_size))
+        report["pool_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+        started = time.perf_counter()
+        jobs.start()
+        report["jobs_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+        swagger = getattr(app, "swag", None)
+        if swagger is not None:
+            started = time.perf_counter()
+            swagger.get_apispecs()
+            report["swagger_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+        manager = User.query.filter_by(role=Role.manager).first()
+        token = create_auth_token(manager) if manager else None
+        db.session.remove()
+
+    if token is None:
+        logger.warning("No manager user found, skipping request warm-up")
+        return report
+
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {token}"}
+    for path in config.get("WARMUP_PATHS", []):
+        started = time.perf_counter()
+        response = client.get(path, headers=headers)
+        if response.status_code >= 500:
+            logger.warning("Warm-up request %s failed with %s", path, response.status_code)
+        report[path] = round((time.perf_counter() - started) * 1000, 1)
+
+    return report
@@ -0,0 +1,95 @@
+
+from flask import request
+from sqlalchemy import delete, select, update
+
+from app.extensions import db
+from app import audit
+from app.sync import record_deletes
+
+class VersionConflict(Exception):
+    """The row exists but its version does not match the one the client expected."""
+
+def if_match_version():
+    """
+    Return the version from the request's ``If-Match`` header, or None when
+    the header is absent or ``*``. Raises VersionConflict when it cannot
+    match any version.
+    """
+    header = request.headers.get('If-Match')
+    if header is None or header.strip() == '*':
+        return None
+
+    # Versions are sent as ETag "3"; only the first tag of a list is used
+    tag = header.split(',')[0].strip()
+    if tag.startswith('W/'):
+        tag = tag[2:]
+    try:
+        return int(tag.strip('"'))
+    except ValueError:
+        raise VersionConflict()
+
+def etag(version):
+    return {'ETag': f'"{version}"'}
+
+def row_exists(model, ident):
+    return db.session.execute(select(model.id).where(model.id == ident)).first() is not None
+
+def returning_supported(statement_kind):
+    dialect = db.session.get_bind().dialect
+    return getattr(dialect, f"{statement_kind}_returning", False)
+
+def update_returning(model, ident, values, columns, expected_version=None):
+    """
+    Update the row with primary key ``ident`` and return ``columns`` of the
+    updated row as a mapping, or None when there is no such row.
+
+    Runs a single ``UPDATE ... RETURNING`` where the dialect supports it,
+    otherwise an UPDATE followed by a SELECT in the same transaction. With
+    no ``values`` the row is only read. The update is audited. The caller commits.
+
+    The model's version column is bumped with the update. With
+    ``expected_version`` the update only applies to that version, and
+    VersionConflict is raised when the row exists at another one.
+    """
+    criteria = [model.id == ident]
+    if expected_version is not None:
+        criteria.append(model.version == expected_version)
+
+    if not values:
+        row = db.session.execute(select(*columns).where(*criteria)).mappings().first()
+    else:
+        statement = update(model).where(*criteria).values(version=model.version + 1, **values)
+
+        if returning_supported("update"):
+            row = db.session.execute(statement.returning(*columns)).mappings().first()
+        elif db.session.execute(statement).rowcount == 0:
+            row = None
+        else:
+            row = db.session.execute(select(*columns).where(model.id == ident)).mappings().first()
+
+    if row is None and expected_version is not None:
+        # Only the failure path pays for telling a stale version from a missing row
+        if db.session.execute(select(model.id).where(model.id == ident)).first():
+            raise VersionConflict()
+
+    if values and row is not None:
+        audit.record('update', model, [ident], values)
+    return row
+
+def delete_returning(model, ident):
+    """
+    Delete the row with primary key ``ident`` and return whether it existed,
+    with ``DELETE ... RETURNING`` where supported. The deletion is audited
+    and leaves a tombstone for delta sync. The caller commits.
+    """
+    statement = delete(model).where(model.id == ident)
+
+    if returning_supported("delete"):
+        deleted = db.session.execute(statement.returning(model.id)).first() is not None
+    else:
+        deleted = db.session.execute(statement).rowcount > 0
+
+    if deleted:
+        audit.record('delete', model, [ident])
+        record_deletes(model, [ident])
+    return deleted
@@ -0,0 +1,117 @@
+"""
+Partitioning benchmark: get_tasks and project deletion on a plain tasks
+table, then on the same data after `flask partition-tasks`.
+
+    python benchmarks/partitioning.py --url postgresql+psycopg://localhost/pms_bench \
+        [--projects 2000] [--tasks-per-project 500] [--partitions 16] [--runs 200]
+
+The database at --url is dropped and recreated, point it at a scratch
+database. Requests go through the Flask test client, so the timings
+include routing and serialization and only the table layout differs.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import text
+
+from config import TestConfig
+from app import app_init, partitioning
+from app.extensions import db
+from app.models.users import User
+from app.routes.auth import create_auth_token
+
+def seed(projects, tasks_per_project):
+    db.session.execute(text(
+        "INSERT INTO projects (name, description, version) "
+        "SELECT 'Project ' || g, 'benchmark', 1 FROM generate_series(1, :projects) g"
+    ), {"projects": projects})
+    # Interleaved like real traffic, so one project's tasks are spread over the table
+    db.session.execute(text(
+        "INSERT INTO tasks (title, project_id, rank, version) "
+        "SELECT 'Task ' || g, 1 + g % :projects, '9' || lpad(g::text, 9, '0'), 1 FROM generate_series(1, :tasks) g"
+    ), {"projects": projects, "tasks": projects * tasks_per_project})
+    manager = User(first_name="Bench", last_name="Manager", email="bench@example.com", role="manager", password="SecureP@ssword1")
+    db.session.add(manager)
+    db.session.commit()
+    db.session.execute(text("ANALYZE"))
+    return create_auth_token(manager)
+
+def timed(func, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), sorted(samples)[int(len(samples) * 0.95) - 1]
+
+def measure(client, headers, project_ids, runs):
+    def get_tasks():
+        project_id = random.choice(project_ids)
+        response = client.get(f"/api/projects/{project_id}/tasks?page=3&per_page=20", headers=headers)
+        assert response.status_code == 200
+
+    def delete_project():
+        response = client.delete(f"/api/projects/{project_ids.pop()}", headers=headers)
+        assert response.status_code == 200
+
+    return {
+        "get_tasks": timed(get_tasks, runs),
+        "delete_project": timed(delete_project, max(runs // 10, 5))
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", required=True, help="Scratch PostgreSQL database URL")
+    parser.add_argument("--projects", type=int, default=2000)
+    parser.add_argument("--tasks-per-project", type=int, default=500)
+    parser.add_argument("--partitions", type=int, default=16)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    class BenchConfig(TestConfig):
+        JWT_SECRET_KEY = "benchmark"
+        SQLALCHEMY_DATABASE_URI = args.url
+        AUDIT_ENABLED = False
+
+    app = app_init(BenchConfig)
+    client = app.test_client()
+    results = {}
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        headers = {"Authorization": f"Bearer {seed(args.projects, args.tasks_per_project)}"}
+        project_ids = list(range(1, args.projects + 1))
+        random.shuffle(project_ids)
+
+        results["plain"] = measure(client, headers, project_ids, args.runs)
+
+        started = time.perf_counter()
+        partitioning.prepare(args.partitions)
+        partitioning.copy(chunk_size=50000)
+        partitioning.swap()
+        partitioning.drop_old()
+        db.session.execute(text("ANALYZE tasks"))
+        db.session.commit()
+        converted = time.perf_counter() - started
+
+        results["partitioned"] = measure(client, headers, project_ids, args.runs)
+        db.session.remove()
+        db.drop_all()
+
+    print(f"{args.projects} projects x {args.tasks_per_project} tasks, "
+          f"{args.partitions} partitions, converted in {converted:.1f}s")
+    print(f"{'layout':<12} {'operation':<16} {'median ms':>10} {'p95 ms':>10}")
+    for layout, operations in results.items():
+        for operation, (median, p95) in operations.items():
+            print(f"{layout:<12} {operation:<16} {median:>10.2f} {p95:>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Read path benchmark: rows per second for 1k-row pages of tasks, read
+through ORM instances (the way the list routes used to) and through the
+column-only selects of app.reads, then end to end through GET
+/api/projects/<id>/tasks.
+
+    python benchmarks/reads.py [--url sqlite:////tmp/pms_reads.db] [--rows 1000] [--runs 50]
+
+The database at --url is dropped and recreated, point it at a scratch
+database. Both read paths encode the same columns to JSON, so only the way
+rows are materialized differs.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import insert, select
+
+from config import TestConfig
+from app import app_init
+from app.extensions import db
+from app.models.projects import Project
+from app.models.tasks import Task
+from app.models.users import User
+from app.ranks import sequence
+from app.reads import row_dict
+from app.routes.auth import create_auth_token
+
+def seed(rows):
+    project = Project(name="Benchmark", description="benchmark")
+    manager = User(first_name="Bench", last_name="Manager", email="bench@example.com", role="manager", password="SecureP@ssword1")
+    db.session.add_all([project, manager])
+    db.session.commit()
+    db.session.execute(insert(Task), [
+        {"title": f"Task {i}", "description": "benchmark task", "project_id": project.id, "rank": rank, "version": 1}
+        for i, rank in enumerate(sequence(rows))
+    ])
+    db.session.commit()
+    return project.id, create_auth_token(manager)
+
+def read_orm(project_id, rows):
+    tasks = Task.query.filter_by(project_id=project_id).order_by(Task.id).limit(rows).yield_per(100)
+    encoded = json.dumps([{
+        "id": task.id,
+        "title": task.title,
+        "description": task.description,
+        "project_id": task.project_id
+    } for task in tasks])
+    db.session.expunge_all()
+    return encoded
+
+def read_core(project_id, rows):
+    statement = select(Task.id, Task.title, Task.description, Task.project_id) \
+      .where(Task.project_id == project_id) \
+      .order_by(Task.id) \
+      .limit(rows)
+    result = db.session.execute(statement, execution_options={"yield_per": 100}).mappings()
+    return json.dumps([row_dict(row) for row in result])
+
+def rows_per_second(func, rows, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return rows / statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite:///" + os.path.join(tempfile.gettempdir(), "pms_reads.db"),
+                        help="Scratch database URL")
+    parser.add_argument("--rows", type=int, default=1000, help="Rows per page")
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    class BenchConfig(TestConfig):
+        JWT_SECRET_KEY = "benchmark"
+        SQLALCHEMY_DATABASE_URI = args.url
+        MAX_PER_PAGE = args.rows
+        COALESCE_ENABLED = False
+        SLOW_QUERY_ENABLED = False
+        AUDIT_ENABLED = False
+
+    app = app_init(BenchConfig)
+    client = app.test_client()
+    results = {}
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        project_id, token = seed(args.rows)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        results["orm"] = rows_per_second(lambda: read_orm(project_id, args.rows), args.rows, args.runs)
+        results["core"] = rows_per_second(lambda: read_core(project_id, args.rows), args.rows, args.runs)
+
+        url = f"/api/projects/{project_id}/tasks?per_page={args.rows}"
+        def get_tasks():
+            response = client.get(url, headers=headers)
+            assert response.status_code == 200
+            response.get_data()
+        results["route"] = rows_per_second(get_tasks, args.rows, args.runs)
+
+        db.session.remove()
+        db.drop_all()
+
+    print(f"{args.rows} rows per page, median of {args.runs} runs")
+    print(f"{'read path':<12} {'rows/s':>12}")
+    for path, rate in results.items():
+        print(f"{path:<12} {rate:>12,.0f}")
+    print(f"core is {results['core'] / results['orm']:.1f}x the ORM read")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Schedule benchmark: GET /api/projects/<id>/schedule on a project with
+--tasks tasks and about three dependencies per task, timed cold (graph read
+from the tables and computed), cached, and after one dependency is added
+(change events applied to the cached graph, schedule recomputed). The
+computation on its own is timed as well.
+
+    python benchmarks/schedule.py [--url sqlite:////tmp/pms_schedule.db] [--tasks 50000] [--runs 20]
+
+The database at --url is dropped and recreated, point it at a scratch
+database.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import insert, select
+
+from config import TestConfig
+from app import app_init
+from app.dependencies import schedule, schedules
+from app.extensions import db
+from app.models.projects import Project
+from app.models.task_dependencies import TaskDependency
+from app.models.tasks import Task
+from app.models.users import User
+from app.ranks import sequence
+from app.routes.auth import create_auth_token
+
+def seed(count):
+    project = Project(name="Benchmark", description="benchmark")
+    manager = User(first_name="Bench", last_name="Manager", email="bench@example.com", role="manager", password="SecureP@ssword1")
+    db.session.add_all([project, manager])
+    db.session.commit()
+    db.session.execute(insert(Task), [
+        {"title": f"Task {i}", "project_id": project.id, "rank": rank, "version": 1}
+        for i, rank in enumerate(sequence(count))
+    ])
+    task_ids = db.session.execute(select(Task.id).where(Task.project_id == project.id).order_by(Task.id)).scalars().all()
+    # Each task after the one before it and two further back, like phases made of parallel streams
+    db.session.execute(insert(TaskDependency), [
+        {"task_id": task_ids[i], "depends_on_id": task_ids[i - step], "project_id": project.id}
+        for i in range(len(task_ids)) for step in (1, 13, 250) if i >= step
+    ])
+    db.session.commit()
+    return project.id, task_ids, create_auth_token(manager)
+
+def milliseconds(func, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite:///" + os.path.join(tempfile.gettempdir(), "pms_schedule.db"),
+                        help="Scratch database URL")
+    parser.add_argument("--tasks", type=int, default=50000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    class BenchConfig(TestConfig):
+        JWT_SECRET_KEY = "benchmark"
+        SQLALCHEMY_DATABASE_URI = args.url
+        COALESCE_ENABLED = False
+        SLOW_QUERY_ENABLED = False
+        AUDIT_ENABLED = False
+
+    app = app_init(BenchConfig)
+    client = app.test_client()
+    results = {}
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        project_id, task_ids, token = seed(args.tasks)
+        headers = {"Authorization": f"Bearer {token}"}
+        url = f"/api/projects/{project_id}/schedule"
+        edges = db.session.execute(
+            select(TaskDependency.depends_on_id, TaskDependency.task_id).where(TaskDependency.project_id == project_id)
+        ).all()
+
+        def get_schedule():
+            response = client.get(url, headers=headers)
+            assert response.status_code == 200
+            response.get_data()
+
+        def cold():
+            schedules.clear()
+            get_schedule()
+
+        added = iter(range(args.runs))
+        def changed():
+            # A new shortcut between tasks far apart in the chain, then the read that applies it
+            i = next(added)
+            response = client.post(f"/api/tasks/{task_ids[-1 - i]}/dependencies",
+                                   json={"depends_on_id": task_ids[i]}, headers=headers)
+            assert response.status_code == 201
+            started = time.perf_counter()
+            get_schedule()
+            return time.perf_counter() - started
+
+        results["compute only"] = milliseconds(lambda: schedule(task_ids, edges), args.runs)
+        results["cold"] = milliseconds(cold, args.runs)
+        results["cached"] = milliseconds(get_schedule, args.runs)
+        results["after a change"] = statistics.median(changed() for _ in range(args.runs)) * 1000
+
+        db.session.remove()
+        db.drop_all()
+
+    print(f"{args.tasks} tasks, {len(edges)} dependencies, median of {args.runs} runs")
+    print(f"{'read':<16} {'ms':>10}")
+    for read, duration in results.items():
+        print(f"{read:<16} {duration:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+SQLite concurrency benchmark: reader and writer threads hit the API at the
+same time on a SQLite file, once with SQLite's defaults and once with the
+SQLiteConfig profile (WAL, synchronous=NORMAL, mmap, cache size, busy
+timeout and a pool of one connection per thread).
+
+SQLite's defaults are a rollback journal and no busy handler, so a
+statement that finds the database locked fails at once with "database is
+locked". Python's sqlite3 module adds a 5 second wait of its own, which
+the default profile turns off (timeout=0) so that those failures show up
+as errors.
+
+    python benchmarks/sqlite_concurrency.py [--readers 8] [--writers 4] [--seconds 10]
+
+Readers page through a project's tasks, writers create tasks. Each
+profile runs in a fresh interpreter on a new database file in a temporary
+directory. Requests go through the Flask test client, so the timings
+include routing and serialization.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PROFILES = ("default", "sqlite")
+
+def run_profile(profile, path, readers, writers, seconds):
+    from sqlalchemy import insert
+
+    from config import SQLiteConfig, TestConfig
+    from app import app_init
+    from app.extensions import db
+    from app.models.projects import Project
+    from app.models.tasks import Task
+    from app.models.users import User
+    from app.ranks import sequence
+    from app.routes.auth import create_auth_token
+
+    class BenchConfig(TestConfig):
+        JWT_SECRET_KEY = "benchmark"
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{path}"
+        COALESCE_ENABLED = False
+        SLOW_QUERY_ENABLED = False
+        AUDIT_WRITER = "thread"
+        if profile == "default":
+            SQLALCHEMY_ENGINE_OPTIONS = {"connect_args": {"timeout": 0}}
+        if profile == "sqlite":
+            SQLITE_PRAGMAS = SQLiteConfig.SQLITE_PRAGMAS
+            SQLALCHEMY_ENGINE_OPTIONS = dict(SQLiteConfig.SQLALCHEMY_ENGINE_OPTIONS, pool_size=readers + writers)
+
+    app = app_init(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        manager = User(first_name="Bench", last_name="Manager", email="bench@example.com", role="manager", password="SecureP@ssword1")
+        db.session.add(manager)
+        db.session.execute(insert(Project), [{"name": f"Project {i}", "description": "benchmark", "version": 1} for i in range(20)])
+        db.session.commit()
+        project_ids = [project.id for project in Project.query.all()]
+        db.session.execute(insert(Task), [
+            {"title": f"Task {i}", "project_id": project_ids[i % len(project_ids)], "rank": rank, "version": 1}
+            for i, rank in enumerate(sequence(4000))
+        ])
+        db.session.commit()
+        headers = {"Authorization": f"Bearer {create_auth_token(manager)}"}
+
+    results = {"read": [], "write": []}
+    errors = {"read": 0, "write": 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def worker(kind):
+        client = app.test_client()
+        latencies = []
+        failed = 0
+        while time.monotonic() < deadline:
+            project_id = random.choice(project_ids)
+            started = time.perf_counter()
+            if kind == "read":
+                response = client.get(f"/api/projects/{project_id}/tasks?page={random.randint(1, 4)}&per_page=50", headers=headers)
+            else:
+                response = client.post(f"/api/projects/{project_id}/tasks", json={"title": "Written"}, headers=headers)
+            response.get_data()
+            if response.status_code >= 400:
+                failed += 1
+            else:
+                latencies.append((time.perf_counter() - started) * 1000)
+        with lock:
+            results[kind].extend(latencies)
+            errors[kind] += failed
+
+    threads = [threading.Thread(target=worker, args=("read",)) for _ in range(readers)] + \
+              [threading.Thread(target=worker, args=("write",)) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        journal_mode = db.session.connection().exec_driver_sql("PRAGMA journal_mode").scalar()
+
+    report = {"journal_mode": journal_mode}
+    for kind, latencies in results.items():
+        latencies.sort()
+        report[kind] = {
+            "ok_per_s": len(latencies) / seconds,
+            "errors": errors[kind],
+            "p50_ms": statistics.median(latencies) if latencies else None,
+            "p95_ms": latencies[int(len(latencies) * 0.95) - 1] if latencies else None
+        }
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--profile", choices=PROFILES, help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.profile:
+        print(json.dumps(run_profile(args.profile, args.path, args.readers, args.writers, args.seconds)))
+        return
+
+    reports = {}
+    for profile in PROFILES:
+        with tempfile.TemporaryDirectory() as directory:
+            output = subprocess.run(
+                [sys.executable, __file__, "--profile", profile, "--path", os.path.join(directory, "bench.db"),
+                 "--readers", str(args.readers), "--writers", str(args.writers), "--seconds", str(args.seconds)],
+                check=True, capture_output=True, text=True, env=dict(os.environ, JWT_SECRET_KEY="benchmark")
+            ).stdout
+            reports[profile] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"{args.readers} readers, {args.writers} writers, {args.seconds:g}s per profile")
+    print(f"{'profile':<9} {'journal':<8} {'kind':<6} {'ok/s':>8} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    for profile, report in reports.items():
+        for kind in ("read", "write"):
+            row = report[kind]
+            p50 = f"{row['p50_ms']:.1f}" if row['p50_ms'] is not None else "-"
+            p95 = f"{row['p95_ms']:.1f}" if row['p95_ms'] is not None else "-"
+            print(f"{profile:<9} {report['journal_mode']:<8} {kind:<6} {row['ok_per_s']:>8.1f} {row['errors']:>7} {p50:>8} {p95:>8}")
+
+if __name__ == "__main__":
+    main()
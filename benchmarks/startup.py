@@ -0,0 +1,97 @@
+"""
+Startup benchmark: import time, app_init time, time to first request and
+time to first spec request, each measured in a fresh interpreter.
+
+    python benchmarks/startup.py [--runs 5]
+
+Variants:
+  lazy      Swagger enabled, spec built from docstrings on first request
+  compiled  Swagger enabled, spec loaded from a file built by `flask swagger build`
+  disabled  SWAGGER_ENABLED = False, flasgger is never imported
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r'''
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import app as app_module
+from config import TestConfig
+imported = time.perf_counter()
+
+class BenchConfig(TestConfig):
+    JWT_SECRET_KEY = "benchmark"
+    SWAGGER_ENABLED = {enabled!r}
+    SWAGGER_SPEC_FILE = {spec_file!r}
+
+app = app_module.app_init(BenchConfig)
+initialized = time.perf_counter()
+
+client = app.test_client()
+client.get("/api/projects")
+first_request = time.perf_counter()
+
+if BenchConfig.SWAGGER_ENABLED:
+    client.get("/apispec_1.json")
+first_spec = time.perf_counter()
+
+print(json.dumps({{
+    "import_ms": (imported - start) * 1000,
+    "init_ms": (initialized - imported) * 1000,
+    "first_request_ms": (first_request - initialized) * 1000,
+    "first_spec_ms": (first_spec - first_request) * 1000,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}}))
+'''
+
+def probe(enabled, spec_file):
+    code = PROBE.format(root=ROOT, enabled=enabled, spec_file=spec_file)
+    output = subprocess.check_output([sys.executable, "-c", code], cwd=ROOT)
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+def build_spec(path):
+    code = (
+        "import sys; sys.path.insert(0, {root!r})\n"
+        "from app import app_init\n"
+        "from config import TestConfig\n"
+        "class C(TestConfig): JWT_SECRET_KEY = 'benchmark'\n"
+        "app = app_init(C)\n"
+        "app.test_cli_runner().invoke(args=['swagger', 'build', '-o', {path!r}])\n"
+    ).format(root=ROOT, path=path)
+    subprocess.check_call([sys.executable, "-c", code], cwd=ROOT)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        spec_file = os.path.join(tmp, "swagger.json")
+        build_spec(spec_file)
+
+        variants = {
+            "lazy": (True, None),
+            "compiled": (True, spec_file),
+            "disabled": (False, None),
+        }
+
+        print(f"{'variant':<10} {'import':>9} {'init':>9} {'1st req':>9} {'1st spec':>9} {'rss MB':>8}")
+        for name, (enabled, spec) in variants.items():
+            samples = [probe(enabled, spec) for _ in range(args.runs)]
+            median = {key: statistics.median(s[key] for s in samples) for key in samples[0]}
+            print(
+                f"{name:<10} {median['import_ms']:>7.1f}ms {median['init_ms']:>7.1f}ms "
+                f"{median['first_request_ms']:>7.1f}ms {median['first_spec_ms']:>7.1f}ms "
+                f"{median['max_rss_mb']:>8.1f}"
+            )
+
+if __name__ == "__main__":
+    main()
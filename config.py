@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,8 +11,164 @@ class Config:
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
     JWT_ALGORITHM = "HS256"
 
+    # Login admission control: token buckets per client address and per email
+    AUTH_RATE_LIMIT_ENABLED = True
+    AUTH_RATE_LIMIT_STORAGE = os.getenv("AUTH_RATE_LIMIT_STORAGE", "memory")  # memory | database
+    AUTH_RATE_LIMIT_MAX_KEYS = 100000
+    AUTH_RATE_LIMIT_ADDRESS_BURST = 20
+    AUTH_RATE_LIMIT_ADDRESS_RATE = 0.5
+    AUTH_RATE_LIMIT_EMAIL_BURST = 5
+    AUTH_RATE_LIMIT_EMAIL_RATE = 0.1
+    AUTH_RATE_LIMIT_SWEEP_INTERVAL = 60  # database storage: delete refilled buckets this often
+
+    # Largest number of IDs accepted by the ?ids= batch lookups
+    BATCH_MAX_IDS = 100
+
+    # Largest number of operations in one POST /api/batch
+    BATCH_MAX_OPERATIONS = 50
+
+    # Paginated lists: per_page is capped at MAX_PER_PAGE and pages are encoded
+    # STREAM_BATCH_SIZE rows at a time
+    MAX_PER_PAGE = 100
+    STREAM_BATCH_SIZE = 100
+
+    # Task ranks (see app.ranks): a project's ranks are rewritten by a
+    # background job once a move makes a key longer than this
+    RANK_REBALANCE_LENGTH = 24
+
+    # Project schedules (see app.dependencies): cached graphs are brought up to
+    # date from the change event log, and read again after this many seconds
+    SCHEDULE_CACHE_TTL = 300
+
+    # Identical concurrent GETs in a process share one computation (see app.coalescing)
+    COALESCE_ENABLED = True
+    COALESCE_WAIT_SECONDS = 10  # a waiter runs the route itself after this long
+
+    # How paginated lists count their total: exact | cached | estimated (see app.pagination)
+    PAGINATION_COUNT = "exact"
+    PAGINATION_COUNT_BY_ENDPOINT = {}  # per endpoint overrides, e.g. {"projects.get_tasks": "estimated"}
+    PAGINATION_COUNT_TTL = 30  # cached: seconds a total is reused
+    PAGINATION_COUNT_EXACT_BELOW = 1000  # estimated: smaller estimates are counted exactly
+
+    # Background jobs
+    JOBS_EXECUTOR = "thread"  # thread | inline
+    JOBS_MAX_WORKERS = 4
+    JOBS_CONCURRENCY = {}  # per job type overrides, e.g. {"delete_project": 1}
+    JOBS_LEASE_SECONDS = 300
+    JOBS_RESUME_ON_START = True
+    JOBS_CHUNK_SIZE = 500
+    JOBS_REAP_INTERVAL = 60  # seconds between scans for jobs of dead workers, 0 disables
+    JOBS_EXPORT_DIR = os.getenv("JOBS_EXPORT_DIR")  # defaults to <instance path>/exports
+
+    # Idempotency-Key support on create endpoints
+    IDEMPOTENCY_TTL_SECONDS = 86400
+    IDEMPOTENCY_SWEEP_INTERVAL = 300  # 0 disables the background sweep
+    IDEMPOTENCY_SWEEP_BATCH_SIZE = 1000
+
+    # Swagger: SWAGGER_SPEC_FILE is written by `flask swagger build` and served
+    # instead of parsing the route docstrings at runtime
+    SWAGGER_ENABLED = True
+    SWAGGER_UI = True
+    SWAGGER_SPEC_FILE = os.getenv("SWAGGER_SPEC_FILE")
+
+    # Server-Sent Events change feed at /api/events
+    CHANGE_FEED_POLLER = "thread"  # thread | inline
+    CHANGE_FEED_POLL_INTERVAL = 1  # seconds, bounds the delay for changes made by other workers
+    CHANGE_FEED_BATCH_SIZE = 500
+    CHANGE_FEED_MAX_QUEUED = 1000  # per stream, a slower client is disconnected and resumes
+    CHANGE_FEED_HEARTBEAT_SECONDS = 15
+    CHANGE_FEED_MAX_STREAM_SECONDS = 300
+    CHANGE_FEED_RETRY_MS = 3000
+    CHANGE_FEED_LAG_SECONDS = 5  # IDs skipped by the feed are polled for again this long, as they may still commit
+    CHANGE_EVENTS_RETAIN = 10000
+    CHANGE_EVENTS_PRUNE_INTERVAL = 60
+
+    # Slow query log, see app.slow_queries and GET /api/admin/slow-queries
+    SLOW_QUERY_ENABLED = True
+    SLOW_QUERY_THRESHOLD_MS = 200
+    SLOW_QUERY_EXPLAINER = "thread"  # thread | inline
+    SLOW_QUERY_EXPLAIN = True
+    SLOW_QUERY_EXPLAIN_ANALYZE = False  # PostgreSQL, SELECTs only: runs the query again to time it
+    SLOW_QUERY_EXPLAIN_INTERVAL = 300  # seconds between plans of the same statement
+    SLOW_QUERY_LOG_FILE = os.getenv("SLOW_QUERY_LOG_FILE")  # defaults to <instance path>/slow_queries.log
+    SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+    SLOW_QUERY_LOG_BACKUPS = 5
+    SLOW_QUERY_QUEUE_SIZE = 1000
+    SLOW_QUERY_MAX_STATEMENTS = 1000
+
+    # Delta sync at /api/sync
+    SYNC_PAGE_SIZE = 500  # rows per entity and response
+    SYNC_LAG_SECONDS = 5  # rows changed this recently are sent again by the next sync
+    SYNC_TOMBSTONE_RETAIN_DAYS = 30
+    SYNC_TOMBSTONE_PRUNE_INTERVAL = 3600
+    SYNC_TOMBSTONE_PRUNE_BATCH_SIZE = 1000
+
+    # Audit log of project, task and user writes, written in batches off the request path
+    AUDIT_ENABLED = True
+    AUDIT_WRITER = "thread"  # thread | inline
+    AUDIT_QUEUE_SIZE = 10000
+    AUDIT_QUEUE_FULL = "block"  # block | drop | sync
+    AUDIT_BLOCK_SECONDS = 1
+    AUDIT_BATCH_SIZE = 500
+    AUDIT_FLUSH_INTERVAL = 1  # seconds a partial batch waits for more entries
+
+
+class ProductionConfig(Config):
+    SWAGGER_UI = os.getenv("SWAGGER_UI", "false").lower() == "true"
+    SWAGGER_SPEC_FILE = os.getenv("SWAGGER_SPEC_FILE", "swagger.json")
+
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 5)),
+        "pool_pre_ping": True,
+        "pool_recycle": 1800,
+    }
+
+    # Worker warm-up before accepting traffic (see app.warmup)
+    WARMUP_CONNECTIONS = int(os.getenv("DB_POOL_SIZE", 5))
+    WARMUP_PATHS = [
+        "/api/projects",
+        "/api/users",
+    ]
+
+
+class SQLiteConfig(ProductionConfig):
+    """Single-server deployments on a SQLite file, e.g. DB_URL=sqlite:////srv/pms/pms.db"""
+    SQLALCHEMY_DATABASE_URI = os.getenv('DB_URL', 'sqlite:///pms.db')
+
+    # WAL lets readers run while a write commits, and writers wait for the
+    # lock (busy_timeout, ms) instead of failing with "database is locked"
+    SQLITE_PRAGMAS = {
+        "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 10000)),
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",  # durable in WAL mode, only the last commits can be lost on power failure
+        "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+        "cache_size": -int(os.getenv("SQLITE_CACHE_KB", 64000)),  # negative: KiB per connection
+        "temp_store": "MEMORY",
+    }
+
+    # A connection per gunicorn thread, plus a few for the audit writer, jobs and change feed threads
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", os.getenv("GUNICORN_THREADS", 8))),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 4)),
+        "pool_timeout": 30,
+        "connect_args": {"check_same_thread": False},
+    }
+    WARMUP_CONNECTIONS = int(os.getenv("DB_POOL_SIZE", os.getenv("GUNICORN_THREADS", 8)))
+
 
 class TestConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
-    WTF_CSRF_ENABLED = False
\ No newline at end of file
+    WTF_CSRF_ENABLED = False
+    JOBS_EXECUTOR = "inline"
+    JOBS_RESUME_ON_START = False
+    JOBS_EXPORT_DIR = os.path.join(tempfile.gettempdir(), "pms-test-exports")
+    IDEMPOTENCY_SWEEP_INTERVAL = 0
+    CHANGE_FEED_POLLER = "inline"
+    CHANGE_FEED_POLL_INTERVAL = 0.01
+    CHANGE_FEED_HEARTBEAT_SECONDS = 0.05
+    CHANGE_FEED_MAX_STREAM_SECONDS = 0.1
+    AUDIT_WRITER = "inline"
+    SLOW_QUERY_EXPLAINER = "inline"
+    SLOW_QUERY_LOG_FILE = os.path.join(tempfile.gettempdir(), "pms-test-slow-queries.log")
\ No newline at end of file
@@ -0,0 +1,43 @@
+"""
+Gunicorn settings for production.
+
+    gunicorn -c gunicorn.conf.py
+
+The app is loaded once in the master and forked into the workers. Each
+worker drops the connections it inherited and warms up (see app.warmup)
+before it starts accepting requests.
+
+Workers are threaded (gthread): an open /api/events stream occupies one
+thread rather than a whole worker, and the worker keeps notifying the
+arbiter while it streams, so `timeout` does not cut streams off. Size
+GUNICORN_THREADS for the number of concurrent event streams plus regular
+requests per worker.
+"""
+import multiprocessing
+import os
+
+wsgi_app = "wsgi:app"
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 8))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 0))
+preload_app = True
+
+def post_fork(server, worker):
+    from wsgi import app
+    from app.extensions import db
+
+    # Connections opened in the master must not be shared with the children
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+def post_worker_init(worker):
+    from wsgi import app
+    from app.warmup import warm_up
+
+    report = warm_up(app)
+    worker.log.info("Worker %s warmed up: %s", worker.pid, report)
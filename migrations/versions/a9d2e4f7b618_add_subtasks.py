@@ -0,0 +1,40 @@
+"""[ADD] Subtasks
+
+Revision ID: a9d2e4f7b618
+Revises: f3c8a5d1e294
+Create Date: 2026-10-19 22:41:36.205718
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9d2e4f7b618'
+down_revision = 'f3c8a5d1e294'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('parent_id', sa.Integer(), nullable=True))
+
+    op.create_table('task_closure',
+    sa.Column('ancestor_id', sa.Integer(), nullable=False),
+    sa.Column('descendant_id', sa.Integer(), nullable=False),
+    sa.Column('depth', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id')
+    )
+    with op.batch_alter_table('task_closure', schema=None) as batch_op:
+        batch_op.create_index('ix_task_closure_descendant_id_depth', ['descendant_id', 'depth'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('task_closure', schema=None) as batch_op:
+        batch_op.drop_index('ix_task_closure_descendant_id_depth')
+
+    op.drop_table('task_closure')
+
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.drop_column('parent_id')
@@ -0,0 +1,37 @@
+"""[ADD] Task dependencies
+
+Revision ID: b7e3f1c9d452
+Revises: a9d2e4f7b618
+Create Date: 2026-10-19 23:37:12.648190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e3f1c9d452'
+down_revision = 'a9d2e4f7b618'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('task_dependencies',
+    sa.Column('task_id', sa.Integer(), nullable=False),
+    sa.Column('depends_on_id', sa.Integer(), nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('task_id', 'depends_on_id')
+    )
+    with op.batch_alter_table('task_dependencies', schema=None) as batch_op:
+        batch_op.create_index('ix_task_dependencies_project_id', ['project_id'], unique=False)
+        batch_op.create_index('ix_task_dependencies_depends_on_id', ['depends_on_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('task_dependencies', schema=None) as batch_op:
+        batch_op.drop_index('ix_task_dependencies_depends_on_id')
+        batch_op.drop_index('ix_task_dependencies_project_id')
+
+    op.drop_table('task_dependencies')
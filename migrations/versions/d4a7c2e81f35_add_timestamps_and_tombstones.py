@@ -0,0 +1,63 @@
+"""[ADD] Timestamps and tombstones
+
+Revision ID: d4a7c2e81f35
+Revises: b2f7d4e9a613
+Create Date: 2026-10-19 18:02:41.208315
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a7c2e81f35'
+down_revision = 'b2f7d4e9a613'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('projects', 'tasks'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('created_at', sa.DateTime(), nullable=True))
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    # Existing rows get the migration time; users created before had the time their worker started
+    for table in ('projects', 'tasks', 'users'):
+        op.execute(f"UPDATE {table} SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+        op.execute(f"UPDATE {table} SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL")
+
+    for table in ('projects', 'tasks', 'users'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+            batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+            batch_op.create_index(f'ix_{table}_updated_at_id', ['updated_at', 'id'], unique=False)
+
+    op.create_table('tombstones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('entity', sa.String(length=20), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('tombstones', schema=None) as batch_op:
+        batch_op.create_index('ix_tombstones_deleted_at_id', ['deleted_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('tombstones', schema=None) as batch_op:
+        batch_op.drop_index('ix_tombstones_deleted_at_id')
+
+    op.drop_table('tombstones')
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('ix_users_updated_at_id')
+        batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=True)
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=True)
+
+    for table in ('tasks', 'projects'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(f'ix_{table}_updated_at_id')
+            batch_op.drop_column('updated_at')
+            batch_op.drop_column('created_at')
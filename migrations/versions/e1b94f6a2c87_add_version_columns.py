@@ -0,0 +1,28 @@
+"""[UPDATE] Version columns for optimistic concurrency
+
+Revision ID: e1b94f6a2c87
+Revises: c5d71e2f9a04
+Create Date: 2026-10-19 12:41:52.308817
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1b94f6a2c87'
+down_revision = 'c5d71e2f9a04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('projects', 'tasks', 'users'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    for table in ('users', 'tasks', 'projects'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('version')
@@ -0,0 +1,47 @@
+"""[ADD] Project members
+
+Revision ID: e6b1f3a90c27
+Revises: d4a7c2e81f35
+Create Date: 2026-10-19 19:11:05.482901
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6b1f3a90c27'
+down_revision = 'd4a7c2e81f35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('project_members',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'project_id')
+    )
+    with op.batch_alter_table('project_members', schema=None) as batch_op:
+        batch_op.create_index('ix_project_members_project_id_user_id', ['project_id', 'user_id'], unique=False)
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('membership_version', sa.Integer(), nullable=True))
+
+    op.execute("UPDATE users SET membership_version = 1 WHERE membership_version IS NULL")
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.alter_column('membership_version', existing_type=sa.Integer(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('membership_version')
+
+    with op.batch_alter_table('project_members', schema=None) as batch_op:
+        batch_op.drop_index('ix_project_members_project_id_user_id')
+
+    op.drop_table('project_members')
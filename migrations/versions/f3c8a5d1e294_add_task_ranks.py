@@ -0,0 +1,64 @@
+"""[ADD] Task ranks
+
+Revision ID: f3c8a5d1e294
+Revises: e6b1f3a90c27
+Create Date: 2026-10-19 20:26:48.113054
+
+"""
+from itertools import groupby
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3c8a5d1e294'
+down_revision = 'e6b1f3a90c27'
+branch_labels = None
+depends_on = None
+
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+def rank_keys(count):
+    """Consecutive keys centred in the integer parts, as app.ranks.sequence makes them."""
+    length = 5
+    while len(DIGITS) ** length < 2 * count:
+        length += 1
+    start = (len(DIGITS) ** length - count) // 2
+
+    keys = []
+    for value in range(start, start + count):
+        digits = []
+        for _ in range(length):
+            value, digit = divmod(value, len(DIGITS))
+            digits.append(DIGITS[digit])
+        keys.append(str(length) + ''.join(reversed(digits)))
+    return keys
+
+def rank_type():
+    return sa.String(length=255).with_variant(sa.String(length=255, collation='C'), 'postgresql')
+
+
+def upgrade():
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rank', rank_type(), nullable=True))
+
+    # Existing tasks keep their ID order
+    connection = op.get_bind()
+    rows = connection.execute(sa.text("SELECT project_id, id FROM tasks ORDER BY project_id, id")).all()
+    statement = sa.text("UPDATE tasks SET rank = :rank WHERE id = :id")
+    for project_id, tasks in groupby(rows, key=lambda row: row[0]):
+        task_ids = [task_id for _, task_id in tasks]
+        updates = [{"id": task_id, "rank": key} for task_id, key in zip(task_ids, rank_keys(len(task_ids)))]
+        for start in range(0, len(updates), 1000):
+            connection.execute(statement, updates[start:start + 1000])
+
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.alter_column('rank', existing_type=rank_type(), nullable=False)
+        batch_op.create_index('ix_tasks_project_id_rank', ['project_id', 'rank', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.drop_index('ix_tasks_project_id_rank')
+        batch_op.drop_column('rank')
@@ -0,0 +1,6 @@
+import os
+
+from app import app_init
+from config import ProductionConfig, SQLiteConfig
+
+app = app_init(SQLiteConfig if os.getenv("DB_PROFILE") == "sqlite" else ProductionConfig)